@@ -5,9 +5,13 @@ go to etc. for other methods to interpolate rotations
 """
 import numpy as np
 from gradientsolver import bending_solver as sol
-from include import slerp as slerpsol, quaternion_smith as quat_sol
+from include import slerp as slerpsol, quaternion_smith as quat_sol, so3
 import matplotlib.pyplot as plt
 from include.AnimationController import ControlledAnimation
+from include.assembly import SparseAssembler
+from include.mesh import Mesh
+from include.constraints import Constraints
+from include.staticsolver import LoadStepPredictor
 import pandas as pd
 
 try:
@@ -35,53 +39,47 @@ def fea(load_iter_, is_halt=False):
     global residue_norm
     global increments_norm
     global is_log_residue
+    u = predictor.predict(fapp__[load_iter_], u)
     for iter_ in range(MAX_ITER):
-        KG, FG = sol.init_stiffness_force(numberOfNodes, DOF)
+        assembler.reset()
+        FG = assembler.force
         # Follower load
         # s = sol.get_rotation_from_theta_tensor(u[-6: -3]) @ np.array([0, fapp__[load_iter_], 0])[:, None]
         # FG[-12: -9] = s
         # Pure Bending
         FG[-6, 0] = fapp__[load_iter_]
+        ngp = len(wgp)
+        # hermite coefficients [x_0, x'_0, x_1, x'_1] of theta
+        rlocg = mesh.gather(u).reshape(numberOfElements, 4, 3)
+        # all gauss point rotations at once
+        rotg = so3.exp(mesh.at_gauss_points(rlocg))
         for elm in range(numberOfElements):
-            n = icon[elm][1:]
-            xloc = node_data[n][:, None]
-            rloc = np.zeros((3, 4))
-            rloc[:, [0, 2]] = np.array([u[DOF * n, 0], u[DOF * n + 1, 0], u[DOF * n + 2, 0]])
-            rloc[:, [1, 3]] = np.array([u[DOF * n + 3, 0], u[DOF * n + 4, 0], u[DOF * n + 5, 0]])
+            rloc = rlocg[elm].T
             kloc, floc = sol.init_stiffness_force(nodesPerElement, DOF)
             gloc = np.zeros((DOF, 1))
-            for xgp in range(len(wgp)):
+            for xgp in range(ngp):
 
-                le = xloc[-1][0] - xloc[0][0]
-                Jac = le / 2
-                N_, Nx_, Nxx_ = sol.get_hermite_fn(gp[xgp], Jac, element_type)
-                N_, Nx_, Nxx_ = N_[:, None], Nx_[:, None], Nxx_[:, None]
+                N_, Nx_, Nxx_ = mesh.n[elm, xgp][:, None], mesh.nx[elm, xgp][:, None], mesh.nxx[elm, xgp][:, None]
                 # Nx_ = 1 / Jac * Bmat
-                t = rloc @ N_
                 tds = rloc @ Nx_
                 tdsds = rloc @ Nxx_
                 k = tds
                 kp = tdsds
-                Rot = sol.get_rotation_from_theta_tensor(t)
+                Rot = rotg[elm, xgp]
                 gloc[0: 3] = Rot @ ElasticityBending @ k
                 gloc[3: 6] = Rot @ ElasticityBendingH @ kp
                 tangent, res = sol.get_tangent_stiffness_residue_bend(gloc, N_, Nx_, Nxx_, ElasticityBending, ElasticityBendingH, Rot, Rot @ sol.skew(k), k, DOF, element_type)
-                floc += res * wgp[xgp] * Jac
-                kloc += tangent * wgp[xgp] * Jac
+                floc += res * mesh.wj[elm, xgp]
+                kloc += tangent * mesh.wj[elm, xgp]
 
-            iv = np.array(sol.get_assembly_vector(DOF, n))
-
-            FG[iv[:, None], 0] += floc
-            KG[iv[:, None], iv] += kloc
+            assembler.add(elm, kloc, floc)
         # TODO: Make a generalized function for application of point as well as body loads
         # f = np.zeros((6, 6))
         # f[0: 3, 3: 6] = -sol.skew(s)
         # KG[-6:, -6:] += f
-        for ibc in range(6):
-            sol.impose_boundary_condition(KG, FG, ibc, 0)
-        sol.impose_boundary_condition(KG, FG, -3, 0)
-        du = -sol.get_displacement_vector(KG, FG)
-        residue_norm = np.linalg.norm(FG)
+        KG = assembler.tobsr()
+        du = constraints.solve(KG, FG)
+        residue_norm = constraints.residue_norm(FG)
 
         increments_norm = np.linalg.norm(du)
         if increments_norm > 1:
@@ -89,20 +87,11 @@ def fea(load_iter_, is_halt=False):
         if increments_norm < 1e-6 and residue_norm < 1e-3:
             break
         """
-        Configuration update (not working as of now) for angles greater than 360 deg, Make this work for multi-axis rotations
-        """
-        # for i in range(numberOfNodes):
-        #     q = slerpsol.rotation_vector_to_quaterion(u[6 * i + 3: 6 * i + 6, 0])
-        #     dq = slerpsol.rotation_vector_to_quaterion(du[6 * i + 3: 6 * i + 6, 0])
-        #     q = slerpsol.quatmul(q, dq)
-        #     u[6 * i + 3: 6 * i + 6, 0] = slerpsol.quaterion_to_rotation_vec(q)
-        #     u[6 * i + 0: 6 * i + 3] += du[6 * i + 0: 6 * i + 3]
-        """
-        Approx. configuration update
+        Configuration update, R_(i+1) = exp(dtheta_i) * R_i, rotation vectors are re-parameterized past 2 pi
         """
-        # TODO: Change this, it works perfectly if two rotations are about one axis (R_(i+1) = exp(dtheta_i) * exp(theta_i))
-        u += du
+        u = so3.update_configuration(u, du, DOF, (0,))
 
+    predictor.append(fapp__[load_iter_], u)
     if is_log_residue:
         print(
             "--------------------------------------------------------------------------------------------------------------------------------------------------",
@@ -120,6 +109,9 @@ if __name__ == "__main__":
     DOF = 6
 
     MAX_ITER = 100  # Max newton raphson iteration
+    # newton starts from the last converged states extrapolated in load, None, "secant" or "quadratic"
+    PREDICTOR = None
+    predictor = LoadStepPredictor(PREDICTOR)
     element_type = 2
     L = 1
     numberOfElements = 60
@@ -139,6 +131,9 @@ if __name__ == "__main__":
     # u[DOF * vi + 5, 0] = 1
     du = np.zeros((numberOfNodes * DOF, 1))
     nodesPerElement = element_type ** DIMENSIONS
+    assembler = SparseAssembler(icon, numberOfNodes, DOF)
+    mesh = Mesh(icon, node_data, DOF, wgp, gp, element_type, sol.get_hermite_fn)
+    constraints = Constraints(numberOfNodes * DOF, list(range(6)) + [-3], assembler)
 
     """
     SET MATERIAL PROPERTIES
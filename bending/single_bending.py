@@ -8,6 +8,10 @@ from gradientsolver import bending_solver as sol
 from include import slerp as slerpsol, quaternion_smith as quat_sol
 import matplotlib.pyplot as plt
 from include.AnimationController import ControlledAnimation
+from include.assembly import SparseAssembler
+from include.mesh import Mesh
+from include.constraints import Constraints
+from include.staticsolver import LoadStepPredictor
 import pandas as pd
 
 try:
@@ -35,27 +39,24 @@ def fea(load_iter_, is_halt=False):
     global residue_norm
     global increments_norm
     global is_log_residue
+    u = predictor.predict(fapp__[load_iter_], u)
     for iter_ in range(MAX_ITER):
-        KG, FG = sol.init_stiffness_force(numberOfNodes, DOF)
+        assembler.reset()
+        FG = assembler.force
         # Follower load
         # s = sol.get_rotation_from_theta_tensor(u[-6: -3]) @ np.array([0, fapp__[load_iter_], 0])[:, None]
         # FG[-12: -9] = s
         # Pure Bending
         FG[-2, 0] = fapp__[load_iter_]
+        # hermite coefficients [x_0, x'_0, x_1, x'_1]
+        rlocg = mesh.gather(u).reshape(numberOfElements, 4, 1)
         for elm in range(numberOfElements):
-            n = icon[elm][1:]
-            xloc = node_data[n][:, None]
-            rloc = np.zeros((1, 4))
-            rloc[:, [0, 2]] = np.array([u[DOF * n, 0]])
-            rloc[:, [1, 3]] = np.array([u[DOF * n + 1, 0]])
+            rloc = rlocg[elm].T
             kloc, floc = sol.init_stiffness_force(nodesPerElement, DOF)
             gloc = np.zeros((DOF, 1))
             for xgp in range(len(wgp)):
 
-                le = xloc[-1][0] - xloc[0][0]
-                Jac = le / 2
-                N_, Nx_, Nxx_ = sol.get_hermite_fn(gp[xgp], Jac, element_type)
-                N_, Nx_, Nxx_ = N_[:, None], Nx_[:, None], Nxx_[:, None]
+                N_, Nx_, Nxx_ = mesh.n[elm, xgp][:, None], mesh.nx[elm, xgp][:, None], mesh.nxx[elm, xgp][:, None]
                 # Nx_ = 1 / Jac * Bmat
                 t = rloc @ N_
                 tds = rloc @ Nx_
@@ -65,22 +66,17 @@ def fea(load_iter_, is_halt=False):
                 gloc[0] = ElasticityBending[0, 0] * k
                 gloc[1] = ElasticityBendingH[0, 0] * kp
                 tangent, res = sol.get_ts(gloc, ElasticityBending[0, 0], ElasticityBendingH[0, 0], N_, Nx_, Nxx_, DOF, 2)
-                floc += res * wgp[xgp] * Jac
-                kloc += tangent * wgp[xgp] * Jac
+                floc += res * mesh.wj[elm, xgp]
+                kloc += tangent * mesh.wj[elm, xgp]
 
-            iv = np.array(sol.get_assembly_vector(DOF, n))
-
-            FG[iv[:, None], 0] += floc
-            KG[iv[:, None], iv] += kloc
+            assembler.add(elm, kloc, floc)
         # TODO: Make a generalized function for application of point as well as body loads
         # f = np.zeros((6, 6))
         # f[0: 3, 3: 6] = -sol.skew(s)
         # KG[-6:, -6:] += f
-        for ibc in range(2):
-            sol.impose_boundary_condition(KG, FG, ibc, 0)
-        sol.impose_boundary_condition(KG, FG, -1, 0)
-        du = -sol.get_displacement_vector(KG, FG)
-        residue_norm = np.linalg.norm(FG)
+        KG = assembler.tobsr()
+        du = constraints.solve(KG, FG)
+        residue_norm = constraints.residue_norm(FG)
 
         increments_norm = np.linalg.norm(du)
         if increments_norm > 1:
@@ -102,6 +98,7 @@ def fea(load_iter_, is_halt=False):
         # TODO: Change this, it works perfectly if two rotations are about one axis (R_(i+1) = exp(dtheta_i) * exp(theta_i))
         u += du
 
+    predictor.append(fapp__[load_iter_], u)
     if is_log_residue:
         print(
             "--------------------------------------------------------------------------------------------------------------------------------------------------",
@@ -118,6 +115,9 @@ if __name__ == "__main__":
     DOF = 2
 
     MAX_ITER = 100  # Max newton raphson iteration
+    # newton starts from the last converged states extrapolated in load, None, "secant" or "quadratic"
+    PREDICTOR = None
+    predictor = LoadStepPredictor(PREDICTOR)
     element_type = 2
     L = 1
     numberOfElements = 10
@@ -137,6 +137,9 @@ if __name__ == "__main__":
     # u[DOF * vi + 5, 0] = 1
     du = np.zeros((numberOfNodes * DOF, 1))
     nodesPerElement = element_type ** DIMENSIONS
+    assembler = SparseAssembler(icon, numberOfNodes, DOF)
+    mesh = Mesh(icon, node_data, DOF, wgp, gp, element_type, sol.get_hermite_fn)
+    constraints = Constraints(numberOfNodes * DOF, [0, 1, -1], assembler)
 
     """
     SET MATERIAL PROPERTIES
@@ -4,10 +4,14 @@ classical_rod.py works using quaternions for rotation interpolations,
 go to etc. for other methods to interpolate rotations
 """
 import numpy as np
-from include import solver1d as sol, slerp as slerpsol
+from include import solver1d as sol, slerp as slerpsol, so3
 import matplotlib.pyplot as plt
-from scipy import linalg as la
 from include.AnimationController import ControlledAnimation
+from include.assembly import SparseAssembler
+from include.mesh import Mesh
+from include.constraints import Constraints
+from include.staticsolver import LoadStepPredictor
+from include.stability import linear_buckling
 
 try:
     import scienceplots
@@ -25,6 +29,9 @@ DIMENSIONS = 1
 DOF = 6
 
 MAX_ITER = 100  # Max newton raphson iteration
+# newton starts from the last converged states extrapolated in load, None, "secant" or "quadratic"
+PREDICTOR = None
+predictor = LoadStepPredictor(PREDICTOR)
 element_type = 2
 L = 1
 numberOfElements = 20
@@ -38,6 +45,11 @@ wgp, gp = sol.init_gauss_points(ngpt)
 u = np.zeros((numberOfNodes * DOF, 1))
 du = np.zeros((numberOfNodes * DOF, 1))
 nodesPerElement = element_type ** DIMENSIONS
+assembler = SparseAssembler(icon, numberOfNodes, DOF)
+mesh = Mesh(icon, node_data, DOF, wgp, gp, element_type)
+constraints = Constraints(numberOfNodes * DOF, range(6), assembler)
+assembler0 = SparseAssembler(icon, numberOfNodes, DOF)
+assemblerG = SparseAssembler(icon, numberOfNodes, DOF)
 
 """
 SET MATERIAL PROPERTIES
@@ -96,13 +108,6 @@ for i in range(numberOfNodes):
     r2[i] = u[DOF * i + 1][0]
     r3[i] = u[DOF * i + 2][0]
 
-"""
-Initialize Graph
-"""
-fig, (ax, ay) = plt.subplots(1, 2, figsize=(16, 5), width_ratios=[1, 2])
-ax.set_xlim(0, L)
-ax.plot(r3, r2, label="un-deformed", marker="o")
-
 """
 Set load and load steps
 """
@@ -128,78 +133,43 @@ def fea(load_iter_, is_halt=False):
     global residue_norm
     global increments_norm
     global is_log_residue
-    KG, FG = sol.init_stiffness_force(numberOfNodes, DOF)
-    KG0 = np.zeros_like(KG)
-    KGG = np.zeros_like(KG0)
-
+    u = predictor.predict(fapp__[load_iter_], u)
     for iter_ in range(MAX_ITER):
-        KG *= 0
-        KG0 *= 0
-        KGG *= 0
-        FG *= 0
+        assembler.reset()
+        assembler0.reset()
+        assemblerG.reset()
+        FG = assembler.force
         # Follower load
         s = sol.get_rotation_from_theta_tensor(u[-3:, 0]) @ np.array([0, fapp__[load_iter_], 0])[:, None] * 0
         # FG[-6:-3] = s
         # Pure Bending
         FG[-5, 0] = -fapp__[load_iter_]
-        for elm in range(numberOfElements):
-            n = icon[elm][1:]
-            xloc = node_data[n][:, None]
-            rloc = np.array([u[6 * n, 0], u[6 * n + 1, 0], u[6 * n + 2, 0]])
-            tloc = np.array([u[6 * n + 3, 0], u[6 * n + 4, 0], u[6 * n + 5, 0]])
-            kloc, floc = sol.init_stiffness_force(nodesPerElement, DOF)
-            q1 = slerpsol.rotation_vector_to_quaterion(tloc[:, 0].reshape(3, ))
-            q2 = slerpsol.rotation_vector_to_quaterion(tloc[:, 1].reshape(3, ))
-            kloc0 = np.zeros_like(kloc)
-            klocg = np.zeros_like(kloc)
-            gloc = np.zeros((6, 1))
-            for xgp in range(len(wgp)):
-                N_, Bmat = sol.get_lagrange_fn(gp[xgp], element_type)
-                Jac = (xloc.T @ Bmat)[0][0]
-                Nx_ = 1 / Jac * Bmat
-                rds = rloc @ Nx_
-                qh = slerpsol.slerp(q1, q2, N_)
-                dqh = slerpsol.diff_slerp(q1, q2, Nx_, N_)
-
-                Rot = slerpsol.get_rot_from_q(qh)
-                # This is used to get kappa, and method is taken from Darboux, G. [1972]. Also available in literature of multi-body dynamics
-                k = 2 * np.array([[-qh[1], qh[0], qh[3], qh[2]],
-                                  [-qh[2], qh[3], qh[0], -qh[1]],
-                                  [-qh[3], -qh[2], qh[1], qh[0]]]) @ dqh[:, None]
-                v = Rot.T @ rds
-
-                gloc[0: 3] = Rot @ ElasticityExtension @ (v - np.array([0, 0, 1])[:, None])
-                gloc[3: 6] = Rot @ ElasticityBending @ k
-                pi = sol.get_pi(Rot)
-
-                n_tensor = sol.skew(gloc[0: 3])
-                m_tensor = sol.skew(gloc[3: 6])
-                tangent, res, kg0, kgg = sol.get_tangent_stiffness_residue(n_tensor, m_tensor, N_, Nx_, DOF, pi, Elasticity,
-                                                                           sol.skew(rds), gloc, None, True)
-                floc += res * wgp[xgp] * Jac
-                kloc += tangent * wgp[xgp] * Jac
-                kloc0 += kg0 * wgp[xgp] * Jac
-                klocg += kgg * wgp[xgp] * Jac
-
-            iv = np.array(sol.get_assembly_vector(DOF, n))
-
-            FG[iv[:, None], 0] += floc
-            KG[iv[:, None], iv] += kloc
-            KG0[iv[:, None], iv] += kloc0
-            KGG[iv[:, None], iv] += klocg
+        ue = mesh.gather(u)
+        rdsg = mesh.at_gauss_points(ue[..., 0: 3], 1)
+        # nodal quaternions and slerp of every element at once
+        qe = so3.quat_from_rotation_vector(ue[..., 3: 6])
+        qg = slerpsol.slerp_batched(qe[:, None, 0], qe[:, None, 1], mesh.n)
+        dqg = slerpsol.diff_slerp_batched(qe[:, None, 0], qe[:, None, 1], mesh.nx, mesh.n)
+        rotg = so3.quat_to_rotation(qg)
+        # This is used to get kappa, and method is taken from Darboux, G. [1972]. Also available in literature of multi-body dynamics
+        kg = so3.quat_curvature(qg, dqg)
+        glocg = sol.get_stress_resultants_batched(rotg, rdsg, kg, ElasticityExtension, ElasticityBending)
+
+        tangent, res, kg0, kgg = sol.get_tangent_stiffness_residue_batched(glocg, mesh.n, mesh.nx, rotg, Elasticity, rdsg, mesh.wj, True)
+        assembler.add_all(tangent, res)
+        assembler0.add_all(kg0, res)
+        assemblerG.add_all(kgg, res)
 
         # TODO: Make a generalized function for application of point as well as body loads
         f = np.zeros((6, 6))
         f[0: 3, 3: 6] = -sol.skew(s)
-        KG[-6:, -6:] += f
-        for ibc in range(6):
-            sol.impose_boundary_condition(KG, FG, ibc, 0)
-            sol.impose_boundary_condition_bukl(KG0, ibc, 0)
-            sol.impose_boundary_condition_bukl(KGG, ibc, 0)
-
-        du = -sol.get_displacement_vector(KG, FG)
+        assembler.add_nodal(numberOfNodes - 1, f)
+        KG = assembler.tobsr()
+        KG0 = assembler0.tobsr()
+        KGG = assemblerG.tobsr()
+        du = constraints.solve(KG, FG)
 
-        residue_norm = np.linalg.norm(FG)
+        residue_norm = constraints.residue_norm(FG)
 
         increments_norm = np.linalg.norm(du)
         if increments_norm > 1:
@@ -207,22 +177,15 @@ def fea(load_iter_, is_halt=False):
         if increments_norm < 1e-6 and residue_norm < 1e-3:
             break
         """
-        Configuration update (not working as of now) for angles greater than 360 deg, Make this work for multi-axis rotations
+        Configuration update, R_(i+1) = exp(dtheta_i) * R_i, rotation vectors are re-parameterized past 2 pi
         """
-        # for i in range(numberOfNodes):
-        #     q = slerpsol.rotation_vector_to_quaterion(u[6 * i + 3: 6 * i + 6, 0])
-        #     dq = slerpsol.rotation_vector_to_quaterion(du[6 * i + 3: 6 * i + 6, 0])
-        #     q = slerpsol.quatmul(q, dq)
-        #     u[6 * i + 3: 6 * i + 6, 0] = slerpsol.quaterion_to_rotation_vec(q)
-        #     u[6 * i + 0: 6 * i + 3] += du[6 * i + 0: 6 * i + 3]
-        """
-        Approx. configuration update
-        """
-        # TODO: Change this, it works perfectly if two rotations are about one axis (R_(i+1) = exp(dtheta_i) * exp(theta_i))
-        u += du
+        u = so3.update_configuration(u, du, DOF)
 
+    predictor.append(fapp__[load_iter_], u)
     if is_log_residue:
-        print(np.sort(la.eigvals(KG0, KG).real))
+        # linearized buckling loads about current state, (KG0 + lambda KGG) phi = 0
+        factors, modes = linear_buckling(KG0, KGG, constraints)
+        print(fapp__[load_iter_] * factors)
         print(
             "--------------------------------------------------------------------------------------------------------------------------------------------------",
             fapp__[load_iter_], load_iter_)
@@ -285,20 +248,27 @@ def act(i):
         controlled_animation.disconnect()
 
 
-ay.scatter(0, 0, marker=".", label="horizontal tip displacement")
-ay.scatter(0, 0, marker="+", label="vertical tip displacement")
-ay.legend()
-ay.axhline(y=0)
-ay.set_xlabel(r"LOAD", fontsize=16)
-ay.set_ylabel(r"Tip Displacement", fontsize=16)
-ax.set_xlabel(r"$r_3$", fontsize=25)
-ax.set_ylabel(r"$r_2$", fontsize=25)
-ax.set_ylim(-85, 41)
-y = u[DOF * vi + 1, 0]
-x = u[DOF * vi + 2, 0]
-line1, = ax.plot(x, y)
-ax.set_title("Centerline displacement")
-ay.set_title("Tip Displacement vs Load")
-controlled_animation = ControlledAnimation(fig, act, frames=len(fapp__), video_request=video_request, repeat=False)
-controlled_animation.start()
-print(max_load * L / GA / 2, u[-6:], 1.5 * 3.8)
+if __name__ == "__main__":
+    """
+    Initialize Graph
+    """
+    fig, (ax, ay) = plt.subplots(1, 2, figsize=(16, 5), width_ratios=[1, 2])
+    ax.set_xlim(0, L)
+    ax.plot(r3, r2, label="un-deformed", marker="o")
+    ay.scatter(0, 0, marker=".", label="horizontal tip displacement")
+    ay.scatter(0, 0, marker="+", label="vertical tip displacement")
+    ay.legend()
+    ay.axhline(y=0)
+    ay.set_xlabel(r"LOAD", fontsize=16)
+    ay.set_ylabel(r"Tip Displacement", fontsize=16)
+    ax.set_xlabel(r"$r_3$", fontsize=25)
+    ax.set_ylabel(r"$r_2$", fontsize=25)
+    ax.set_ylim(-85, 41)
+    y = u[DOF * vi + 1, 0]
+    x = u[DOF * vi + 2, 0]
+    line1, = ax.plot(x, y)
+    ax.set_title("Centerline displacement")
+    ay.set_title("Tip Displacement vs Load")
+    controlled_animation = ControlledAnimation(fig, act, frames=len(fapp__), video_request=video_request, repeat=False)
+    controlled_animation.start()
+    print(max_load * L / GA / 2, u[-6:], 1.5 * 3.8)
@@ -4,9 +4,11 @@ classical_rod.py works using quaternions for rotation interpolations,
 go to etc. for other methods to interpolate rotations
 """
 import numpy as np
-from include import solver1d as sol, slerp as slerpsol
 import matplotlib.pyplot as plt
 from include.AnimationController import ControlledAnimation
+from include.problem import RodProblem
+from include.staticsolver import StaticSolver
+from include.pathstore import PathStore
 try:
     import scienceplots
     plt.style.use(['science'])
@@ -25,16 +27,7 @@ MAX_ITER = 100  # Max newton raphson iteration
 element_type = 2
 L = 1
 numberOfElements = 20
-
-icon, node_data = sol.get_connectivity_matrix(numberOfElements, L, element_type)
-numberOfNodes = len(node_data)
 ngpt = 1
-wgp, gp = sol.init_gauss_points(ngpt)
-
-# Setting up displacement vectors
-u = np.zeros((numberOfNodes * DOF, 1))
-du = np.zeros((numberOfNodes * DOF, 1))
-nodesPerElement = element_type ** DIMENSIONS
 
 """
 SET MATERIAL PROPERTIES
@@ -62,12 +55,15 @@ ElasticityBending = np.array([[E0 * i0, 0, 0],
 #                               [0, EI, 0],
 #                               [0, 0, 0.5 * EI]])
 
-Elasticity = np.zeros((6, 6))
-Elasticity[0: 3, 0: 3] = ElasticityExtension
-Elasticity[3: 6, 3: 6] = ElasticityBending
-# Elasticity = np.eye(6)
-# Elasticity[2, 2] = 10
-# Elasticity[5, 5] = 10
+# Clamped at s = 0, follower load along material E2 at the tip (dead load if follower=False)
+problem = RodProblem(ElasticityExtension, ElasticityBending, numberOfElements, L, ngpt, element_type,
+                     fixed=range(6), tip_load=(0, 1, 0), follower=True)
+# newton starts from the last converged state extrapolated in load, None, "secant", "quadratic" or "tangent"
+# (du / dload at the last converged state), predictors need the default full newton strategy
+PREDICTOR = "tangent"
+solver = StaticSolver(problem, MAX_ITER, predictor=PREDICTOR)
+node_data = problem.node_data
+numberOfNodes = problem.number_of_nodes
 
 """
 Markers
@@ -80,25 +76,8 @@ Starting point
 """
 residue_norm = 0
 increments_norm = 0
-u *= 0
-# since rod is lying straight in E3 direction it's centerline will have these coordinates
-u[6 * vi + 2, 0] = node_data
-# Thetas are zero
-
-r1 = np.zeros(numberOfNodes)
-r2 = np.zeros(numberOfNodes)
-r3 = np.zeros(numberOfNodes)
-for i in range(numberOfNodes):
-    r1[i] = u[DOF * i][0]
-    r2[i] = u[DOF * i + 1][0]
-    r3[i] = u[DOF * i + 2][0]
-
-"""
-Initialize Graph
-"""
-fig, (ax, ay) = plt.subplots(1, 2, figsize=(16, 5), width_ratios=[1, 2])
-ax.set_xlim(0, L)
-ax.plot(r3, r2, label="un-deformed", marker="o")
+# since rod is lying straight in E3 direction it's centerline will have these coordinates, thetas are zero
+u = problem.initial_state()
 
 """
 Set load and load steps
@@ -107,6 +86,12 @@ Set load and load steps
 max_load = 30 * E0 * i0
 LOAD_INCREMENTS = 31  # Follower load usually needs more steps compared to dead or pure bending
 fapp__ = -np.linspace(0, max_load, LOAD_INCREMENTS)
+# every converged load step is streamed to this folder (see include/pathstore.py), None keeps it in memory only
+PATH_STORE = None
+store = None if PATH_STORE is None else PathStore(PATH_STORE, len(u), LOAD_INCREMENTS, meta={"max_load": max_load})
+# load steps are solved lazily as the animation asks for them, path holds the snapshot of every converged step
+steps = solver.iter_path(fapp__, u)
+path = []
 
 """
 Main loop
@@ -120,87 +105,15 @@ def fea(load_iter_, is_halt=False):
     :return: use input , True if user want to stop animation
     """
     global u
-    global du
     global residue_norm
     global increments_norm
-    global is_log_residue
-    for iter_ in range(MAX_ITER):
-        KG, FG = sol.init_stiffness_force(numberOfNodes, DOF)
-        # Follower load
-        s = sol.get_rotation_from_theta_tensor(u[-3:, 0]) @ np.array([0, fapp__[load_iter_], 0])[:, None]
-        FG[-6:-3] = s
-        # Pure Bending
-        # FG[-5, 0] = fapp__[load_iter_] * 0
-        for elm in range(numberOfElements):
-            n = icon[elm][1:]
-            xloc = node_data[n][:, None]
-            rloc = np.array([u[6 * n, 0], u[6 * n + 1, 0], u[6 * n + 2, 0]])
-            tloc = np.array([u[6 * n + 3, 0], u[6 * n + 4, 0], u[6 * n + 5, 0]])
-            kloc, floc = sol.init_stiffness_force(nodesPerElement, DOF)
-            q1 = slerpsol.rotation_vector_to_quaterion(tloc[:, 0].reshape(3, ))
-            q2 = slerpsol.rotation_vector_to_quaterion(tloc[:, 1].reshape(3, ))
-
-            gloc = np.zeros((6, 1))
-            for xgp in range(len(wgp)):
-                N_, Bmat = sol.get_lagrange_fn(gp[xgp], element_type)
-                Jac = (xloc.T @ Bmat)[0][0]
-                Nx_ = 1 / Jac * Bmat
-                rds = rloc @ Nx_
-                qh = slerpsol.slerp(q1, q2, N_)
-                dqh = slerpsol.diff_slerp(q1, q2, Nx_, N_)
-
-                Rot = slerpsol.get_rot_from_q(qh)
-                # This is used to get kappa, and method is taken from Darboux, G. [1972]. Also available in literature of multi-body dynamics
-                k = 2 * np.array([[-qh[1], qh[0], qh[3], qh[2]],
-                                  [-qh[2], qh[3], qh[0], -qh[1]],
-                                  [-qh[3], -qh[2], qh[1], qh[0]]]) @ dqh[:, None]
-                v = Rot.T @ rds
-
-                gloc[0: 3] = Rot @ ElasticityExtension @ (v - np.array([0, 0, 1])[:, None])
-                gloc[3: 6] = Rot @ ElasticityBending @ k
-                pi = sol.get_pi(Rot)
-
-                n_tensor = sol.skew(gloc[0: 3])
-                m_tensor = sol.skew(gloc[3: 6])
-                tangent, res = sol.get_tangent_stiffness_residue(n_tensor, m_tensor, N_, Nx_, DOF, pi, Elasticity,
-                                                                 sol.skew(rds), gloc, None)
-                floc += res * wgp[xgp] * Jac
-                kloc += tangent * wgp[xgp] * Jac
-
-            iv = np.array(sol.get_assembly_vector(DOF, n))
-
-            FG[iv[:, None], 0] += floc
-            KG[iv[:, None], iv] += kloc
-
-        # TODO: Make a generalized function for application of point as well as body loads
-        f = np.zeros((6, 6))
-        f[0: 3, 3: 6] = -sol.skew(s)
-        KG[-6:, -6:] += f
-        for ibc in range(6):
-            sol.impose_boundary_condition(KG, FG, ibc, 0)
-        du = -sol.get_displacement_vector(KG, FG)
-        residue_norm = np.linalg.norm(FG)
-
-        increments_norm = np.linalg.norm(du)
-        if increments_norm > 1:
-            du = du / increments_norm
-        if increments_norm < 1e-6 and residue_norm < 1e-3:
-            break
-        """
-        Configuration update (not working as of now) for angles greater than 360 deg, Make this work for multi-axis rotations
-        """
-        # for i in range(numberOfNodes):
-        #     q = slerpsol.rotation_vector_to_quaterion(u[6 * i + 3: 6 * i + 6, 0])
-        #     dq = slerpsol.rotation_vector_to_quaterion(du[6 * i + 3: 6 * i + 6, 0])
-        #     q = slerpsol.quatmul(q, dq)
-        #     u[6 * i + 3: 6 * i + 6, 0] = slerpsol.quaterion_to_rotation_vec(q)
-        #     u[6 * i + 0: 6 * i + 3] += du[6 * i + 0: 6 * i + 3]
-        """
-        Approx. configuration update
-        """
-        # TODO: Change this, it works perfectly if two rotations are about one axis (R_(i+1) = exp(dtheta_i) * exp(theta_i))
-        u += du
-
+    while len(path) <= load_iter_:
+        path.append(next(steps))
+        if store is not None:
+            store.append(path[-1].load, path[-1].u, path[-1])
+    step = path[load_iter_]
+    u = step.u
+    residue_norm, increments_norm = step.residue_norm, step.increments_norm
     if is_log_residue:
         print(
             "--------------------------------------------------------------------------------------------------------------------------------------------------",
@@ -209,9 +122,6 @@ def fea(load_iter_, is_halt=False):
     return is_halt
 
 
-u = np.zeros((numberOfNodes * DOF, 1))
-u[6 * vi + 2, 0] = node_data
-
 marker_ = np.linspace(0, max_load, LOAD_INCREMENTS)
 # marker_ = np.insert(marker_, 0, [2000, 6000, 12000], axis=0)
 """
@@ -264,20 +174,27 @@ def act(i):
         controlled_animation.disconnect()
 
 
-ay.scatter(0, 0, marker=".", label="horizontal tip displacement")
-ay.scatter(0, 0, marker="+", label="vertical tip displacement")
-ay.legend()
-ay.axhline(y=0)
-ay.set_xlabel(r"LOAD", fontsize=16)
-ay.set_ylabel(r"Tip Displacement", fontsize=16)
-ax.set_xlabel(r"$r_3$", fontsize=25)
-ax.set_ylabel(r"$r_2$", fontsize=25)
-ax.set_ylim(-85, 41)
-y = u[DOF * vi + 1, 0]
-x = u[DOF * vi + 2, 0]
-line1, = ax.plot(x, y)
-ax.set_title("Centerline displacement")
-ay.set_title("Tip Displacement vs Load")
-controlled_animation = ControlledAnimation(fig, act, frames=len(fapp__), video_request=video_request, repeat=False)
-controlled_animation.start()
-print(max_load * L / GA / 2, u[-6:])
+if __name__ == "__main__":
+    """
+    Initialize Graph
+    """
+    fig, (ax, ay) = plt.subplots(1, 2, figsize=(16, 5), width_ratios=[1, 2])
+    ax.set_xlim(0, L)
+    ax.plot(node_data, np.zeros(numberOfNodes), label="un-deformed", marker="o")
+    ay.scatter(0, 0, marker=".", label="horizontal tip displacement")
+    ay.scatter(0, 0, marker="+", label="vertical tip displacement")
+    ay.legend()
+    ay.axhline(y=0)
+    ay.set_xlabel(r"LOAD", fontsize=16)
+    ay.set_ylabel(r"Tip Displacement", fontsize=16)
+    ax.set_xlabel(r"$r_3$", fontsize=25)
+    ax.set_ylabel(r"$r_2$", fontsize=25)
+    ax.set_ylim(-85, 41)
+    y = u[DOF * vi + 1, 0]
+    x = u[DOF * vi + 2, 0]
+    line1, = ax.plot(x, y)
+    ax.set_title("Centerline displacement")
+    ay.set_title("Tip Displacement vs Load")
+    controlled_animation = ControlledAnimation(fig, act, frames=len(fapp__), video_request=video_request, repeat=False)
+    controlled_animation.start()
+    print(max_load * L / GA / 2, u[-6:])
@@ -1,7 +1,10 @@
 import numpy as np
-from include import solver1d as sol
+from include import solver1d as sol, so3
 import matplotlib.pyplot as plt
 from include.AnimationController import ControlledAnimation
+from include.assembly import SparseAssembler
+from include.mesh import Mesh
+from include.constraints import Constraints
 try:
     import scienceplots
     plt.style.use(['science', 'high-vis'])
@@ -29,6 +32,9 @@ u = np.zeros((numberOfNodes * DOF, 1))
 du = np.zeros((numberOfNodes * DOF, 1))
 major_kappa = np.zeros((numberOfElements * 3 * ngpt, 1))
 nodesPerElement = element_type ** DIMENSIONS
+assembler = SparseAssembler(icon, numberOfNodes, DOF)
+mesh = Mesh(icon, node_data, DOF, wgp, gp, element_type)
+constraints = Constraints(numberOfNodes * DOF, range(6), assembler)
 
 """
 SET MATERIAL PROPERTIES
@@ -89,13 +95,6 @@ for i in range(numberOfNodes):
     r2[i] = u[DOF * i + 1][0]
     r3[i] = u[DOF * i + 2][0]
 
-"""
-Initialize Graph
-"""
-fig, ax = plt.subplots(1, 1, figsize=(9, 9))
-ax.set_xlim(0, L)
-ax.plot(r3, r2, label="un-deformed", marker="o")
-
 """
 Set load and load steps
 """
@@ -122,65 +121,44 @@ def fea(load_iter_, is_halt=False):
     print("--------------------------------------------------------------------------------------------------------------------------------------------------",
           fapp__[load_iter_], load_iter_)
     for iter_ in range(MAX_ITER):
-        KG, FG = sol.init_stiffness_force(numberOfNodes, DOF)
+        assembler.reset()
+        FG = assembler.force
 
         s = sol.get_rotation_from_theta_tensor(u[-3:, 0]) @ np.array([0, fapp__[load_iter_], 0])[:, None]
         FG[-6: -3] = s
 
         # print(u[6 * vii + 3, 0] * 180 / np.pi)
         # FG[-3, 0] = -fapp__[load_iter_]
-        for elm in range(numberOfElements):
-            n = icon[elm][1:]
-            xloc = node_data[n][:, None]
-            rloc = np.array([u[6 * n, 0], u[6 * n + 1, 0], u[6 * n + 2, 0]])
-            tloc = np.array([u[6 * n + 3, 0], u[6 * n + 4, 0], u[6 * n + 5, 0]])
-            dtloc = np.array([du[6 * n + 3, 0], du[6 * n + 4, 0], du[6 * n + 5, 0]])
-            kloc, floc = sol.init_stiffness_force(nodesPerElement, DOF)
-
-            gloc = np.zeros((6, 1))
-            for xgp in range(len(wgp)):
-                N_, Bmat = sol.get_lagrange_fn(gp[xgp], element_type)
-                Jac = (xloc.T @ Bmat)[0][0]
-                Nx_ = 1 / Jac * Bmat
-                t = tloc @ N_
-                dt = dtloc @ N_
-                tds = tloc @ Nx_
-                rds = rloc @ Nx_
-                dtds = dtloc @ Nx_
-
-                Rot = sol.get_rotation_from_theta_tensor(t)
-
-                v = Rot.T @ rds
-                gloc[0: 3] = Rot @ ElasticityExtension @ (v - np.array([0, 0, 1])[:, None])
-                kap = sol.get_incremental_k_path_independent_second(t, tds)
-                # major_kappa[3 * xgp + 3 * ngpt * elm: 3 * ngpt * elm + 3 * (xgp + 1)] += sol.get_incremental_k(dt, dtds, Rot)
-                gloc[3: 6] = Rot @ ElasticityBending @ kap
-                pi = sol.get_pi(Rot)
-                n_tensor = sol.skew(gloc[0: 3])
-                m_tensor = sol.skew(gloc[3: 6])
-                tangent, res = sol.get_tangent_stiffness_residue(n_tensor, m_tensor, N_, Nx_, DOF, pi, Elasticity,
-                                                                 sol.skew(rds), gloc, None)
-                floc += res * wgp[xgp] * Jac
-                kloc += tangent * wgp[xgp] * Jac
-
-            iv = np.array(sol.get_assembly_vector(DOF, n))
-            FG[iv[:, None], 0] += floc
-            KG[iv[:, None], iv] += kloc
+        ngp = mesh.ngp
+        ue = mesh.gather(u)
+        due = mesh.gather(du)
+        tg = mesh.at_gauss_points(ue[..., 3: 6])
+        tdsg = mesh.at_gauss_points(ue[..., 3: 6], 1)
+        dtg = mesh.at_gauss_points(due[..., 3: 6])
+        dtdsg = mesh.at_gauss_points(due[..., 3: 6], 1)
+        rdsg = mesh.at_gauss_points(ue[..., 0: 3], 1)
+
+        # all gauss point rotations at once
+        rotg = so3.exp(tg)
+        kap = sol.get_incremental_k_path_independent_second_batched(tg, tdsg)
+        # major_kappa.reshape(numberOfElements, ngp, 3)[...] += sol.get_incremental_k_batched(dtg, dtdsg, rotg)
+        glocg = sol.get_stress_resultants_batched(rotg, rdsg, kap, ElasticityExtension, ElasticityBending)
+
+        tangent, res = sol.get_tangent_stiffness_residue_batched(glocg, mesh.n, mesh.nx, rotg, Elasticity, rdsg, mesh.wj)
+        assembler.add_all(tangent, res)
 
         # TODO: Make a generalized function for application of point as well as body loads
         f = np.zeros((6, 6))
         f[0: 3, 3: 6] = -sol.skew(s)
-        KG[-6:, -6:] += f
-
-        for ibc in range(6):
-            sol.impose_boundary_condition(KG, FG, ibc, 0)
+        assembler.add_nodal(numberOfNodes - 1, f)
+        KG = assembler.tobsr()
 
-        du = -sol.get_displacement_vector(KG, FG)
+        du = constraints.solve(KG, FG)
 
         """
         Calculate norms of residue and incremental displacement
         """
-        residue_norm = np.linalg.norm(FG)
+        residue_norm = constraints.residue_norm(FG)
         increments_norm = np.linalg.norm(du)
 
         if increments_norm > 1:
@@ -193,21 +171,9 @@ def fea(load_iter_, is_halt=False):
             break
 
         """
-        Configuration update (not working as of now) for angles greater than 360 deg, Make this work for multi-axis rotations
+        Configuration update, R_(i+1) = exp(dtheta_i) * R_i, rotation vectors are re-parameterized past 2 pi
         """
-        # for i in range(numberOfNodes):
-        #     xxx = sol.get_theta_from_rotation(
-        #         sol.get_rotation_from_theta_tensor(du[6 * i + 3: 6 * i + 6]) @ sol.get_rotation_from_theta_tensor(
-        #             u[6 * i + 3: 6 * i + 6]))
-        #     # xxx = sol.test_rotation(sol.get_rotation_from_theta_tensor(du[6 * i + 3: 6 * i + 6]) @ sol.get_rotation_from_theta_tensor(
-        #     #    u[6 * i + 3: 6 * i + 6]))
-        #     u[6 * i + 3: 6 * i + 6, 0] = xxx
-        #     u[6 * i + 0: 6 * i + 3] += du[6 * i + 0: 6 * i + 3]
-        """
-        Approx. configuration update
-        """
-        # TODO: Change this, this is working fine but numerically it is not the best way, it works perfectly if two rotations are about one axis
-        u += du
+        u = so3.update_configuration(u, du, DOF)
 
     print(residue_norm, increments_norm)
     return is_halt
@@ -262,14 +228,21 @@ def act(i):
             controlled_animation.disconnect()
 
 
-ax.set_xlabel(r"$r_3$", fontsize=30)
-ax.set_ylabel(r"$r_2$", fontsize=30)
-plt.xticks(fontsize=20)
-plt.yticks(fontsize=20)
-ax.set_ylim(-85, 41)
-y = u[DOF * vi + 1, 0]
-x = u[DOF * vi + 2, 0]
-line1, = ax.plot(x, y)
-controlled_animation = ControlledAnimation(fig, act, frames=len(fapp__), video_request=video_request, repeat=False)
-controlled_animation.start()
-print(max_load * L / GA / 2, u[-6:])
+if __name__ == "__main__":
+    """
+    Initialize Graph
+    """
+    fig, ax = plt.subplots(1, 1, figsize=(9, 9))
+    ax.set_xlim(0, L)
+    ax.plot(r3, r2, label="un-deformed", marker="o")
+    ax.set_xlabel(r"$r_3$", fontsize=30)
+    ax.set_ylabel(r"$r_2$", fontsize=30)
+    plt.xticks(fontsize=20)
+    plt.yticks(fontsize=20)
+    ax.set_ylim(-85, 41)
+    y = u[DOF * vi + 1, 0]
+    x = u[DOF * vi + 2, 0]
+    line1, = ax.plot(x, y)
+    controlled_animation = ControlledAnimation(fig, act, frames=len(fapp__), video_request=video_request, repeat=False)
+    controlled_animation.start()
+    print(max_load * L / GA / 2, u[-6:])
@@ -1,4 +1,6 @@
 import numpy as np
+from scipy import sparse
+from include import assembly, so3
 
 
 def init_gauss_points(n=3):
@@ -29,6 +31,9 @@ def impose_boundary_condition(k, f, ibc, bc):
     :param ibc: node at with BC is prescribed
     :param bc: boundary condition
     """
+    if sparse.issparse(k):
+        assembly.impose_boundary_condition_sparse(k, f, ibc, bc)
+        return
     f -= (k[:, ibc] * bc)[:, None]
     f[ibc] = bc
     k[:, ibc] = 0
@@ -42,6 +47,8 @@ def get_displacement_vector(k, f):
     :param f: force vector
     :return: nodal displacement
     """
+    if sparse.issparse(k):
+        return assembly.get_displacement_vector_sparse(k, f)
     return np.linalg.solve(k, f)
 
 
@@ -118,41 +125,7 @@ def get_theta_from_rotation(rmat):
     :param rmat: rotation matrix
     :return: theta
     """
-    q = np.zeros(4)
-    trq = np.trace(rmat)
-    v = np.array([trq, rmat[0, 0], rmat[1, 1], rmat[2, 2]])
-    m = v.argmax()
-    maxval = v[m]
-    if m == 0:
-        q[0] = 0.5 * np.sqrt(1 + maxval)
-        q[1] = 0.25 * (rmat[2, 1] - rmat[1, 2]) / q[0]
-        q[2] = 0.25 * (rmat[0, 2] - rmat[2, 0]) / q[0]
-        q[3] = 0.25 * (rmat[1, 0] - rmat[0, 1]) / q[0]
-    elif m == 1:
-        q[1] = np.sqrt(0.5 * maxval + 0.25 * (1 - trq))
-        q[0] = 0.25 * (rmat[2, 1] - rmat[1, 2]) / q[1]
-        q[2] = 0.25 * (rmat[0, 1] + rmat[1, 0]) / q[1]
-        q[3] = 0.25 * (rmat[2, 0] + rmat[0, 2]) / q[1]
-    elif m == 2:
-        q[2] = np.sqrt(0.5 * maxval + 0.25 * (1 - trq))
-        q[1] = 0.25 * (rmat[0, 1] + rmat[1, 0]) / q[2]
-        q[0] = 0.25 * (rmat[0, 2] - rmat[2, 0]) / q[2]
-        q[3] = 0.25 * (rmat[1, 2] + rmat[2, 1]) / q[2]
-    elif m == 3:
-        q[3] = np.sqrt(0.5 * maxval + 0.25 * (1 - trq))
-        q[1] = 0.25 * (rmat[2, 0] + rmat[0, 2]) / q[3]
-        q[2] = 0.25 * (rmat[1, 2] + rmat[2, 1]) / q[3]
-        q[0] = 0.25 * (rmat[1, 0] - rmat[0, 1]) / q[3]
-    else:
-        raise Exception("not max index")
-    if q[0] >= 0:
-        normt = 2 * np.arcsin(np.linalg.norm(q[1:]))
-    else:
-        normt = 2 * (np.pi - np.arcsin(np.linalg.norm(q[1:])))
-    if np.isclose(normt, 0, atol=1e-6):
-        return np.zeros((3,))
-    else:
-        return normt / np.linalg.norm(q[1:]) * q[1:]
+    return so3.log(rmat)
 
 
 def get_theta_from_rotation_deprecated(rmat):
@@ -173,11 +146,7 @@ def skew(x):
     :param x: vector
     :return: skew symmetric tensor for which x is axial
     """
-    x = np.reshape(x, (3,))
-    return np.array([[0, -x[2], x[1]],
-                     [x[2], 0, -x[0]],
-                     [-x[1], x[0], 0]]
-                    )
+    return so3.skew(np.reshape(x, (3,)))
 
 
 def axial(x):
@@ -186,7 +155,7 @@ def axial(x):
     :param x: skew symmetric tensor
     :return: axial vector
     """
-    return np.array([x[2, 1], x[0, 2], x[1, 0]])
+    return so3.axial(x)
 
 
 def get_rotation_from_theta_tensor_deprecated(x):
@@ -208,19 +177,7 @@ def get_rotation_from_theta_tensor(x):
     :param x: skew symmetric tensor
     :return: rotation tensor
     """
-    x = np.reshape(x, (3,))
-    normt = np.linalg.norm(x)
-    if np.isclose(normt, 0, atol=1e-8):
-        return np.eye(3)
-    else:
-        q = np.zeros(4)
-        q[0] = np.cos(normt / 2)
-        q[1:] = np.sin(normt / 2) / normt * x
-        return 2 * np.array([
-            [q[0] ** 2 + q[1] ** 2 - 0.5, q[1] * q[2] - q[3] * q[0], q[1] * q[3] + q[2] * q[0]],
-            [q[2] * q[1] + q[3] * q[0], q[0] ** 2 + q[2] ** 2 - 0.5, q[2] * q[3] - q[1] * q[0]],
-            [q[3] * q[1] - q[2] * q[0], q[3] * q[2] + q[1] * q[0], q[0] ** 2 + q[3] ** 2 - 0.5]
-        ])
+    return so3.exp(np.reshape(x, (3,)))
 
 
 def get_assembly_vector(dof, n):
@@ -229,11 +186,7 @@ def get_assembly_vector(dof, n):
     :param n: nodes
     :return: assembly points
     """
-    iv = []
-    for i in n:
-        for j in range(dof):
-            iv.append(dof * i + j)
-    return iv
+    return list((dof * np.asarray(n)[:, None] + np.arange(dof)).ravel())
 
 
 def get_incremental_k(dt, dtds, rot):
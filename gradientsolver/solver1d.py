@@ -1,4 +1,6 @@
 import numpy as np
+from scipy import sparse
+from include import assembly, so3
 
 
 def init_gauss_points(n=3):
@@ -29,6 +31,9 @@ def impose_boundary_condition(k, f, ibc, bc):
     :param ibc: node at with BC is prescribed
     :param bc: boundary condition
     """
+    if sparse.issparse(k):
+        assembly.impose_boundary_condition_sparse(k, f, ibc, bc)
+        return
     f -= (k[:, ibc] * bc)[:, None]
     f[ibc] = bc
     k[:, ibc] = 0
@@ -42,6 +47,8 @@ def get_displacement_vector(k, f):
     :param f: force vector
     :return: nodal displacement
     """
+    if sparse.issparse(k):
+        return assembly.get_displacement_vector_sparse(k, f)
     return np.linalg.solve(k, f)
 
 
@@ -119,41 +126,7 @@ def get_theta_from_rotation(rmat):
     :param rmat: rotation matrix
     :return: theta
     """
-    q = np.zeros(4)
-    trq = np.trace(rmat)
-    v = np.array([trq, rmat[0, 0], rmat[1, 1], rmat[2, 2]])
-    m = v.argmax()
-    maxval = v[m]
-    if m == 0:
-        q[0] = 0.5 * np.sqrt(1 + maxval)
-        q[1] = 0.25 * (rmat[2, 1] - rmat[1, 2]) / q[0]
-        q[2] = 0.25 * (rmat[0, 2] - rmat[2, 0]) / q[0]
-        q[3] = 0.25 * (rmat[1, 0] - rmat[0, 1]) / q[0]
-    elif m == 1:
-        q[1] = np.sqrt(0.5 * maxval + 0.25 * (1 - trq))
-        q[0] = 0.25 * (rmat[2, 1] - rmat[1, 2]) / q[1]
-        q[2] = 0.25 * (rmat[0, 1] + rmat[1, 0]) / q[1]
-        q[3] = 0.25 * (rmat[2, 0] + rmat[0, 2]) / q[1]
-    elif m == 2:
-        q[2] = np.sqrt(0.5 * maxval + 0.25 * (1 - trq))
-        q[1] = 0.25 * (rmat[0, 1] + rmat[1, 0]) / q[2]
-        q[0] = 0.25 * (rmat[0, 2] - rmat[2, 0]) / q[2]
-        q[3] = 0.25 * (rmat[1, 2] + rmat[2, 1]) / q[2]
-    elif m == 3:
-        q[3] = np.sqrt(0.5 * maxval + 0.25 * (1 - trq))
-        q[1] = 0.25 * (rmat[2, 0] + rmat[0, 2]) / q[3]
-        q[2] = 0.25 * (rmat[1, 2] + rmat[2, 1]) / q[3]
-        q[0] = 0.25 * (rmat[1, 0] - rmat[0, 1]) / q[3]
-    else:
-        raise Exception("not max index")
-    if q[0] >= 0:
-        normt = 2 * np.arcsin(np.linalg.norm(q[1:]))
-    else:
-        normt = 2 * (np.pi - np.arcsin(np.linalg.norm(q[1:])))
-    if np.isclose(normt, 0, atol=1e-6):
-        return np.zeros((3,))
-    else:
-        return normt / np.linalg.norm(q[1:]) * q[1:]
+    return so3.log(rmat)
 
 
 def get_theta_from_rotation_deprecated(rmat):
@@ -174,11 +147,7 @@ def skew(x):
     :param x: vector
     :return: skew symmetric tensor for which x is axial
     """
-    x = np.reshape(x, (3,))
-    return np.array([[0, -x[2], x[1]],
-                     [x[2], 0, -x[0]],
-                     [-x[1], x[0], 0]]
-                    )
+    return so3.skew(np.reshape(x, (3,)))
 
 
 def axial(x):
@@ -187,7 +156,7 @@ def axial(x):
     :param x: skew symmetric tensor
     :return: axial vector
     """
-    return np.array([x[2, 1], x[0, 2], x[1, 0]])
+    return so3.axial(x)
 
 
 def get_rotation_from_theta_tensor_deprecated(x):
@@ -209,19 +178,7 @@ def get_rotation_from_theta_tensor(x):
     :param x: skew symmetric tensor
     :return: rotation tensor
     """
-    x = np.reshape(x, (3,))
-    normt = np.linalg.norm(x)
-    if np.isclose(normt, 0, atol=1e-8):
-        return np.eye(3)
-    else:
-        q = np.zeros(4)
-        q[0] = np.cos(normt / 2)
-        q[1:] = np.sin(normt / 2) / normt * x
-        return 2 * np.array([
-            [q[0] ** 2 + q[1] ** 2 - 0.5, q[1] * q[2] - q[3] * q[0], q[1] * q[3] + q[2] * q[0]],
-            [q[2] * q[1] + q[3] * q[0], q[0] ** 2 + q[2] ** 2 - 0.5, q[2] * q[3] - q[1] * q[0]],
-            [q[3] * q[1] - q[2] * q[0], q[3] * q[2] + q[1] * q[0], q[0] ** 2 + q[3] ** 2 - 0.5]
-        ])
+    return so3.exp(np.reshape(x, (3,)))
 
 
 def get_assembly_vector(dof, n):
@@ -230,11 +187,7 @@ def get_assembly_vector(dof, n):
     :param n: nodes
     :return: assembly points
     """
-    iv = []
-    for i in n:
-        for j in range(dof):
-            iv.append(dof * i + j)
-    return iv
+    return list((dof * np.asarray(n)[:, None] + np.arange(dof)).ravel())
 
 
 def get_incremental_k(dt, dtds, rot):
@@ -633,6 +586,141 @@ def get_higher_order_tangent_residue(n_, nx_, nxx_, rds, rdsds, rmat, rmatds, cs
     return k, r
 
 
+def get_higher_order_stress_resultants_batched(rot, rotds, rds, rdsds, kvec, kvecds, cs, cb, ds, db):
+    """
+    spatial stress resultants of every gauss point, n = R cs (v - E3), nb = R ds v', m = R cb k, mb = R db k'
+    :param rot: rotation, (nelem, ngp, 3, 3)
+    :param rotds: derivative of rotation, (nelem, ngp, 3, 3)
+    :param rds: rds, (nelem, ngp, 3)
+    :param rdsds: rdsds, (nelem, ngp, 3)
+    :param kvec: curvature, (nelem, ngp, 3)
+    :param kvecds: derivative of curvature, (nelem, ngp, 3)
+    :param cs: shear / extension elasticity, (3, 3)
+    :param cb: bending / torsion elasticity, (3, 3)
+    :param ds: higher order shear / extension elasticity, (3, 3)
+    :param db: higher order bending / torsion elasticity, (3, 3)
+    :return: stress resultants [n, nb, m, mb], (nelem, ngp, 12)
+    """
+    v = np.einsum('egji,egj->egi', rot, rds)
+    vds = np.einsum('egji,egj->egi', rotds, rds) + np.einsum('egji,egj->egi', rot, rdsds)
+    gloc = np.zeros(rds.shape[:-1] + (12,))
+    gloc[..., 0: 3] = np.einsum('egij,jk,egk->egi', rot, cs, v - np.array([0, 0, 1]))
+    gloc[..., 3: 6] = np.einsum('egij,jk,egk->egi', rot, ds, vds)
+    gloc[..., 6: 9] = np.einsum('egij,jk,egk->egi', rot, cb, kvec)
+    gloc[..., 9: 12] = np.einsum('egij,jk,egk->egi', rot, db, kvecds)
+    return gloc
+
+
+def get_higher_order_e_batched(n_, nx_, nxx_, rds, rdsds):
+    """
+    strain operator of every node, hermite coefficient pairs [x, x'] are interleaved as in the element dofs
+    :param n_: hermite fn, (nelem, ngp, 2 * nen)
+    :param nx_: hermite derivative, (nelem, ngp, 2 * nen)
+    :param nxx_: hermite double derivative, (nelem, ngp, 2 * nen)
+    :param rds: rds, (nelem, ngp, 3)
+    :param rdsds: rdsds, (nelem, ngp, 3)
+    :return: e, (nelem, ngp, nen, 12, 12)
+    """
+    nelem, ngp, nh = n_.shape
+    nen = nh // 2
+    h, hx, hxx = (a.reshape(nelem, ngp, nen, 2, 1, 1) for a in (n_, nx_, nxx_))
+    i3 = np.eye(3)
+    x = so3.skew(rds)[:, :, None]
+    y = so3.skew(rdsds)[:, :, None]
+    e_ = np.zeros((nelem, ngp, nen, 12, 12))
+    for a in range(2):
+        s = slice(3 * a, 3 * (a + 1))
+        t = slice(6 + 3 * a, 6 + 3 * (a + 1))
+        e_[..., 0: 3, s] = hx[..., a, :, :] * i3
+        e_[..., 0: 3, t] = h[..., a, :, :] * x
+        e_[..., 3: 6, s] = hxx[..., a, :, :] * i3
+        e_[..., 3: 6, t] = h[..., a, :, :] * y + hx[..., a, :, :] * x
+        e_[..., 6: 9, t] = hx[..., a, :, :] * i3
+        e_[..., 9: 12, t] = hxx[..., a, :, :] * i3
+    return e_
+
+
+def get_higher_order_residue_batched(n_, nx_, nxx_, rds, rdsds, gloc, wj):
+    """
+    residue part of get_higher_order_tangent_residue_batched, no tangent blocks
+    :param n_: hermite fn, (nelem, ngp, 2 * nen)
+    :param nx_: hermite derivative, (nelem, ngp, 2 * nen)
+    :param nxx_: hermite double derivative, (nelem, ngp, 2 * nen)
+    :param rds: rds, (nelem, ngp, 3)
+    :param rdsds: rdsds, (nelem, ngp, 3)
+    :param gloc: stress resultants [n, nb, m, mb], (nelem, ngp, 12)
+    :param wj: gauss weight times jacobian, (nelem, ngp)
+    :return: residues (nelem, 12 * nen, 1)
+    """
+    nelem, ngp, nh = n_.shape
+    e_ = get_higher_order_e_batched(n_, nx_, nxx_, rds, rdsds)
+    return np.einsum('egiXa,egX,eg->eia', e_, gloc, wj).reshape(nelem, 6 * nh, 1)
+
+
+def get_higher_order_tangent_residue_batched(n_, nx_, nxx_, rds, rdsds, rmat, rmatds, cs, cb, ds, db, kvec, gloc, wj, coupler=None):
+    """
+    get_higher_order_tangent_residue for all elements and gauss points at once, already integrated
+    The chain pi @ c_full @ pi.T + pi_l @ d_l @ pi_lds.T @ e_l + ... collapses to e_i.T @ (lm @ e_j + matnm @ H_j),
+    lm has only two 6x6 diagonal blocks, so it is built from 3x3 products instead of 12x12 ones
+    :param n_: hermite fn, (nelem, ngp, 2 * nen)
+    :param nx_: hermite derivative, (nelem, ngp, 2 * nen)
+    :param nxx_: hermite double derivative, (nelem, ngp, 2 * nen)
+    :param rds: rds, (nelem, ngp, 3)
+    :param rdsds: rdsds, (nelem, ngp, 3)
+    :param rmat: rotation, (nelem, ngp, 3, 3)
+    :param rmatds: rotation derivative, (nelem, ngp, 3, 3)
+    :param cs: standard stretch stiffness
+    :param cb: standard bending stiffness
+    :param ds: higher order stretch stiffness
+    :param db: higher order bending stiffness
+    :param kvec: kappa, (nelem, ngp, 3)
+    :param gloc: stress resultants [n, nb, m, mb], (nelem, ngp, 12)
+    :param wj: gauss weight times jacobian, (nelem, ngp)
+    :param coupler: coupling
+    :return: tangents (nelem, 12 * nen, 12 * nen), residues (nelem, 12 * nen, 1)
+    """
+    nelem, ngp, nh = n_.shape
+    nen = nh // 2
+    h, hx, hxx = (a.reshape(nelem, ngp, nen, 2, 1, 1) for a in (n_, nx_, nxx_))
+    nv, nbv, mv, mbv = (so3.skew(gloc[..., 3 * q: 3 * (q + 1)])[:, :, None] for q in range(4))
+
+    e_ = get_higher_order_e_batched(n_, nx_, nxx_, rds, rdsds)
+    nm = np.zeros((nelem, ngp, nen, 12, 12))
+    for a in range(2):
+        t = slice(6 + 3 * a, 6 + 3 * (a + 1))
+        nm[..., 0: 3, t] = -(h[..., a, :, :] * nv + hx[..., a, :, :] * nbv)
+        nm[..., 3: 6, t] = -h[..., a, :, :] * nbv
+        nm[..., 6: 9, t] = -(h[..., a, :, :] * mv + hx[..., a, :, :] * mbv)
+        nm[..., 9: 12, t] = -h[..., a, :, :] * mbv
+
+    rt = np.swapaxes(rmat, -1, -2)
+    rdst = np.swapaxes(rmatds, -1, -2)
+    kr = rmat @ so3.skew(kvec)
+    lm = np.zeros((nelem, ngp, 12, 12))
+    lm[..., 0: 3, 0: 3] = rmat @ cs @ rt + kr @ ds @ rdst
+    lm[..., 0: 3, 3: 6] = kr @ ds @ rt
+    lm[..., 3: 6, 0: 3] = rmat @ ds @ rdst
+    lm[..., 3: 6, 3: 6] = rmat @ ds @ rt
+    lm[..., 6: 9, 6: 9] = rmat @ cb @ rt + kr @ db @ rdst
+    lm[..., 6: 9, 9: 12] = kr @ db @ rt
+    lm[..., 9: 12, 6: 9] = rmat @ db @ rdst
+    lm[..., 9: 12, 9: 12] = rmat @ db @ rt
+    if coupler is not None:
+        p = np.zeros((nelem, ngp, 12, 12))
+        for q in range(4):
+            p[..., 3 * q: 3 * (q + 1), 3 * q: 3 * (q + 1)] = rmat
+        lm += p @ coupler @ np.swapaxes(p, -1, -2)
+
+    k = np.einsum('egiXa,egjXb,eg->eiajb', e_, lm[:, :, None] @ e_ + nm, wj, optimize=True)
+    # Hmat_i.T @ matn_j, lives in rows of theta, theta' and columns of r, r'
+    mn2 = hx * nv[:, :, :, None] + hxx * nbv[:, :, :, None]
+    mn3 = hx * nbv[:, :, :, None]
+    k[:, :, 6: 12, :, 0: 6] += np.einsum('egic,egjbxy,eg->eicxjby', h[..., 0, 0], mn2, wj).reshape(nelem, nen, 6, nen, 6)
+    k[:, :, 6: 12, :, 0: 6] += np.einsum('egic,egjbxy,eg->eicxjby', hx[..., 0, 0], mn3, wj).reshape(nelem, nen, 6, nen, 6)
+    r = np.einsum('egiXa,egX,eg->eia', e_, gloc, wj).reshape(nelem, 12 * nen, 1)
+    return k.reshape(nelem, 12 * nen, 12 * nen), r
+
+
 def beizer_curve():
     pass
 
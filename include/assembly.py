@@ -0,0 +1,223 @@
+"""
+Sparse global assembly
+Element matrices are stored as blocks (COO triplets at block level) and summed into a
+BSR pattern which is computed only once from the connectivity, memory scales with number of elements
+"""
+import numpy as np
+from scipy import linalg as la
+from scipy import sparse
+from scipy.sparse import linalg as spla
+from include import blocksolver
+
+
+class SparseAssembler:
+    def __init__(self, icon, nnod, dof):
+        """
+        :param icon: connectivity matrix (as returned by get_connectivity_matrix)
+        :param nnod: number of nodes
+        :param dof: dof per node
+        """
+        self.nodes = np.asarray(icon)[:, 1:]
+        self.nnod = nnod
+        self.dof = dof
+        nelem, npe = self.nodes.shape
+        self.nelem = nelem
+        self.npe = npe
+        self.block_tridiagonal = blocksolver.is_block_tridiagonal(icon)
+        self.iv = (dof * self.nodes[:, :, None] + np.arange(dof)).reshape(nelem, npe * dof)
+
+        # block (row, col) of every element block followed by every nodal (diagonal) block
+        brow = np.concatenate((np.repeat(self.nodes, npe, axis=1).ravel(), np.arange(nnod)))
+        bcol = np.concatenate((np.tile(self.nodes, (1, npe)).ravel(), np.arange(nnod)))
+        ukey, slot = np.unique(brow.astype(np.int64) * nnod + bcol, return_inverse=True)
+        self.indices = (ukey % nnod).astype(np.int32)
+        self.indptr = np.searchsorted(ukey // nnod, np.arange(nnod + 1)).astype(np.int32)
+        self.nnzb = len(ukey)
+        # scatter pattern, flat position of every block entry in BSR data
+        self._scatter = (slot.ravel()[:, None] * dof * dof + np.arange(dof * dof)).ravel()
+
+        self.kloc = np.zeros((nelem, npe * dof, npe * dof))
+        self.knod = np.zeros((nnod, dof, dof))
+        self.force = np.zeros((nnod * dof, 1))
+
+    def reset(self):
+        """
+        zero stiffness n force, pattern is kept
+        """
+        self.kloc[...] = 0
+        self.knod[...] = 0
+        self.force[...] = 0
+
+    def add(self, elm, kloc, floc):
+        """
+        :param elm: element index
+        :param kloc: local stiffness
+        :param floc: local force
+        """
+        self.kloc[elm] += kloc
+        self.force[self.iv[elm], 0] += floc[:, 0]
+
+    def add_all(self, kloc, floc):
+        """
+        :param kloc: local stiffness of every element, (nelem, npe * dof, npe * dof)
+        :param floc: local force of every element, (nelem, npe * dof, 1)
+        """
+        self.kloc += kloc
+        self.force += self.scatter_force(floc)
+
+    def scatter_force(self, floc):
+        """
+        residue only assembly, stiffness n force of the assembler are left untouched
+        :param floc: local force of every element, (nelem, npe * dof, 1)
+        :return: global force vector, (ndof, 1)
+        """
+        return np.bincount(self.iv.ravel(), weights=floc[..., 0].ravel(), minlength=len(self.force))[:, None]
+
+    def add_nodal(self, node, k):
+        """
+        point contribution (e.g. follower load stiffness) at a node
+        :param node: node index
+        :param k: dof x dof block
+        """
+        self.knod[node] += k
+
+    def tobsr(self):
+        """
+        :return: global stiffness in BSR format, block size = dof
+        """
+        dof, npe = self.dof, self.npe
+        blocks = self.kloc.reshape(self.nelem, npe, dof, npe, dof).transpose(0, 1, 3, 2, 4)
+        weights = np.concatenate((blocks.ravel(), self.knod.ravel()))
+        data = np.bincount(self._scatter, weights=weights, minlength=self.nnzb * dof * dof)
+        return sparse.bsr_matrix((data.reshape(self.nnzb, dof, dof), self.indices, self.indptr),
+                                 shape=(self.nnod * dof, self.nnod * dof))
+
+    def tocsr(self):
+        """
+        :return: global stiffness in CSR format
+        """
+        return self.tobsr().tocsr()
+
+
+def impose_boundary_condition_sparse(k, f, ibc, bc):
+    """
+    Elimination of variables for BSR/CSR storage, sparsity pattern is left untouched
+    :param k: Stiffness matrix / Tangent stiffness (BSR or CSR)
+    :param f: force vector / residue, None if only stiffness is to be modified
+    :param ibc: node at with BC is prescribed
+    :param bc: boundary condition
+    """
+    b = k.blocksize[0] if k.format == "bsr" else 1
+    ibc = ibc % k.shape[0]
+    p, q = divmod(ibc, b)
+    data = k.data.reshape(-1, b, b)
+    col = np.flatnonzero(k.indices == p)
+    block_rows = np.searchsorted(k.indptr, col, side="right") - 1
+    if f is not None:
+        f[(block_rows[:, None] * b + np.arange(b)).ravel(), 0] -= (data[col, :, q] * bc).ravel()
+        f[ibc] = bc
+    data[col, :, q] = 0
+    data[k.indptr[p]: k.indptr[p + 1], q, :] = 0
+    diag = k.indptr[p] + np.flatnonzero(k.indices[k.indptr[p]: k.indptr[p + 1]] == p)[0]
+    data[diag, q, q] = 1
+
+
+def permutation_sign(p):
+    """
+    :param p: permutation of 0 ... n - 1
+    :return: +1 for even, -1 for odd permutation
+    """
+    p = np.asarray(p)
+    seen = np.zeros(len(p), dtype=bool)
+    transpositions = 0
+    for i in range(len(p)):
+        j, length = i, 0
+        while not seen[j]:
+            seen[j] = True
+            j = p[j]
+            length += 1
+        transpositions += max(length - 1, 0)
+    return -1 if transpositions & 1 else 1
+
+
+class SparseLU:
+    def __init__(self, k):
+        """
+        SuperLU factorization of a general sparse matrix
+        :param k: Non-singular sparse stiffness matrix
+        """
+        self.lu = spla.splu(sparse.csc_matrix(k))
+
+    def solve(self, f):
+        """
+        :param f: force vector
+        :return: nodal displacement
+        """
+        return self.lu.solve(np.asarray(f, dtype=float)).reshape(f.shape)
+
+    def det_sign(self):
+        """
+        :return: sign of determinant, L has unit diagonal
+        """
+        negative = np.count_nonzero(self.lu.U.diagonal() < 0)
+        sign = permutation_sign(self.lu.perm_r) * permutation_sign(self.lu.perm_c)
+        return -sign if negative & 1 else sign
+
+
+class DenseLU:
+    def __init__(self, k):
+        """
+        :param k: Non-singular dense stiffness matrix
+        """
+        self.lu, self.piv = la.lu_factor(k)
+
+    def solve(self, f):
+        """
+        :param f: force vector
+        :return: nodal displacement
+        """
+        return la.lu_solve((self.lu, self.piv), f)
+
+    def det_sign(self):
+        """
+        :return: sign of determinant
+        """
+        swaps = np.count_nonzero(self.piv != np.arange(len(self.piv)))
+        negative = np.count_nonzero(np.diag(self.lu) < 0)
+        return -1 if (swaps + negative) & 1 else 1
+
+
+def factorize(k):
+    """
+    :param k: Non-singular stiffness matrix (dense or sparse)
+    :return: factorization with solve(f) and det_sign(), banded if k is block tridiagonal
+    """
+    if not sparse.issparse(k):
+        return DenseLU(k)
+    if blocksolver.is_block_tridiagonal_matrix(k):
+        return blocksolver.BandedLU(k)
+    return SparseLU(k)
+
+
+def negative_eigenvalues(k):
+    """
+    Inertia from an LDL^T (Sylvester), no eigensolve, a pair of eigenvalues crossing zero is seen
+    unlike with the sign of det
+    :param k: Stiffness matrix (dense or sparse), its symmetric part is factorized
+    :return: number of negative eigenvalues of (k + k^T) / 2
+    """
+    if sparse.issparse(k) and blocksolver.is_block_tridiagonal_matrix(k):
+        return blocksolver.block_ldl_inertia(k)
+    k = k.toarray() if sparse.issparse(k) else np.asarray(k, dtype=float)
+    _, d, _ = la.ldl(0.5 * (k + k.T))
+    # d is block diagonal with 1 x 1 and 2 x 2 blocks
+    return int(np.count_nonzero(la.eigvalsh(d) < 0))
+
+
+def get_displacement_vector_sparse(k, f):
+    """
+    :param k: Non-singular sparse stiffness matrix
+    :param f: force vector
+    :return: nodal displacement
+    """
+    return factorize(k).solve(f)
@@ -0,0 +1,119 @@
+"""
+Direct solver for block tridiagonal tangents
+A 1D rod with 2 noded elements couples only neighbouring nodes, so the tangent is block tridiagonal
+with dof x dof blocks and has bandwidth 2 * dof - 1, banded LU costs O(N b^3) instead of O(N^3)
+"""
+import numpy as np
+from scipy.linalg import lapack
+
+
+def is_block_tridiagonal(icon):
+    """
+    :param icon: connectivity matrix (as returned by get_connectivity_matrix)
+    :return: True if every element only connects neighbouring nodes
+    """
+    nodes = np.asarray(icon)[:, 1:]
+    return bool(np.all(nodes.max(axis=1) - nodes.min(axis=1) <= 1))
+
+
+def is_block_tridiagonal_matrix(k):
+    """
+    :param k: BSR matrix
+    :return: True if only blocks (i, i - 1), (i, i), (i, i + 1) are stored
+    """
+    if k.format != "bsr" or k.blocksize[0] != k.blocksize[1]:
+        return False
+    block_rows = np.repeat(np.arange(len(k.indptr) - 1), np.diff(k.indptr))
+    return bool(np.all(np.abs(k.indices - block_rows) <= 1))
+
+
+def to_banded(k):
+    """
+    LAPACK general band storage with room for the fill in of partial pivoting (?gbtrf)
+    :param k: block tridiagonal BSR matrix
+    :return: ab, kl (= ku)
+    """
+    b = k.blocksize[0]
+    n = k.shape[0]
+    kl = 2 * b - 1
+    block_rows = np.repeat(np.arange(len(k.indptr) - 1), np.diff(k.indptr))
+    r = np.arange(b)
+    # A(i, j) goes to ab[2 * kl + i - j, j], block offset and in-block offset are split
+    j = (k.indices * b)[:, None, None] + r[None, None, :]
+    row = ((block_rows - k.indices) * b + 2 * kl)[:, None, None] + (r[:, None] - r[None, :])[None]
+    ab = np.zeros((3 * kl + 1, n))
+    ab.ravel()[(row * n + j).ravel()] = k.data.ravel()
+    return ab, kl
+
+
+class BandedLU:
+    def __init__(self, k):
+        """
+        LU factorization with partial pivoting of a block tridiagonal matrix
+        :param k: block tridiagonal BSR matrix
+        """
+        ab, self.kl = to_banded(k)
+        self.lu, self.piv, info = lapack.dgbtrf(ab, self.kl, self.kl)
+        if info > 0:
+            raise np.linalg.LinAlgError("Singular matrix")
+
+    def solve(self, f):
+        """
+        :param f: force vector
+        :return: nodal displacement
+        """
+        x, info = lapack.dgbtrs(self.lu, self.kl, self.kl, f, self.piv)
+        return x.reshape(f.shape)
+
+    def det_sign(self):
+        """
+        sign of determinant from the pivots, (-1) ** (number of negative eigenvalues) for real spectra
+        :return: +1 or -1
+        """
+        swaps = np.count_nonzero(self.piv != np.arange(len(self.piv)))
+        negative = np.count_nonzero(self.lu[2 * self.kl] < 0)
+        return -1 if (swaps + negative) & 1 else 1
+
+
+def block_ldl_inertia(k):
+    """
+    Sylvester inertia of the symmetric part of a block tridiagonal matrix from its block LDL^T without pivoting,
+    D_i = A_i - B_i D_(i-1)^-1 B_i^T are dof x dof, k has as many negative eigenvalues as all D_i together
+    (sturm sequence check), O(N b^3) like the factorization itself
+    :param k: block tridiagonal BSR matrix
+    :return: number of negative eigenvalues of (k + k^T) / 2
+    """
+    b = k.blocksize[0]
+    nnod = k.shape[0] // b
+    block_rows = np.repeat(np.arange(nnod), np.diff(k.indptr))
+    data = k.data
+    diag = np.zeros((nnod, b, b))
+    lower = np.zeros((nnod, b, b))
+    upper = np.zeros((nnod, b, b))
+    offset = k.indices - block_rows
+    diag[block_rows[offset == 0]] = data[offset == 0]
+    # (i, i - 1) and (i - 1, i) blocks are stored in row i
+    lower[block_rows[offset == -1]] = data[offset == -1]
+    upper[block_rows[offset == 1] + 1] = data[offset == 1]
+    diag = 0.5 * (diag + diag.transpose(0, 2, 1))
+    lower = 0.5 * (lower + upper.transpose(0, 2, 1))
+    negative = 0
+    d = diag[0]
+    for i in range(1, nnod + 1):
+        w, v = np.linalg.eigh(d)
+        negative += np.count_nonzero(w < 0)
+        if i == nnod:
+            break
+        # B D^-1 B^T with D = V W V^T
+        x = lower[i] @ v
+        d = diag[i] - (x / w) @ x.T
+    return negative
+
+
+def get_displacement_vector_banded(k, f):
+    """
+    :param k: Non-singular block tridiagonal BSR matrix
+    :param f: force vector
+    :return: nodal displacement
+    """
+    return BandedLU(k).solve(f)
@@ -0,0 +1,51 @@
+"""
+Checkpoints of load stepping
+everything needed to carry on (configuration, gauss point history, load index, step size) is written to one .npz,
+the file is replaced atomically so a run killed while writing still leaves the previous checkpoint behind
+"""
+import os
+import numpy as np
+
+
+def save_checkpoint(file, **state):
+    """
+    :param file: path of the .npz
+    :param state: arrays and scalars, dicts are stored flat as "name.key"
+    """
+    flat = {}
+    for name, value in state.items():
+        if isinstance(value, dict):
+            flat.update({name + "." + key: v for key, v in value.items()})
+        elif value is not None:
+            flat[name] = value
+    os.makedirs(os.path.dirname(file) or ".", exist_ok=True)
+    tmp = file + ".tmp.npz"
+    np.savez(tmp, **flat)
+    os.replace(tmp, file)
+
+
+def load_checkpoint(file):
+    """
+    :param file: path of the .npz written by save_checkpoint
+    :return: dict of saved state, scalars as python numbers, "name.key" entries gathered back into dicts
+    """
+    state = {}
+    with np.load(file) as data:
+        for key in data.files:
+            value = data[key].item() if data[key].ndim == 0 else data[key]
+            if "." in key:
+                name, sub = key.split(".", 1)
+                state.setdefault(name, {})[sub] = value
+            else:
+                state[key] = value
+    return state
+
+
+def remaining_steps(loads, load):
+    """
+    :param loads: load factors of a fixed stepping (may be extended to higher loads than the checkpointed run)
+    :param load: load factor of the checkpoint
+    :return: indices of loads beyond the checkpoint
+    """
+    loads = np.abs(loads)
+    return [i for i in range(len(loads)) if loads[i] > abs(load) * (1 + 1e-12)]
@@ -0,0 +1,182 @@
+"""
+Dirichlet constraints
+Free / fixed dof sets are computed once, every constrained dof is eliminated in one pass
+(instead of zeroing a row and a column per dof), the sparsity pattern is left untouched so the
+same (banded) factorization path is used every iteration
+"""
+import numpy as np
+from scipy import sparse
+from include import assembly
+
+
+class Constraints:
+    def __init__(self, ndof, fixed, assembler=None):
+        """
+        :param ndof: total number of dofs
+        :param fixed: constrained dofs (negative indices count from the end)
+        :param assembler: SparseAssembler whose BSR pattern every BSR stiffness shares, masks are then built once,
+                          without it the pattern of every sparse stiffness is compared with the cached one
+        """
+        self.ndof = ndof
+        self.assembler = assembler
+        self.fixed = np.unique(np.asarray(list(fixed), dtype=np.int64) % ndof)
+        self.free = np.setdiff1d(np.arange(ndof), self.fixed)
+        self.is_fixed = np.zeros(ndof, dtype=bool)
+        self.is_fixed[self.fixed] = True
+        self._pattern = None
+        self._key = None
+        self._indptr = None
+        self._mask = None
+        self._diag = None
+        self.lu = None
+        self.k = None
+
+    def increment(self, prescribed=None):
+        """
+        :param prescribed: {dof: prescribed increment}, unspecified fixed dofs do not move
+        :return: increment of fixed dofs, (ndof, 1)
+        """
+        dc = np.zeros((self.ndof, 1))
+        for ibc, value in (prescribed or {}).items():
+            ibc = ibc % self.ndof
+            if not self.is_fixed[ibc]:
+                raise ValueError("dof %d is not constrained" % ibc)
+            dc[ibc] = value
+        return dc
+
+    def _masks(self, k):
+        """
+        entries of k lying in a fixed row or column and diagonal entries of fixed dofs,
+        cached as long as the pattern does not change
+        """
+        b = k.blocksize[0] if k.format == "bsr" else 1
+        assembler = self.assembler
+        if assembler is not None and k.format == "bsr" and b == assembler.dof:
+            if len(k.indices) != assembler.nnzb or len(k.indptr) != len(assembler.indptr):
+                raise ValueError("BSR stiffness is not in the pattern of the assembler")
+            indices, indptr = assembler.indices, assembler.indptr
+            if self._pattern is indices:
+                return self._mask, self._diag
+        else:
+            indices, indptr = k.indices, k.indptr
+            if (self._pattern is not None and self._key == (k.shape, b) and len(self._pattern) == len(indices)
+                    and np.array_equal(self._pattern, indices) and np.array_equal(self._indptr, indptr)):
+                return self._mask, self._diag
+        block_rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        r = np.arange(b)
+        row = (block_rows * b)[:, None, None] + r[None, :, None]
+        col = (indices * b)[:, None, None] + r[None, None, :]
+        self._mask = (self.is_fixed[row] | self.is_fixed[col]).ravel()
+        self._diag = np.flatnonzero((self.is_fixed[row] & (row == col)).ravel())
+        self._pattern = indices
+        self._indptr = indptr
+        self._key = (k.shape, b)
+        return self._mask, self._diag
+
+    def apply(self, k, f=None, prescribed=None):
+        """
+        Elimination of all constrained dofs at once, modifies incoming stiffness
+        (fixed rows and columns are zeroed and their diagonal set to 1)
+        :param k: Stiffness matrix / Tangent stiffness (dense, BSR or CSR)
+        :param f: force vector / residue, None if only stiffness is to be modified
+        :param prescribed: {dof: prescribed increment}
+        :return: right hand side of k @ du = -f with prescribed increments folded in, None if f is None
+        """
+        rhs = None
+        if f is not None:
+            dc = self.increment(prescribed)
+            rhs = -f - k @ dc if prescribed else -np.array(f, dtype=float)
+            rhs[self.fixed] = dc[self.fixed]
+        if sparse.issparse(k):
+            if k.format not in ("bsr", "csr"):
+                raise TypeError("only BSR / CSR storage")
+            mask, diag = self._masks(k)
+            data = k.data.reshape(-1)
+            data[mask] = 0
+            data[diag] = 1
+        else:
+            k[self.fixed, :] = 0
+            k[:, self.fixed] = 0
+            k[self.fixed, self.fixed] = 1
+        return rhs
+
+    def solve(self, k, f, prescribed=None):
+        """
+        :param k: Stiffness matrix / Tangent stiffness (dense, BSR or CSR), modified in place
+        :param f: force vector / residue
+        :param prescribed: {dof: prescribed increment}
+        :return: increment du, with k_ff du_f = -(f_f + k_fc du_c), factorization is kept in self.lu
+                 and the constrained k in self.k
+        """
+        if not sparse.issparse(k):
+            dc = self.increment(prescribed)
+            rhs = -f - k @ dc
+            du = dc
+            self.lu = assembly.factorize(k[np.ix_(self.free, self.free)])
+            du[self.free] = self.lu.solve(rhs[self.free])
+            self.apply(k)
+            self.k = k
+            return du
+        rhs = self.apply(k, f, prescribed)
+        self.lu = assembly.factorize(k)
+        self.k = k
+        return self.lu.solve(rhs)
+
+    def resolve(self, f):
+        """
+        Another right hand side with the factorization of the last solve, constrained dofs are held
+        :param f: force vector / residue
+        :return: increment du, with k_ff du_f = -f_f
+        """
+        if self.lu is None:
+            raise ValueError("nothing factorized yet, call solve first")
+        if isinstance(self.lu, assembly.DenseLU):
+            return self.expand(self.lu.solve(-f[self.free]))
+        rhs = -np.array(f, dtype=float)
+        rhs[self.fixed] = 0
+        return self.lu.solve(rhs)
+
+    def det_sign(self):
+        """
+        Stability indicator at no extra cost, taken from the factorization of the last solve
+        eliminated dofs only add unit eigenvalues, so this is the sign of det of the free-free block
+        :return: +1 or -1, flips whenever an odd number of eigenvalues crosses zero
+        """
+        return self.lu.det_sign()
+
+    def negative_eigenvalues(self, k=None):
+        """
+        Inertia of the free-free block, eliminated dofs only add unit eigenvalues
+        :param k: constrained stiffness (see apply), the one of the last solve if None
+        :return: number of negative eigenvalues, also counts pairs crossing zero which det_sign misses
+        """
+        k = self.k if k is None else k
+        if k is None:
+            raise ValueError("nothing solved yet, call solve first or pass k")
+        return assembly.negative_eigenvalues(k)
+
+    def reduce(self, k):
+        """
+        :param k: Stiffness matrix (dense or sparse)
+        :return: free-free block
+        """
+        if sparse.issparse(k):
+            k = k.tocsr()
+            return k[self.free][:, self.free]
+        return k[np.ix_(self.free, self.free)]
+
+    def expand(self, x_free):
+        """
+        :param x_free: vector over free dofs, (nfree, ...)
+        :return: full vector with zeros on fixed dofs
+        """
+        x = np.zeros((self.ndof,) + np.shape(x_free)[1:], dtype=np.result_type(x_free))
+        x[self.free] = x_free
+        return x
+
+    def residue_norm(self, f):
+        """
+        :param f: residue
+        :return: norm of out of balance force on free dofs
+        """
+        return np.linalg.norm(f[self.free])
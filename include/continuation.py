@@ -0,0 +1,114 @@
+"""
+Pseudo-arclength continuation
+Load factor is an unknown, every step is constrained to the hyperplane normal to the path tangent at distance ds,
+so the path is followed through limit points, ds adapts to the number of corrector iterations
+Both right hand sides of the bordered system (residue and load vector) use one factorization per iteration
+"""
+import numpy as np
+from include.staticsolver import StaticSolver, EquilibriumPath, NewtonResult, adapt_step
+
+
+class ArcLengthSolver(StaticSolver):
+    def __init__(self, problem, ds=0.1, ds_min=1e-6, ds_max=1, load_scale=1, desired_iter=5, max_iter=20,
+                 tol_increment=1e-6, tol_residue=1e-3):
+        """
+        :param problem: problem definition, load_vector(u, load) is used if provided (finite difference otherwise)
+        :param ds: initial arclength
+        :param ds_min: smallest arclength before giving up
+        :param ds_max: largest arclength
+        :param load_scale: load factor is measured in units of load_scale in the arclength norm
+        :param desired_iter: corrector iterations aimed at, ds grows / shrinks accordingly
+        :param max_iter: max corrector iterations, step is retried with half the arclength beyond it
+        :param tol_increment: tolerance on norm of increment
+        :param tol_residue: tolerance on norm of out of balance force
+        """
+        super().__init__(problem, max_iter, tol_increment, tol_residue)
+        self.ds = ds
+        self.ds_min = ds_min
+        self.ds_max = ds_max
+        self.load_scale = load_scale
+        self.desired_iter = desired_iter
+
+    def _tangent(self, v, previous=None):
+        """
+        :param v: du / dload
+        :param previous: previous tangent (tu, tl) for orientation
+        :return: unit tangent (tu, tl) in the scaled norm
+        """
+        tu, tl = v * self.load_scale, 1.0
+        norm = np.sqrt(np.sum(tu * tu) + tl * tl)
+        tu, tl = tu / norm, tl / norm
+        if previous is not None and np.sum(tu * previous[0]) + tl * previous[1] < 0:
+            tu, tl = -tu, -tl
+        return tu, tl
+
+    def corrector(self, u0, load0, tangent, ds):
+        """
+        :param u0: converged configuration
+        :param load0: converged load factor
+        :param tangent: unit tangent at (u0, load0)
+        :param ds: arclength
+        :return: NewtonResult, load factor, du / dload at the new point
+        """
+        problem = self.problem
+        constraints = problem.constraints
+        c = self.load_scale
+        tu, tl = tangent
+        u = problem.update(u0, ds * tu)
+        load = load0 + ds * tl * c
+        residue_norm = increments_norm = 0
+        for iter_ in range(self.max_iter):
+            k, f = problem.assemble(u, load)
+            q = self.load_vector(u, load, f)
+            a = constraints.solve(k, f, problem.prescribed(u, load))
+            b = constraints.resolve(q)
+            residue_norm = constraints.residue_norm(f)
+            # scaled distance from the hyperplane
+            g = np.sum(tu * (u - u0)) + tl * (load - load0) / c - ds
+            dl = -(g + np.sum(tu * a)) / (np.sum(tu * b) + tl / c)
+            du = a + dl * b
+            increments_norm = np.linalg.norm(du)
+            if increments_norm < self.tol_increment and residue_norm < self.tol_residue:
+                return NewtonResult(u, True, iter_, residue_norm, increments_norm, constraints.det_sign()), load, b
+            u = problem.update(u, du)
+            load += dl
+        return NewtonResult(u, False, self.max_iter, residue_norm, increments_norm, constraints.det_sign()), load, None
+
+    def trace(self, load_max, u=None, load=0, max_steps=1000, callback=None):
+        """
+        :param load_max: path is started towards load_max and stopped once |load| exceeds it
+        :param u: starting (converged) configuration, problem.initial_state() if None
+        :param load: load factor of u
+        :param max_steps: max number of continuation steps
+        :param callback: called as callback(step, load, u, result) after every step, returning True stops
+        :return: EquilibriumPath
+        """
+        problem = self.problem
+        u = problem.initial_state() if u is None else u
+        start = self.newton(u, load)
+        u = start.u
+        path = EquilibriumPath()
+        path.append(load, u, start)
+        k, f = problem.assemble(u, load)
+        problem.constraints.solve(k, f)
+        tangent = self._tangent(problem.constraints.resolve(self.load_vector(u, load, f)))
+        if tangent[1] * (load_max - load) < 0:
+            tangent = (-tangent[0], -tangent[1])
+        ds = self.ds
+        for step in range(max_steps):
+            result, new_load, v = self.corrector(u, load, tangent, ds)
+            if not result.converged:
+                path.rejected.append((new_load, result.iterations))
+                ds *= 0.5
+                if ds < self.ds_min:
+                    break
+                continue
+            u, load = result.u, new_load
+            path.append(load, u, result)
+            tangent = self._tangent(v, tangent)
+            ds = min(self.ds_max, adapt_step(ds, result.iterations, self.desired_iter))
+            if callback is not None and callback(step, load, u, result):
+                break
+            if abs(load) >= abs(load_max):
+                break
+        return path
@@ -0,0 +1,66 @@
+"""
+Reference mesh with quadrature tables and gather indices
+The reference configuration never changes, so shape functions, their derivatives,
+jacobian times weight and element dof indices are evaluated once at setup
+"""
+import numpy as np
+from include import solver1d as sol
+
+
+class Mesh:
+    def __init__(self, icon, node_data, dof, wgp, gp, element_type=2, hermite_fn=None):
+        """
+        :param icon: connectivity matrix (as returned by get_connectivity_matrix)
+        :param node_data: nodal coordinates
+        :param dof: dof per node
+        :param wgp: weights of gauss points
+        :param gp: gauss points
+        :param element_type: element type
+        :param hermite_fn: get_hermite_fn for (r, r') interpolation, lagrange is used if None
+        """
+        self.icon = np.asarray(icon)
+        self.node_data = np.asarray(node_data)
+        self.nodes = self.icon[:, 1:]
+        self.nelem, self.npe = self.nodes.shape
+        self.nnod = len(self.node_data)
+        self.dof = dof
+        # same ordering as SparseAssembler.iv, element dofs node by node
+        self.iv = (dof * self.nodes[:, :, None] + np.arange(dof)).reshape(self.nelem, self.npe * dof)
+        self.wgp = np.asarray(wgp, dtype=float)
+        self.gp = np.asarray(gp, dtype=float)
+        self.ngp = len(self.gp)
+        self.element_type = element_type
+        self.hermite = hermite_fn is not None
+
+        xloc = self.node_data[self.nodes]
+        nfn = 2 * self.npe if self.hermite else self.npe
+        self.jac = np.zeros((self.nelem, self.ngp))
+        self.n = np.zeros((self.nelem, self.ngp, nfn))
+        self.nx = np.zeros((self.nelem, self.ngp, nfn))
+        self.nxx = np.zeros((self.nelem, self.ngp, nfn))
+        for xgp in range(self.ngp):
+            if self.hermite:
+                self.jac[:, xgp] = (xloc[:, -1] - xloc[:, 0]) / 2
+                h, hx, hxx = hermite_fn(np.full(self.nelem, self.gp[xgp]), self.jac[:, xgp], element_type)
+                self.n[:, xgp], self.nx[:, xgp], self.nxx[:, xgp] = h.T, hx.T, hxx.T
+            else:
+                n_, bmat = sol.get_lagrange_fn(self.gp[xgp], element_type)
+                self.jac[:, xgp] = xloc @ bmat[:, 0]
+                self.n[:, xgp] = n_[:, 0]
+                self.nx[:, xgp] = bmat[:, 0] / self.jac[:, xgp, None]
+        self.wj = self.wgp * self.jac
+
+    def gather(self, u):
+        """
+        :param u: global vector, (nnod * dof, 1)
+        :return: element values, (nelem, npe, dof)
+        """
+        return u[self.iv, 0].reshape(self.nelem, self.npe, self.dof)
+
+    def at_gauss_points(self, xloc, d=0):
+        """
+        :param xloc: element coefficients of the shape functions, (nelem, nfn, ...)
+        :param d: derivative order (0, 1 or 2)
+        :return: interpolated values, (nelem, ngp, ...)
+        """
+        return np.einsum('egn,en...->eg...', (self.n, self.nx, self.nxx)[d], xloc)
@@ -0,0 +1,156 @@
+"""
+On disk equilibrium path
+converged states are streamed into a preallocated memory mapped .npy (steps x dofs), load factors, norms,
+iteration counts and optional eigenvalues of every step are appended as one line to steps.jsonl and
+index.json only holds what is fixed for the run, so the cost of a step does not grow with the path
+and long load paths can be re-plotted without re-solving or holding every state in RAM
+"""
+import json
+import os
+import numpy as np
+
+STATES = "states.npy"
+INDEX = "index.json"
+STEPS = "steps.jsonl"
+FIELDS = ("loads", "residue_norms", "increments_norms", "iterations", "converged", "det_signs", "eigenvalues")
+
+
+class PathStore:
+    def __init__(self, directory, ndof=None, capacity=64, mode="w", meta=None):
+        """
+        :param directory: folder holding states.npy, steps.jsonl and index.json, created if needed
+        :param ndof: number of dofs, only needed for a new store
+        :param capacity: preallocated number of steps, doubled whenever full
+        :param mode: "w" new store (overwrites), "a" append to existing store, "r" read only
+        :param meta: json serializable dict saved with a new store (parameters of the run etc.)
+        """
+        self.directory = directory
+        self.mode = mode
+        self._steps = None
+        if mode == "w":
+            if ndof is None:
+                raise ValueError("ndof is needed for a new store")
+            os.makedirs(directory, exist_ok=True)
+            self.index = {"ndof": int(ndof), "meta": meta or {}}
+            tmp = self._file(INDEX + ".tmp")
+            with open(tmp, "w") as file:
+                json.dump(self.index, file)
+            os.replace(tmp, self._file(INDEX))
+            self._states = np.lib.format.open_memmap(self._file(STATES), "w+", np.float64, (capacity, ndof))
+            self._steps = open(self._file(STEPS), "w")
+            self.index.update({field: [] for field in FIELDS})
+        elif mode in ("a", "r"):
+            with open(self._file(INDEX)) as file:
+                self.index = json.load(file)
+            self.index.update({field: [] for field in FIELDS})
+            with open(self._file(STEPS), "rb") as file:
+                lines = file.read().split(b"\n")
+            # a line cut short by a crash is dropped, states of the step are simply overwritten
+            for line in lines[:-1]:
+                record = json.loads(line)
+                for field in FIELDS:
+                    self.index[field].append(record[field])
+            self._states = np.load(self._file(STATES), mmap_mode="r+" if mode == "a" else "r")
+            # rows past the last step are preallocated, a step without its row means states.npy is not this run's
+            if self._states.shape[1] != self.index["ndof"] or len(self._states) < len(self):
+                raise ValueError("%s holds %d states of %d dofs, %s has %d steps of %d dofs"
+                                 % (STATES, len(self._states), self._states.shape[1], STEPS, len(self),
+                                    self.index["ndof"]))
+            if mode == "a":
+                self._steps = open(self._file(STEPS), "a")
+                self._steps.truncate(sum(len(line) + 1 for line in lines[:-1]))
+        else:
+            raise ValueError("mode must be one of 'w', 'a', 'r'")
+
+    def _file(self, name):
+        return os.path.join(self.directory, name)
+
+    def _grow(self):
+        """
+        copies states into a memmap twice as large, the old file is replaced
+        """
+        steps, ndof = self._states.shape
+        tmp = self._file(STATES + ".tmp")
+        states = np.lib.format.open_memmap(tmp, "w+", np.float64, (2 * steps, ndof))
+        states[:steps] = self._states
+        states.flush()
+        del states
+        self._states = None
+        os.replace(tmp, self._file(STATES))
+        self._states = np.load(self._file(STATES), mmap_mode="r+")
+
+    def append(self, load, u, result=None, eigenvalues=None):
+        """
+        :param load: load factor
+        :param u: converged configuration
+        :param result: NewtonResult of the load step (norms, iterations, convergence and det sign are kept)
+        :param eigenvalues: eigenvalues of the tangent at u (see StabilityMonitor)
+        """
+        if self.mode == "r":
+            raise ValueError("store is opened read only")
+        step = len(self)
+        if step == len(self._states):
+            self._grow()
+        self._states[step] = np.ravel(u)
+        record = {"loads": float(load),
+                  "residue_norms": None if result is None else float(result.residue_norm),
+                  "increments_norms": None if result is None else float(result.increments_norm),
+                  "iterations": None if result is None else int(result.iterations),
+                  "converged": None if result is None else bool(result.converged),
+                  "det_signs": None if result is None else int(result.det_sign),
+                  "eigenvalues": None if eigenvalues is None else np.real(eigenvalues).tolist()}
+        for field in FIELDS:
+            self.index[field].append(record[field])
+        # state first, the step only counts once its line is complete
+        self._states.flush()
+        self._steps.write(json.dumps(record) + "\n")
+        self._steps.flush()
+
+    def __call__(self, step, load, u, result):
+        """
+        callback(step, load, u, result) of StaticSolver.solve, solve_adaptive and ArcLengthSolver.trace
+        :return: False, never stops the solver
+        """
+        self.append(load, u, result)
+        return False
+
+    def close(self):
+        """
+        flushes states and closes steps.jsonl, the store can be reopened with mode "r" or "a"
+        """
+        if self._steps is not None:
+            self._states.flush()
+            self._steps.close()
+            self._steps = None
+
+    def __len__(self):
+        return len(self.index["loads"])
+
+    def __getitem__(self, step):
+        """
+        :param step: load step
+        :return: configuration (ndof, 1), a view on the memmap
+        """
+        return self.states[step][:, None]
+
+    @property
+    def states(self):
+        """
+        :return: memory mapped configurations of every stored step, (steps, ndof)
+        """
+        return self._states[:len(self)]
+
+    @property
+    def loads(self):
+        return np.array(self.index["loads"])
+
+    @property
+    def meta(self):
+        return self.index["meta"]
+
+    def field(self, name):
+        """
+        :param name: one of FIELDS
+        :return: values of every stored step, None where not recorded
+        """
+        return self.index[name]
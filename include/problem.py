@@ -0,0 +1,310 @@
+"""
+Classical (6 dof) and strain gradient (12 dof) cosserat rods as headless problem definitions
+classical rotations are interpolated with quaternions (slerp), see classical_rod.py,
+strain gradient rods interpolate [r, r', theta, theta'] with hermite functions, see unclassical_graph.py
+"""
+import numpy as np
+from include import solver1d as sol, slerp as slerpsol, so3
+from gradientsolver import solver1d as gsol
+from include.assembly import SparseAssembler
+from include.mesh import Mesh
+from include.constraints import Constraints
+
+DOF = 6
+GDOF = 12
+
+
+class RodProblem:
+    def __init__(self, elasticity_extension, elasticity_bending, number_of_elements=20, length=1, ngpt=1,
+                 element_type=2, fixed=range(6), tip_load=(0, 1, 0), follower=True, prescribed=None):
+        """
+        :param elasticity_extension: extension / shear elasticity, 3x3
+        :param elasticity_bending: bending / torsion elasticity, 3x3
+        :param number_of_elements: number of elements
+        :param length: length of rod
+        :param ngpt: number of gauss points
+        :param element_type: element type
+        :param fixed: constrained dofs
+        :param tip_load: tip load per unit load factor (in material frame if follower)
+        :param follower: follower load if True, dead load otherwise
+        :param prescribed: callable (u, load) -> {dof: prescribed increment}, None if constrained dofs are held
+        """
+        self.dof = DOF
+        self.length = length
+        self.number_of_elements = number_of_elements
+        self.icon, self.node_data = sol.get_connectivity_matrix(number_of_elements, length, element_type)
+        self.number_of_nodes = len(self.node_data)
+        self.ndof = self.number_of_nodes * DOF
+        wgp, gp = sol.init_gauss_points(ngpt)
+        self.assembler = SparseAssembler(self.icon, self.number_of_nodes, DOF)
+        self.mesh = Mesh(self.icon, self.node_data, DOF, wgp, gp, element_type)
+        self.constraints = Constraints(self.ndof, fixed, self.assembler)
+        self.elasticity_extension = np.asarray(elasticity_extension, dtype=float)
+        self.elasticity_bending = np.asarray(elasticity_bending, dtype=float)
+        self.elasticity = np.zeros((6, 6))
+        self.elasticity[0: 3, 0: 3] = self.elasticity_extension
+        self.elasticity[3: 6, 3: 6] = self.elasticity_bending
+        self.tip_load = np.asarray(tip_load, dtype=float)
+        self.follower = follower
+        self._prescribed = prescribed
+        self._assembler0 = None
+        self._assemblerG = None
+
+    def initial_state(self):
+        """
+        :return: straight rod lying along E3, thetas are zero
+        """
+        u = np.zeros((self.ndof, 1))
+        u[DOF * np.arange(self.number_of_nodes) + 2, 0] = self.node_data
+        return u
+
+    def prescribed(self, u, load):
+        """
+        :param u: current configuration
+        :param load: load factor
+        :return: {dof: prescribed increment}
+        """
+        return self._prescribed(u, load) if self._prescribed is not None else None
+
+    def _tip_force(self, u, load):
+        """
+        :param u: current configuration
+        :param load: load factor
+        :return: tip force in global frame, (3, 1)
+        """
+        if self.follower:
+            return sol.get_rotation_from_theta_tensor(u[-3:, 0]) @ (load * self.tip_load)[:, None]
+        return (load * self.tip_load)[:, None]
+
+    def _stresses(self, u):
+        """
+        :param u: current configuration
+        :return: rotation, rds, stress resultants [n, m] at gauss points
+        """
+        mesh = self.mesh
+        ue = mesh.gather(u)
+        rdsg = mesh.at_gauss_points(ue[..., 0: 3], 1)
+        qe = so3.quat_from_rotation_vector(ue[..., 3: 6])
+        qg = slerpsol.slerp_batched(qe[:, None, 0], qe[:, None, 1], mesh.n)
+        dqg = slerpsol.diff_slerp_batched(qe[:, None, 0], qe[:, None, 1], mesh.nx, mesh.n)
+        rotg = so3.quat_to_rotation(qg)
+        kg = so3.quat_curvature(qg, dqg)
+        glocg = sol.get_stress_resultants_batched(rotg, rdsg, kg, self.elasticity_extension, self.elasticity_bending)
+        return rotg, rdsg, glocg
+
+    def assemble(self, u, load, buckling=False):
+        """
+        :param u: current configuration
+        :param load: load factor
+        :param buckling: also return material and geometric part of tangent
+        :return: tangent stiffness (BSR), residue (, material stiffness, geometric stiffness)
+        """
+        mesh = self.mesh
+        assembler = self.assembler
+        assembler.reset()
+        fg = assembler.force
+        s = self._tip_force(u, load)
+        fg[-6: -3] = s
+        rotg, rdsg, glocg = self._stresses(u)
+        out = sol.get_tangent_stiffness_residue_batched(glocg, mesh.n, mesh.nx, rotg, self.elasticity, rdsg, mesh.wj,
+                                                        buckling)
+        assembler.add_all(out[0], out[1])
+        if self.follower:
+            f = np.zeros((DOF, DOF))
+            f[0: 3, 3: 6] = -sol.skew(s)
+            assembler.add_nodal(self.number_of_nodes - 1, f)
+        if not buckling:
+            return assembler.tobsr(), fg.copy()
+        if self._assembler0 is None:
+            self._assembler0 = SparseAssembler(self.icon, self.number_of_nodes, DOF)
+            self._assemblerG = SparseAssembler(self.icon, self.number_of_nodes, DOF)
+        self._assembler0.reset()
+        self._assemblerG.reset()
+        self._assembler0.add_all(out[2], out[1])
+        self._assemblerG.add_all(out[3], out[1])
+        return assembler.tobsr(), fg.copy(), self._assembler0.tobsr(), self._assemblerG.tobsr()
+
+    def residue(self, u, load):
+        """
+        out of balance force only, tangent blocks are neither computed nor assembled
+        :param u: current configuration
+        :param load: load factor
+        :return: residue, (ndof, 1)
+        """
+        mesh = self.mesh
+        _, rdsg, glocg = self._stresses(u)
+        fg = self.assembler.scatter_force(sol.get_residue_batched(glocg, mesh.n, mesh.nx, rdsg, mesh.wj))
+        fg[-6: -3] += self._tip_force(u, load)
+        return fg
+
+    def load_vector(self, u, load):
+        """
+        :param u: current configuration
+        :param load: load factor
+        :return: derivative of residue w.r.t. load factor, (ndof, 1)
+        """
+        q = np.zeros((self.ndof, 1))
+        if self.follower:
+            q[-6: -3] = sol.get_rotation_from_theta_tensor(u[-3:, 0]) @ self.tip_load[:, None]
+        else:
+            q[-6: -3] = self.tip_load[:, None]
+        return q
+
+    def update(self, u, du):
+        """
+        Multiplicative configuration update, R_(i+1) = exp(dtheta_i) * R_i
+        :param u: current configuration
+        :param du: increment
+        :return: updated configuration
+        """
+        return so3.update_configuration(u, du, DOF)
+
+
+def gradient_elasticity(e0, g0, area, i0, j, l0, alpha=1):
+    """
+    Elasticities of the strain gradient rod with circular cross section
+    :param e0: young's modulus
+    :param g0: shear modulus
+    :param area: area of cross section
+    :param i0: second moment of area
+    :param j: polar moment of area
+    :param l0: length scale parameter
+    :param alpha: bending stiffness about E1 relative to E2
+    :return: extension, bending, higher order extension, higher order bending elasticity (3x3 each)
+    """
+    es = np.diag([g0 * area, g0 * area, e0 * area])
+    eb = np.diag([alpha * e0 * i0 + l0 ** 2 * e0 * area, e0 * i0 + l0 ** 2 * e0 * area, g0 * j + 2 * l0 ** 2 * g0 * area])
+    esh = l0 ** 2 * es
+    ebh = l0 ** 2 * np.diag([alpha * e0 * i0, e0 * i0, g0 * j])
+    return es, eb, esh, ebh
+
+
+class GradientRodProblem:
+    def __init__(self, elasticity, number_of_elements=20, length=1, ngpt=3, fixed=range(12), nodal_load=None,
+                 prescribed=None, tip_load=None, follower=True):
+        """
+        :param elasticity: extension, bending, higher order extension, higher order bending elasticity,
+                           see gradient_elasticity
+        :param number_of_elements: number of elements
+        :param length: length of rod
+        :param ngpt: number of gauss points
+        :param fixed: constrained dofs
+        :param nodal_load: {dof: dead load per unit load factor}
+        :param prescribed: callable (u, load) -> {dof: prescribed increment}, None if constrained dofs are held
+        :param tip_load: force on r at s = L per unit load factor (in material frame if follower), None if unloaded
+        :param follower: follower tip load if True, dead load otherwise
+        """
+        self.dof = GDOF
+        self.length = length
+        self.number_of_elements = number_of_elements
+        self.icon, self.node_data = gsol.get_connectivity_matrix(number_of_elements, length, 2)
+        self.number_of_nodes = len(self.node_data)
+        self.ndof = self.number_of_nodes * GDOF
+        wgp, gp = gsol.init_gauss_points(ngpt)
+        self.assembler = SparseAssembler(self.icon, self.number_of_nodes, GDOF)
+        self.mesh = Mesh(self.icon, self.node_data, GDOF, wgp, gp, 2, gsol.get_hermite_fn)
+        self.constraints = Constraints(self.ndof, fixed, self.assembler)
+        self.elasticity = [np.asarray(c, dtype=float) for c in elasticity]
+        self.nodal_load = {} if nodal_load is None else nodal_load
+        self._prescribed = prescribed
+        self.tip_load = None if tip_load is None else np.asarray(tip_load, dtype=float)
+        self.follower = follower
+
+    def initial_state(self):
+        """
+        :return: straight rod lying along E3, r' = E3, thetas are zero
+        """
+        u = np.zeros((self.ndof, 1))
+        u[GDOF * np.arange(self.number_of_nodes) + 2, 0] = self.node_data
+        u[GDOF * np.arange(self.number_of_nodes) + 5, 0] = 1
+        return u
+
+    def prescribed(self, u, load):
+        """
+        :param u: current configuration
+        :param load: load factor
+        :return: {dof: prescribed increment}
+        """
+        return self._prescribed(u, load) if self._prescribed is not None else None
+
+    def load_vector(self, u, load):
+        """
+        :param u: current configuration
+        :param load: load factor
+        :return: derivative of residue w.r.t. load factor, (ndof, 1)
+        """
+        q = np.zeros((self.ndof, 1))
+        for i, v in self.nodal_load.items():
+            q[i, 0] = v
+        if self.tip_load is not None:
+            q[-12: -9] += self._tip_force(u, 1)
+        return q
+
+    def _tip_force(self, u, load):
+        """
+        :param u: current configuration
+        :param load: load factor
+        :return: tip force in global frame, (3, 1)
+        """
+        if self.follower:
+            return gsol.get_rotation_from_theta_tensor(u[-6: -3, 0]) @ (load * self.tip_load)[:, None]
+        return (load * self.tip_load)[:, None]
+
+    def _stresses(self, u):
+        """
+        :param u: current configuration
+        :return: rds, rdsds, rotation, its derivative, curvature, stress resultants [n, nb, m, mb] at gauss points
+        """
+        mesh = self.mesh
+        es, eb, esh, ebh = self.elasticity
+        ue = mesh.gather(u)
+        rloc = ue[..., 0: 6].reshape(mesh.nelem, 4, 3)
+        tloc = ue[..., 6: 12].reshape(mesh.nelem, 4, 3)
+        rdsg = mesh.at_gauss_points(rloc, 1)
+        rdsdsg = mesh.at_gauss_points(rloc, 2)
+        kg = mesh.at_gauss_points(tloc, 1)
+        kpg = mesh.at_gauss_points(tloc, 2)
+        rotg = so3.exp(mesh.at_gauss_points(tloc))
+        rotdsg = rotg @ so3.skew(kg)
+        glocg = gsol.get_higher_order_stress_resultants_batched(rotg, rotdsg, rdsg, rdsdsg, kg, kpg, es, eb, esh, ebh)
+        return rdsg, rdsdsg, rotg, rotdsg, kg, glocg
+
+    def assemble(self, u, load):
+        """
+        :param u: current configuration
+        :param load: load factor
+        :return: tangent stiffness (BSR), residue
+        """
+        mesh = self.mesh
+        assembler = self.assembler
+        assembler.reset()
+        rdsg, rdsdsg, rotg, rotdsg, kg, glocg = self._stresses(u)
+        tangent, res = gsol.get_higher_order_tangent_residue_batched(mesh.n, mesh.nx, mesh.nxx, rdsg, rdsdsg, rotg, rotdsg,
+                                                                     *self.elasticity, kg, glocg, mesh.wj)
+        assembler.add_all(tangent, res)
+        if self.tip_load is not None and self.follower:
+            f = np.zeros((GDOF, GDOF))
+            f[0: 3, 6: 9] = -gsol.skew(self._tip_force(u, load))
+            assembler.add_nodal(self.number_of_nodes - 1, f)
+        return assembler.tobsr(), assembler.force + load * self.load_vector(u, load)
+
+    def residue(self, u, load):
+        """
+        out of balance force only, tangent blocks are neither computed nor assembled
+        :param u: current configuration
+        :param load: load factor
+        :return: residue, (ndof, 1)
+        """
+        mesh = self.mesh
+        rdsg, rdsdsg, _, _, _, glocg = self._stresses(u)
+        r = gsol.get_higher_order_residue_batched(mesh.n, mesh.nx, mesh.nxx, rdsg, rdsdsg, glocg, mesh.wj)
+        return self.assembler.scatter_force(r) + load * self.load_vector(u, load)
+
+    def update(self, u, du):
+        """
+        Multiplicative update of theta, r, r' and theta' are added
+        :param u: current configuration
+        :param du: increment
+        :return: updated configuration
+        """
+        return so3.update_configuration(u, du, GDOF, (6,))
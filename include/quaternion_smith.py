@@ -1,4 +1,5 @@
 import numpy as np
+from include import so3
 
 eTOL = 1e-8
 
@@ -8,11 +9,7 @@ def skew(x):
     :param x: vector
     :return: skew symmetric tensor for which x is axial
     """
-    x = np.reshape(x, (3,))
-    return np.array([[0, -x[2], x[1]],
-                     [x[2], 0, -x[0]],
-                     [-x[1], x[0], 0]]
-                    )
+    return so3.skew(np.reshape(x, (3,)))
 
 
 def axial(x):
@@ -21,7 +18,7 @@ def axial(x):
     :param x: skew symmetric tensor
     :return: axial vector
     """
-    return np.array([x[2, 1], x[0, 2], x[1, 0]])
+    return so3.axial(x)
 
 
 def clamp(x, minimum, maximum):
@@ -29,10 +26,7 @@ def clamp(x, minimum, maximum):
 
 
 def quat_inv(q):
-    a = np.zeros_like(q)
-    a[1:] = -q[1:]
-    a[0] = q[0]
-    return a[:]
+    return so3.quat_conj(q)
 
 
 def quat_mul(q1, q2):
@@ -42,12 +36,7 @@ def quat_mul(q1, q2):
     :param q2: q1
     :return: q1 o q2
     """
-    a1, b1, c1, d1 = q1
-    a2, b2, c2, d2 = q2
-    return np.array([a1 * a2 - b1 * b2 - c1 * c2 - d1 * d2,
-                     a1 * b2 + b1 * a2 + c1 * d2 - d1 * c2,
-                     a1 * c2 - b1 * d2 + c1 * a2 + d1 * b2,
-                     a1 * d2 + b1 * c2 - c1 * b2 + d1 * a2])
+    return so3.quat_mul(q1, q2)
 
 
 def quat_inv_mul(q1, q2):
@@ -80,15 +69,7 @@ def quat_from_rotation_vector(x):
     :param x: rotation vector
     :return: associated quaternion
     """
-    x = x.reshape((3,))
-    half_angle = np.linalg.norm(x)
-    if half_angle < eTOL:
-        q = np.array([1, x[0], x[1], x[2]])
-        return q / np.linalg.norm(q)
-    else:
-        cosine_half_angle = np.cos(half_angle)
-        sin_half_angle = np.sin(half_angle) / half_angle
-        return np.array([cosine_half_angle, sin_half_angle * x[0], sin_half_angle * x[1],  sin_half_angle * x[2]])
+    return so3.quat_from_rotation_vector(2 * np.reshape(x, (3,)))
 
 
 def quat_to_rotation_vector(q):
@@ -97,12 +78,7 @@ def quat_to_rotation_vector(q):
     :param q: quaternion
     :return: associated rotation
     """
-    length = np.linalg.norm(q[1:])
-    if length < eTOL:
-        return q[1:]
-    else:
-        half_angle = np.arccos(clamp(q[0], -1.0, 1.0))
-        return half_angle * q[1:] / length
+    return 0.5 * so3.quat_to_rotation_vector(q)
 
 
 def quat_to_scaled_rotation(q):
@@ -1,8 +1,9 @@
 """
 Function to do spherical linear interpolation also known as slerp
-for linear element only that is slerp(X, Q1, Q2)
+for linear element only that is slerp(X, Q1, Q2), *_batched versions work on every element at once
 """
 import numpy as np
+from include import so3
 
 
 def skew(x):
@@ -10,11 +11,53 @@ def skew(x):
     :param x: vector
     :return: skew symmetric tensor for which x is axial
     """
-    x = np.reshape(x, (3,))
-    return np.array([[0, -x[2], x[1]],
-                     [x[2], 0, -x[0]],
-                     [-x[1], x[0], 0]]
-                    )
+    return so3.skew(np.reshape(x, (3,)))
+
+
+def _slerp_angle(q1, q2):
+    """
+    -q and q represents same rotation, q2 is flipped to the hemisphere of q1
+    :param q1: quaternions 1, (..., 4)
+    :param q2: quaternions 2, (..., 4)
+    :return: flipped q2, omega and mask of (near) coincident pairs
+    """
+    dot = np.sum(q1 * q2, axis=-1, keepdims=True)
+    q2 = np.where(dot < 0, -q2, q2)
+    c = np.abs(dot) / np.linalg.norm(q1, axis=-1, keepdims=True) / np.linalg.norm(q2, axis=-1, keepdims=True)
+    omega = np.arccos(np.clip(c, -1, 1))
+    return q2, omega, omega < 1e-6
+
+
+def slerp_batched(q1, q2, n):
+    """
+    spherical linear interpolation for stacked quaternion pairs
+    :param q1: quaternions of node 1, (..., 4)
+    :param q2: quaternions of node 2, (..., 4)
+    :param n: lagrange functions, (..., 2)
+    :return: interpolated quaternions, (..., 4)
+    """
+    q1 = np.asarray(q1, dtype=float)
+    q2, omega, small = _slerp_angle(q1, np.asarray(q2, dtype=float))
+    n0, n1 = n[..., 0, None], n[..., 1, None]
+    so = np.sin(np.where(small, 1, omega))
+    return np.where(small, n0 * q1 + n1 * q2, np.sin(n0 * omega) / so * q1 + np.sin(n1 * omega) / so * q2)
+
+
+def diff_slerp_batched(q1, q2, nx, n):
+    """
+    derivative of output of :slerp_batched function
+    :param q1: quaternions of node 1, (..., 4)
+    :param q2: quaternions of node 2, (..., 4)
+    :param nx: derivative of lagrange functions, (..., 2)
+    :param n: lagrange functions, (..., 2)
+    :return: interpolated derivatives, (..., 4)
+    """
+    q1 = np.asarray(q1, dtype=float)
+    q2, omega, small = _slerp_angle(q1, np.asarray(q2, dtype=float))
+    n0, n1 = n[..., 0, None], n[..., 1, None]
+    nx0, nx1 = nx[..., 0, None], nx[..., 1, None]
+    w = np.where(small, 1, omega / np.sin(np.where(small, 1, omega)))
+    return np.where(small, nx0 * q1 + nx1 * q2, w * (np.cos(n0 * omega) * nx0 * q1 + np.cos(n1 * omega) * nx1 * q2))
 
 
 def slerp(q1, q2, n):
@@ -25,16 +68,7 @@ def slerp(q1, q2, n):
     :param n:  shape function
     :return: q interpolated quaterion
     """
-    # TODO: Vectorize it and possible generalize it for n-element interpolation
-    # Done due to the fact -q and q represents same rotation
-    sign = 1
-    if np.dot(q1, q2) < 0:
-        sign = -1
-
-    omega = np.real(np.arccos(np.dot(q1, sign * q2) / np.linalg.norm(q1) / np.linalg.norm(q2) + 0.j))
-    if np.isclose(abs(omega), 0, atol=1e-6):
-        return q1 * n[0] + q2 * n[1]
-    return (np.sin(n[0] * omega) / np.sin(omega)) * q1 + (np.sin(n[1] * omega) / np.sin(omega)) * q2
+    return slerp_batched(q1, q2, np.reshape(n, (2,)))
 
 
 def diff_slerp(q1, q2, nx, n):
@@ -46,15 +80,7 @@ def diff_slerp(q1, q2, nx, n):
     :param n: lagrange function
     :return: dq interpolated derivative
     """
-    # TODO: Vectorize it and possible generalize it for n-element interpolation
-    # Done due to the fact -q and q represents same rotation
-    sign = 1
-    if np.dot(q1, q2) < 0:
-        sign = -1
-    omega = np.real(np.arccos(np.dot(q1, sign * q2) / np.linalg.norm(q1) / np.linalg.norm(q2) + 0.j))
-    if np.isclose(omega, 0, atol=1e-7):
-        return nx[0] * q1 + nx[1] * q2
-    return np.cos(n[0] * omega) / np.sin(omega) * omega * nx[0] * q1 + np.cos(n[1] * omega) / np.sin(omega) * omega * nx[1] * q2
+    return diff_slerp_batched(q1, q2, np.reshape(nx, (2,)), np.reshape(n, (2,)))
 
 
 def get_rotation_from_quaterion(q):
@@ -63,16 +89,11 @@ def get_rotation_from_quaterion(q):
     :param q: quaternion
     :return: r rotation
     """
-    q = np.reshape(q, (4,))
-    return 2 * np.array([
-        [q[0] ** 2 + q[1] ** 2 - 0.5, q[1] * q[2] - q[3] * q[0], q[1] * q[3] + q[2] * q[0]],
-        [q[2] * q[1] + q[3] * q[0], q[0] ** 2 + q[2] ** 2 - 0.5, q[2] * q[3] - q[1] * q[0]],
-        [q[3] * q[1] - q[2] * q[0], q[3] * q[2] + q[1] * q[0], q[0] ** 2 + q[3] ** 2 - 0.5]
-    ])
+    return so3.quat_to_rotation(np.reshape(q, (4,)))
 
 
 def get_rot_from_q(q):
-    return 1 / np.linalg.norm(q) * (2 * q[0] ** 2 * np.eye(3) + 2 * q[0] * skew(q[1:]) + 2 * np.tensordot(q[1:], q[1:], 0)) - np.eye(3)
+    return so3.quat_to_rotation(q)
 
 
 def get_rotation_derivative_from_quaterion_deprecated(q, dq, r):
@@ -95,12 +116,7 @@ def rotation_vector_to_quaterion(x):
     :param x: rotation vector
     :return: quaterion
     """
-    theta = np.linalg.norm(x)
-    if np.isclose(theta, 0, atol=1e-8):
-        return np.array([1, 0, 0, 0])
-    e = np.sin(theta / 2) * x / theta
-    q = np.array([np.cos(theta / 2), e[0], e[1], e[2]])
-    return q
+    return so3.quat_from_rotation_vector(x)
 
 
 def quatmul(q1, q2):
@@ -110,12 +126,7 @@ def quatmul(q1, q2):
     :param q2: q1
     :return: q1 o q2
     """
-    w0, x0, y0, z0 = q1
-    w1, x1, y1, z1 = q2
-    return np.array([-x1 * x0 - y1 * y0 - z1 * z0 + w1 * w0,
-                     x1 * w0 + y1 * z0 - z1 * y0 + w1 * x0,
-                     -x1 * z0 + y1 * w0 + z1 * x0 + w1 * y0,
-                     x1 * y0 - y1 * x0 + z1 * w0 + w1 * z0])
+    return so3.quat_mul(q1, q2)
 
 
 def get_theta_from_rotation(rq):
@@ -124,35 +135,7 @@ def get_theta_from_rotation(rq):
     :param rq: rotation matrix
     :return: theta
     """
-    rmat = get_rotation_from_quaterion(rq)
-    q = np.zeros(4)
-    trq = np.trace(rmat)
-    v = np.array([trq, rmat[0, 0], rmat[1, 1], rmat[2, 2]])
-    m = v.argmax()
-    maxval = v[m]
-    if m == 0:
-        q[0] = 0.5 * np.sqrt(1 + maxval)
-        q[1] = 0.25 * (rmat[2, 1] - rmat[1, 2]) / q[0]
-        q[2] = 0.25 * (rmat[0, 2] - rmat[2, 0]) / q[0]
-        q[3] = 0.25 * (rmat[1, 0] - rmat[0, 1]) / q[0]
-    elif m == 1:
-        q[1] = np.sqrt(0.5 * maxval + 0.25 * (1 - trq))
-        q[0] = 0.25 * (rmat[2, 1] - rmat[1, 2]) / q[1]
-        q[2] = 0.25 * (rmat[0, 1] + rmat[1, 0]) / q[1]
-        q[3] = 0.25 * (rmat[2, 0] + rmat[0, 2]) / q[1]
-    elif m == 2:
-        q[2] = np.sqrt(0.5 * maxval + 0.25 * (1 - trq))
-        q[1] = 0.25 * (rmat[0, 1] + rmat[1, 0]) / q[2]
-        q[0] = 0.25 * (rmat[0, 2] - rmat[2, 0]) / q[2]
-        q[3] = 0.25 * (rmat[1, 2] + rmat[2, 1]) / q[2]
-    elif m == 3:
-        q[3] = np.sqrt(0.5 * maxval + 0.25 * (1 - trq))
-        q[1] = 0.25 * (rmat[2, 0] + rmat[0, 2]) / q[3]
-        q[2] = 0.25 * (rmat[1, 2] + rmat[2, 1]) / q[3]
-        q[0] = 0.25 * (rmat[1, 0] - rmat[0, 1]) / q[3]
-    else:
-        raise Exception("not max index")
-    return q / np.linalg.norm(q)
+    return so3.rotation_to_quat(so3.quat_to_rotation(rq))
 
 
 def rotate_vec(q, v):
@@ -161,18 +144,8 @@ def rotate_vec(q, v):
     :param v: vector
     :return: rotated vector
     """
-    qc = np.array([q[0], -q[1], -q[2], -q[3]])
-    v = np.array([0, v[0], v[1], v[2]])
-    vc = quatmul(q, quatmul(v, qc))
-    return vc[1:]
+    return so3.rotate(q, v)
 
 
 def quaterion_to_rotation_vec(q):
-    if q[0] >= 0:
-        normt = 2 * np.real(np.arcsin(np.linalg.norm(q[1:]) + 0.j))
-    else:
-        normt = 2 * (np.pi - np.real(np.arcsin(np.linalg.norm(q[1:]) + 0.j)))
-    if np.isclose(normt, 0, atol=1e-10):
-        return np.zeros(shape=(3,))
-    else:
-        return normt / np.linalg.norm(q[1:]) * q[1:]
+    return so3.quat_to_rotation_vector(q)
@@ -0,0 +1,215 @@
+"""
+Rotation primitives (SO(3) and unit quaternions) for stacked arrays
+vectors are (..., 3), quaternions (..., 4) as [w, x, y, z], tensors (..., 3, 3)
+small angles are handled with masked series expansions instead of scalar branches
+"""
+import numpy as np
+
+eTOL = 1e-8
+
+
+def skew(x):
+    """
+    :param x: vectors, (..., 3)
+    :return: skew symmetric tensors for which x is axial, (..., 3, 3)
+    """
+    x = np.asarray(x, dtype=float)
+    s = np.zeros(x.shape[:-1] + (3, 3))
+    s[..., 0, 1] = -x[..., 2]
+    s[..., 0, 2] = x[..., 1]
+    s[..., 1, 0] = x[..., 2]
+    s[..., 1, 2] = -x[..., 0]
+    s[..., 2, 0] = -x[..., 1]
+    s[..., 2, 1] = x[..., 0]
+    return s
+
+
+def axial(x):
+    """
+    x better be skew symmetric tensor
+    :param x: skew symmetric tensors, (..., 3, 3)
+    :return: axial vectors, (..., 3)
+    """
+    return np.stack((x[..., 2, 1], x[..., 0, 2], x[..., 1, 0]), axis=-1)
+
+
+def _sinc_half(t):
+    """
+    :param t: angles
+    :return: sin(t / 2) / t, 1 / 2 - t^2 / 48 near zero
+    """
+    small = t < eTOL ** 0.5
+    ts = np.where(small, 1, t)
+    return np.where(small, 0.5 - t ** 2 / 48, np.sin(0.5 * ts) / ts)
+
+
+def quat_from_rotation_vector(x):
+    """
+    EXP
+    :param x: rotation vectors, (..., 3)
+    :return: unit quaternions, (..., 4)
+    """
+    x = np.asarray(x, dtype=float)
+    t = np.linalg.norm(x, axis=-1)
+    return np.concatenate((np.cos(0.5 * t)[..., None], _sinc_half(t)[..., None] * x), axis=-1)
+
+
+def quat_to_rotation_vector(q):
+    """
+    LOG, angle is 2 atan2(|v|, w) so w < 0 gives angles above pi (no shortest path flip)
+    :param q: unit quaternions, (..., 4)
+    :return: rotation vectors, (..., 3)
+    """
+    q = np.asarray(q, dtype=float)
+    s = np.linalg.norm(q[..., 1:], axis=-1)
+    small = s < eTOL
+    ss = np.where(small, 1, s)
+    scale = np.where(small, 2 / np.where(q[..., 0] == 0, 1, q[..., 0]), 2 * np.arctan2(s, q[..., 0]) / ss)
+    return scale[..., None] * q[..., 1:]
+
+
+def quat_conj(q):
+    """
+    :param q: quaternions, (..., 4)
+    :return: conjugates (inverse of unit quaternions)
+    """
+    c = np.array(q, dtype=float)
+    c[..., 1:] *= -1
+    return c
+
+
+def quat_mul(q1, q2):
+    """
+    Product of two quaternion
+    :param q1: q1, (..., 4)
+    :param q2: q2, (..., 4)
+    :return: q1 o q2
+    """
+    q1 = np.asarray(q1, dtype=float)
+    q2 = np.asarray(q2, dtype=float)
+    w1, v1 = q1[..., :1], q1[..., 1:]
+    w2, v2 = q2[..., :1], q2[..., 1:]
+    w = w1 * w2 - np.sum(v1 * v2, axis=-1, keepdims=True)
+    v = w1 * v2 + w2 * v1 + np.cross(v1, v2)
+    return np.concatenate((w, v), axis=-1)
+
+
+def quat_to_rotation(q):
+    """
+    :param q: quaternions, (..., 4), need not be normalized
+    :return: rotation tensors, (..., 3, 3)
+    """
+    q = np.asarray(q, dtype=float)
+    q = q / np.sum(q * q, axis=-1, keepdims=True) ** 0.5
+    w, v = q[..., 0, None, None], q[..., 1:]
+    return (2 * w ** 2 - 1) * np.eye(3) + 2 * w * skew(v) + 2 * v[..., :, None] * v[..., None, :]
+
+
+def rotation_to_quat(rmat):
+    """
+    Algorithm proposed by Spurrier, the branch is picked per matrix with a mask
+    :param rmat: rotation tensors, (..., 3, 3)
+    :return: unit quaternions, (..., 4)
+    """
+    rmat = np.asarray(rmat, dtype=float)
+    trq = np.trace(rmat, axis1=-2, axis2=-1)
+    m = np.argmax(np.stack((trq, rmat[..., 0, 0], rmat[..., 1, 1], rmat[..., 2, 2]), axis=-1), axis=-1)
+    q = np.zeros(rmat.shape[:-2] + (4,))
+    c = m == 0
+    r = rmat[c]
+    w = 0.5 * np.sqrt(1 + trq[c])
+    q[c] = np.stack((w,
+                     0.25 * (r[:, 2, 1] - r[:, 1, 2]) / w,
+                     0.25 * (r[:, 0, 2] - r[:, 2, 0]) / w,
+                     0.25 * (r[:, 1, 0] - r[:, 0, 1]) / w), axis=-1)
+    for a in range(3):
+        b, d = (a + 1) % 3, (a + 2) % 3
+        c = m == a + 1
+        r = rmat[c]
+        qa = np.sqrt(0.5 * r[:, a, a] + 0.25 * (1 - trq[c]))
+        qc = np.zeros((len(qa), 4))
+        qc[:, a + 1] = qa
+        qc[:, 0] = 0.25 * (r[:, d, b] - r[:, b, d]) / qa
+        qc[:, b + 1] = 0.25 * (r[:, a, b] + r[:, b, a]) / qa
+        qc[:, d + 1] = 0.25 * (r[:, d, a] + r[:, a, d]) / qa
+        q[c] = qc
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def exp(x):
+    """
+    Lie group exp map (using quaternions)
+    :param x: rotation vectors, (..., 3)
+    :return: rotation tensors, (..., 3, 3)
+    """
+    return quat_to_rotation(quat_from_rotation_vector(x))
+
+
+def log(rmat):
+    """
+    Lie group log map (using Spurrier)
+    :param rmat: rotation tensors, (..., 3, 3)
+    :return: rotation vectors, (..., 3)
+    """
+    return quat_to_rotation_vector(rotation_to_quat(rmat))
+
+
+def compose_rotation_vector(theta, dtheta):
+    """
+    rotation vector of exp(dtheta) exp(theta), among the equivalent vectors (angle + 2 pi k about the same axis)
+    the one closest to theta + dtheta is picked, so rotation vectors stay continuous past 2 pi
+    :param theta: rotation vectors, (..., 3)
+    :param dtheta: (spatial) rotation increments, (..., 3)
+    :return: rotation vectors, (..., 3)
+    """
+    theta = np.asarray(theta, dtype=float)
+    dtheta = np.asarray(dtheta, dtype=float)
+    t = quat_to_rotation_vector(quat_mul(quat_from_rotation_vector(dtheta), quat_from_rotation_vector(theta)))
+    target = theta + dtheta
+    a = np.linalg.norm(t, axis=-1, keepdims=True)
+    b = np.linalg.norm(target, axis=-1, keepdims=True)
+    # identity, axis is taken from the additive guess
+    small = a < eTOL
+    n = np.where(small, target / np.where(b < eTOL, 1, b), t / np.where(small, 1, a))
+    k = np.round((np.sum(n * target, axis=-1, keepdims=True) - a) / (2 * np.pi))
+    return (a + 2 * np.pi * k) * n
+
+
+def update_configuration(u, du, dof, rotations=(3,)):
+    """
+    Multiplicative configuration update, R_(i+1) = exp(dtheta_i) R_i on every node, everything else is added
+    :param u: configuration, (number of nodes * dof, 1)
+    :param du: increment
+    :param dof: dof per node
+    :param rotations: offsets of the rotation vectors within the dofs of a node
+    :return: updated configuration
+    """
+    un = u + du
+    uv = u.reshape(-1, dof)
+    duv = du.reshape(-1, dof)
+    unv = un.reshape(-1, dof)
+    for r in rotations:
+        unv[:, r: r + 3] = compose_rotation_vector(uv[:, r: r + 3], duv[:, r: r + 3])
+    return un
+
+
+def rotate(q, v):
+    """
+    :param q: unit quaternions, (..., 4)
+    :param v: vectors, (..., 3)
+    :return: rotated vectors
+    """
+    q = np.asarray(q, dtype=float)
+    w, u = q[..., :1], q[..., 1:]
+    t = 2 * np.cross(u, v)
+    return v + w * t + np.cross(u, t)
+
+
+def quat_curvature(q, dq):
+    """
+    material curvature of an interpolated unit quaternion field (Darboux, G. [1972])
+    :param q: unit quaternions, (..., 4)
+    :param dq: derivative of q along the centerline, (..., 4)
+    :return: kappa, (..., 3)
+    """
+    return 2 * quat_mul(quat_conj(q), dq)[..., 1:]
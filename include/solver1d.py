@@ -1,4 +1,6 @@
 import numpy as np
+from scipy import sparse
+from include import assembly, so3
 
 
 def init_gauss_points(n=3):
@@ -29,6 +31,9 @@ def impose_boundary_condition(k, f, ibc, bc):
     :param ibc: node at with BC is prescribed
     :param bc: boundary condition
     """
+    if sparse.issparse(k):
+        assembly.impose_boundary_condition_sparse(k, f, ibc, bc)
+        return
     f -= (k[:, ibc] * bc)[:, None]
     f[ibc] = bc
     k[:, ibc] = 0
@@ -44,6 +49,9 @@ def impose_boundary_condition_bukl(k,  ibc, bc):
     :param ibc: node at with BC is prescribed
     :param bc: boundary condition
     """
+    if sparse.issparse(k):
+        assembly.impose_boundary_condition_sparse(k, None, ibc, bc)
+        return
     k[:, ibc] = 0
     k[ibc, :] = 0
     k[ibc, ibc] = 1
@@ -55,6 +63,8 @@ def get_displacement_vector(k, f):
     :param f: force vector
     :return: nodal displacement
     """
+    if sparse.issparse(k):
+        return assembly.get_displacement_vector_sparse(k, f)
     return np.linalg.solve(k, f)
 
 
@@ -113,41 +123,7 @@ def get_theta_from_rotation(rmat):
     :param rmat: rotation matrix
     :return: theta
     """
-    q = np.zeros(4)
-    trq = np.trace(rmat)
-    v = np.array([trq, rmat[0, 0], rmat[1, 1], rmat[2, 2]])
-    m = v.argmax()
-    maxval = v[m]
-    if m == 0:
-        q[0] = 0.5 * np.sqrt(1 + maxval)
-        q[1] = 0.25 * (rmat[2, 1] - rmat[1, 2]) / q[0]
-        q[2] = 0.25 * (rmat[0, 2] - rmat[2, 0]) / q[0]
-        q[3] = 0.25 * (rmat[1, 0] - rmat[0, 1]) / q[0]
-    elif m == 1:
-        q[1] = np.sqrt(0.5 * maxval + 0.25 * (1 - trq))
-        q[0] = 0.25 * (rmat[2, 1] - rmat[1, 2]) / q[1]
-        q[2] = 0.25 * (rmat[0, 1] + rmat[1, 0]) / q[1]
-        q[3] = 0.25 * (rmat[2, 0] + rmat[0, 2]) / q[1]
-    elif m == 2:
-        q[2] = np.sqrt(0.5 * maxval + 0.25 * (1 - trq))
-        q[1] = 0.25 * (rmat[0, 1] + rmat[1, 0]) / q[2]
-        q[0] = 0.25 * (rmat[0, 2] - rmat[2, 0]) / q[2]
-        q[3] = 0.25 * (rmat[1, 2] + rmat[2, 1]) / q[2]
-    elif m == 3:
-        q[3] = np.sqrt(0.5 * maxval + 0.25 * (1 - trq))
-        q[1] = 0.25 * (rmat[2, 0] + rmat[0, 2]) / q[3]
-        q[2] = 0.25 * (rmat[1, 2] + rmat[2, 1]) / q[3]
-        q[0] = 0.25 * (rmat[1, 0] - rmat[0, 1]) / q[3]
-    else:
-        raise Exception("not max index")
-    if q[0] >= 0:
-        normt = 2 * np.arcsin(np.linalg.norm(q[1:]))
-    else:
-        normt = 2 * (np.pi - np.arcsin(np.linalg.norm(q[1:])))
-    if np.isclose(normt, 0, atol=1e-6):
-        return np.zeros((3,))
-    else:
-        return normt / np.linalg.norm(q[1:]) * q[1:]
+    return so3.log(rmat)
 
 
 def get_theta_from_rotation_deprecated(rmat):
@@ -168,11 +144,7 @@ def skew(x):
     :param x: vector
     :return: skew symmetric tensor for which x is axial
     """
-    x = np.reshape(x, (3,))
-    return np.array([[0, -x[2], x[1]],
-                     [x[2], 0, -x[0]],
-                     [-x[1], x[0], 0]]
-                    )
+    return so3.skew(np.reshape(x, (3,)))
 
 
 def axial(x):
@@ -181,7 +153,7 @@ def axial(x):
     :param x: skew symmetric tensor
     :return: axial vector
     """
-    return np.array([x[2, 1], x[0, 2], x[1, 0]])
+    return so3.axial(x)
 
 
 def get_rotation_from_theta_tensor_deprecated(x):
@@ -203,19 +175,7 @@ def get_rotation_from_theta_tensor(x):
     :param x: skew symmetric tensor
     :return: rotation tensor
     """
-    x = np.reshape(x, (3,))
-    normt = np.linalg.norm(x)
-    if np.isclose(normt, 0, atol=1e-8):
-        return np.eye(3)
-    else:
-        q = np.zeros(4)
-        q[0] = np.cos(normt / 2)
-        q[1:] = np.sin(normt / 2) / normt * x
-        return 2 * np.array([
-            [q[0] ** 2 + q[1] ** 2 - 0.5, q[1] * q[2] - q[3] * q[0], q[1] * q[3] + q[2] * q[0]],
-            [q[2] * q[1] + q[3] * q[0], q[0] ** 2 + q[2] ** 2 - 0.5, q[2] * q[3] - q[1] * q[0]],
-            [q[3] * q[1] - q[2] * q[0], q[3] * q[2] + q[1] * q[0], q[0] ** 2 + q[3] ** 2 - 0.5]
-        ])
+    return so3.exp(np.reshape(x, (3,)))
 
 
 def get_assembly_vector(dof, n):
@@ -224,11 +184,7 @@ def get_assembly_vector(dof, n):
     :param n: nodes
     :return: assembly points
     """
-    iv = []
-    for i in n:
-        for j in range(dof):
-            iv.append(dof * i + j)
-    return iv
+    return list((dof * np.asarray(n)[:, None] + np.arange(dof)).ravel())
 
 
 def get_incremental_k(dt, dtds, rot):
@@ -277,6 +233,56 @@ def get_incremental_k_path_independent_second(t, tds):
     return (np.eye(3) - (1 - np.cos(norm_t)) / norm_t ** 2 * tensor_t + (norm_t - np.sin(norm_t)) / norm_t ** 3 * tensor_t @ tensor_t) @ tds
 
 
+def get_incremental_k_batched(dt, dtds, rot):
+    """
+    get_incremental_k for stacked arrays
+    :param dt: delta_theta, (..., 3)
+    :param dtds: delta_theta', (..., 3)
+    :param rot: rotation matrix, (..., 3, 3)
+    :return: delta_kappa, (..., 3)
+    """
+    norm_dt = np.linalg.norm(dt, axis=-1)
+    small = norm_dt < 1e-6
+    nd = np.where(small, 1, norm_dt)
+    x = np.where(small, 1, np.sin(nd) / nd)
+    x2 = np.where(small, 1, np.sin(nd * 0.5) / (nd * 0.5))
+    proj = np.where(small, 0, (1 - x) * np.sum(dt * dtds, axis=-1) / nd ** 2)
+    dk = x[..., None] * dtds + proj[..., None] * dt + 0.5 * (x2 ** 2)[..., None] * np.cross(dt, dtds)
+    return np.einsum('...ji,...j->...i', rot, dk)
+
+
+def get_incremental_k_path_independent_batched(t, tds):
+    """
+    get_incremental_k_path_independent for stacked arrays
+    :param t: theta, (..., 3)
+    :param tds: theta_prime, (..., 3)
+    :return: kappa, (..., 3)
+    """
+    norm_t = np.linalg.norm(t, axis=-1)
+    small = norm_t < 1e-6
+    nt = np.where(small, 1, norm_t)
+    x = np.where(small, 1, np.sin(nt) / nt)
+    y = np.where(small, 0, (1 - np.cos(nt)) / nt)
+    proj = np.where(small, 0, (1 - x) * np.sum(t * tds, axis=-1) / nt ** 2)
+    return proj[..., None] * t + x[..., None] * tds - y[..., None] * np.cross(t, tds)
+
+
+def get_incremental_k_path_independent_second_batched(t, tds):
+    """
+    get_incremental_k_path_independent_second for stacked arrays
+    :param t: theta, (..., 3)
+    :param tds: theta_prime, (..., 3)
+    :return: kappa, (..., 3)
+    """
+    norm_t = np.linalg.norm(t, axis=-1)
+    small = norm_t < 1e-6
+    nt = np.where(small, 1, norm_t)
+    a = np.where(small, 0, (1 - np.cos(nt)) / nt ** 2)
+    b = np.where(small, 0, (nt - np.sin(nt)) / nt ** 3)
+    txtds = np.cross(t, tds)
+    return tds - a[..., None] * txtds + b[..., None] * np.cross(t, txtds)
+
+
 def get_e(dof, n, n_, rds):
     e = np.zeros((dof, dof))
     e[0: 3, 0: 3] = n_ * np.eye(3)
@@ -323,12 +329,94 @@ def get_tangent_stiffness_residue(n_tensor, m_tensor, n, nx, dof, pi, c, rds, gl
                                                          get_e(dof, n[i][0], nx[i][0], rds) @ nmmat + n[i][0] * nx[j][0] * nmat + fn[i][0] * fn[j][0] * f
             if buckling:
                 k0[6 * i: (i + 1) * 6, 6 * j: (j + 1) * 6] += get_e(dof, n[i][0], nx[i][0], rds) @ pi @ c @ pi.T @ get_e(dof, n[j][0], nx[j][0], rds).T
-                kg[6 * i: (i + 1) * 6, 6 * j: (j + 1) * 6] += get_e(dof, n[i][0], nx[i][0], rds) @ nmmat + n[i][0] * nx[j][0] * nmat
+                kg[6 * i: (i + 1) * 6, 6 * j: (j + 1) * 6] += n[j][0] * get_e(dof, n[i][0], nx[i][0], rds) @ nmmat + n[i][0] * nx[j][0] * nmat
     if buckling:
         return k, r, k0, kg
     return k, r
 
 
+def get_stress_resultants_batched(rot, rds, kvec, elasticity_extension, elasticity_bending):
+    """
+    spatial stress resultants of every gauss point, n = R ce (R.T rds - E3), m = R cb k
+    :param rot: rotation, (nelem, ngp, 3, 3)
+    :param rds: rds, (nelem, ngp, 3)
+    :param kvec: curvature, (nelem, ngp, 3)
+    :param elasticity_extension: shear / extension elasticity, (3, 3)
+    :param elasticity_bending: bending / torsion elasticity, (3, 3)
+    :return: stress resultants [n, m], (nelem, ngp, 6)
+    """
+    v = np.einsum('egji,egj->egi', rot, rds)
+    gloc = np.zeros(rds.shape[:-1] + (6,))
+    gloc[..., 0: 3] = np.einsum('egij,jk,egk->egi', rot, elasticity_extension, v - np.array([0, 0, 1]))
+    gloc[..., 3: 6] = np.einsum('egij,jk,egk->egi', rot, elasticity_bending, kvec)
+    return gloc
+
+
+def get_e_batched(n, nx, rds):
+    """
+    :param n: shape function, (..., nen)
+    :param nx: derivative of shape function, (..., nen)
+    :param rds: rds, (..., 3)
+    :return: get_e for every node, (..., nen, 6, 6)
+    """
+    e = np.zeros(n.shape + (6, 6))
+    i = np.eye(3)
+    e[..., 0: 3, 0: 3] = nx[..., None, None] * i
+    e[..., 3: 6, 3: 6] = nx[..., None, None] * i
+    e[..., 3: 6, 0: 3] = -n[..., None, None] * so3.skew(rds)[..., None, :, :]
+    return e
+
+
+def get_residue_batched(gloc, n, nx, rds, wj):
+    """
+    residue part of get_tangent_stiffness_residue_batched, no tangent blocks
+    :param gloc: stress resultants [n, m], (nelem, ngp, 6)
+    :param n: shape function, (nelem, ngp, nen)
+    :param nx: derivative of shape function, (nelem, ngp, nen)
+    :param rds: rds, (nelem, ngp, 3)
+    :param wj: gauss weight times jacobian, (nelem, ngp)
+    :return: residues (nelem, 6 * nen, 1)
+    """
+    nelem, ngp, nen = n.shape
+    e = get_e_batched(n, nx, rds)
+    return np.einsum('egiab,egb,eg->eia', e, gloc, wj).reshape(nelem, 6 * nen, 1)
+
+
+def get_tangent_stiffness_residue_batched(gloc, n, nx, rot, c, rds, wj, buckling=False):
+    """
+    get_tangent_stiffness_residue for all elements and gauss points at once, already integrated
+    :param gloc: stress resultants [n, m], (nelem, ngp, 6)
+    :param n: shape function, (nelem, ngp, nen)
+    :param nx: derivative of shape function, (nelem, ngp, nen)
+    :param rot: rotation, (nelem, ngp, 3, 3)
+    :param c: elasticity, (6, 6)
+    :param rds: rds, (nelem, ngp, 3)
+    :param wj: gauss weight times jacobian, (nelem, ngp)
+    :param buckling: buckling
+    :return: tangents (nelem, 6 * nen, 6 * nen), residues (nelem, 6 * nen, 1)
+    """
+    nelem, ngp, nen = n.shape
+    e = get_e_batched(n, nx, rds)
+    pi = np.zeros((nelem, ngp, 6, 6))
+    pi[..., 0: 3, 0: 3] = rot
+    pi[..., 3: 6, 3: 6] = rot
+    d = np.einsum('egab,bc,egdc->egad', pi, c, pi)
+    nmmat = np.zeros((nelem, ngp, 6, 6))
+    nmat = np.zeros((nelem, ngp, 6, 6))
+    nmmat[..., 0: 3, 3: 6] = -so3.skew(gloc[..., 0: 3])
+    nmmat[..., 3: 6, 3: 6] = -so3.skew(gloc[..., 3: 6])
+    nmat[..., 3: 6, 0: 3] = -nmmat[..., 0: 3, 3: 6]
+
+    k0 = np.einsum('egiab,egbc,egjdc,eg->eiajd', e, d, e, wj, optimize=True)
+    en = np.einsum('egiab,egbc->egiac', e, nmmat)
+    kn = np.einsum('egj,egiac,eg->eiajc', n, en, wj) + np.einsum('egi,egj,egac,eg->eiajc', n, nx, nmat, wj)
+    r = np.einsum('egiab,egb,eg->eia', e, gloc, wj).reshape(nelem, 6 * nen, 1)
+    k = (k0 + kn).reshape(nelem, 6 * nen, 6 * nen)
+    if buckling:
+        return k, r, k0.reshape(nelem, 6 * nen, 6 * nen), kn.reshape(nelem, 6 * nen, 6 * nen)
+    return k, r
+
+
 def get_pi(rot):
     """
     :param rot: rotation
@@ -0,0 +1,103 @@
+"""
+Stability monitor and linearized buckling
+Only the few eigenvalues of the (reduced) tangent closest to zero decide whether an equilibrium is stable,
+they are computed by shift-invert Arnoldi (Lanczos if symmetric) on the free-free block,
+the previous lowest mode is used as starting vector so that consecutive load steps converge in a few iterations
+"""
+import numpy as np
+from scipy import linalg as la
+from scipy import sparse
+from scipy.sparse import linalg as spla
+
+
+class StabilityMonitor:
+    def __init__(self, constraints, k=6, sigma=0, symmetric=False, tol=0):
+        """
+        :param constraints: Constraints, eigen problem is solved on free dofs only
+        :param k: number of eigenpairs
+        :param sigma: shift, eigenvalues closest to sigma are computed
+        :param symmetric: use Lanczos (eigsh) if tangent is symmetric
+        :param tol: relative accuracy of eigenvalues (0 is machine precision)
+        """
+        self.constraints = constraints
+        self.k = k
+        self.sigma = sigma
+        self.symmetric = symmetric
+        self.tol = tol
+        self.v0 = None
+        self.eigenvalues = None
+        self.eigenvectors = None
+
+    def update(self, kmat):
+        """
+        :param kmat: tangent stiffness (dense or sparse, constrained or not, only free-free block is used)
+        :return: k eigenvalues (real part) closest to sigma sorted ascending, eigenvectors over all dofs (ndof, k)
+        """
+        kff = self.constraints.reduce(kmat)
+        n = kff.shape[0]
+        k = min(self.k, n)
+        if k >= n - 1:
+            # too small for ARPACK
+            w, v = la.eig(kff.toarray() if sparse.issparse(kff) else kff)
+            idx = np.argsort(np.abs(w - self.sigma))[:k]
+            w, v = w[idx], v[:, idx]
+        elif self.symmetric:
+            w, v = spla.eigsh(sparse.csc_matrix(kff), k, sigma=self.sigma, which='LM', v0=self.v0, tol=self.tol)
+        else:
+            w, v = spla.eigs(sparse.csc_matrix(kff), k, sigma=self.sigma, which='LM', v0=self.v0, tol=self.tol)
+        w = w.real
+        idx = np.argsort(w)
+        w, v = w[idx], v[:, idx].real
+        self.v0 = v[:, 0].copy()
+        self.eigenvalues = w
+        self.eigenvectors = self.constraints.expand(v)
+        return self.eigenvalues, self.eigenvectors
+
+    def is_stable(self):
+        """
+        :return: False if lowest computed eigenvalue is negative
+        """
+        return self.eigenvalues is None or self.eigenvalues[0] >= 0
+
+
+def linear_buckling(k0, kg, constraints, k=6):
+    """
+    Linearized buckling, (k0 + lambda kg) phi = 0 on free dofs
+    k0 is factorized once, the largest mu of k0^-1 kg phi = mu phi are found by Arnoldi and lambda = -1 / mu
+    :param k0: material stiffness
+    :param kg: geometric stiffness at the reference load
+    :param constraints: Constraints
+    :param k: number of buckling modes
+    :return: load factors (w.r.t. reference load) sorted by magnitude, modes over all dofs (ndof, k)
+    """
+    k0f = sparse.csc_matrix(constraints.reduce(k0))
+    kgf = sparse.csr_matrix(constraints.reduce(kg))
+    n = k0f.shape[0]
+    k = min(k, n)
+    if not np.any(kgf.data):
+        # unloaded, no buckling
+        return np.full(k, np.inf), np.zeros((constraints.ndof, k))
+    if k >= n - 1:
+        mu, v = la.eig(kgf.toarray(), k0f.toarray())
+    else:
+        lu = spla.splu(k0f)
+        op = spla.LinearOperator((n, n), matvec=lambda x: lu.solve(kgf @ x), dtype=float)
+        mu, v = spla.eigs(op, k, which='LM')
+    idx = np.argsort(-np.abs(mu))[:k]
+    mu, v = mu[idx].real, v[:, idx].real
+    with np.errstate(divide='ignore'):
+        factors = -1 / mu
+    return factors, constraints.expand(v)
+
+
+def linear_buckling_analysis(problem, u, load, k=6):
+    """
+    :param problem: problem providing assemble(u, load, buckling=True), see include/problem.py
+    :param u: (pre-buckling) configuration
+    :param load: reference load
+    :param k: number of buckling modes
+    :return: critical loads, modes over all dofs (ndof, k)
+    """
+    _, _, k0, kg = problem.assemble(u, load, buckling=True)
+    factors, modes = linear_buckling(k0, kg, problem.constraints, k)
+    return load * factors, modes
@@ -0,0 +1,624 @@
+"""
+Headless Newton-Raphson load stepping
+Works on any problem which provides initial_state(), assemble(u, load) -> (k, f), prescribed(u, load),
+update(u, du) and a Constraints object (see include/problem.py), plotting is left to the caller
+"""
+from collections import namedtuple
+import numpy as np
+from include.checkpoint import save_checkpoint, load_checkpoint
+
+
+def adapt_step(step, iterations, desired_iter, grow=2, cut=0.5):
+    """
+    :param step: current step size (load increment or arclength)
+    :param iterations: newton iterations the step needed
+    :param desired_iter: iterations aimed at
+    :param grow: largest growth factor
+    :param cut: smallest reduction factor
+    :return: next step size, grows if the step converged quickly, shrinks if it was hard
+    """
+    return step * np.clip(np.sqrt(desired_iter / max(iterations, 1)), cut, grow)
+
+
+def extrapolate(loads, states, load):
+    """
+    :param loads: distinct load factors of converged states
+    :param states: converged configurations
+    :param load: next load factor
+    :return: lagrange extrapolation in load factor of states to load
+    """
+    up = np.zeros_like(states[-1])
+    for i in range(len(loads)):
+        w = np.prod([(load - loads[j]) / (loads[i] - loads[j]) for j in range(len(loads)) if j != i])
+        up += w * states[i]
+    return up
+
+
+class LoadStepPredictor:
+    def __init__(self, predictor=None):
+        """
+        Secant / quadratic predictor of StaticSolver for drivers with their own newton loop
+        :param predictor: None (last converged state), "secant" or "quadratic" (extrapolated from the last two /
+                          three converged states), "tangent" needs a problem, see StaticSolver
+        """
+        if predictor not in (None, "secant", "quadratic"):
+            raise ValueError("predictor must be one of None, \"secant\", \"quadratic\"")
+        self.n = {"secant": 2, "quadratic": 3}.get(predictor, 0)
+        self.loads = []
+        self.states = []
+
+    def append(self, load, u):
+        """
+        :param load: load factor
+        :param u: converged configuration
+        """
+        if self.n == 0:
+            return
+        self.loads = self.loads[1 - self.n:] + [load]
+        self.states = self.states[1 - self.n:] + [u.copy()]
+
+    def predict(self, load, u):
+        """
+        :param load: next load factor
+        :param u: current configuration
+        :return: starting configuration for newton at load
+        """
+        if self.n == 0 or len(self.loads) < self.n or len(set(self.loads)) < self.n:
+            return u
+        return extrapolate(self.loads, self.states, load)
+
+
+class EquilibriumPath:
+    def __init__(self, keep=None):
+        """
+        :param keep: only the last keep steps are held (enough for the predictors), every step if None
+        """
+        self.keep = keep
+        self.loads = []
+        self.states = []
+        self.residue_norms = []
+        self.increments_norms = []
+        self.iterations = []
+        self.converged = []
+        self.det_signs = []
+        self.factorizations = []
+        # (load, iterations) of attempts that did not converge and were retried with a smaller step
+        self.rejected = []
+
+    def append(self, load, u, result, copy=True):
+        """
+        :param load: load factor
+        :param u: converged (or last) configuration
+        :param result: NewtonResult of the load step
+        :param copy: False holds u itself, for callers that never modify it in place
+        """
+        self.loads.append(load)
+        self.states.append(u.copy() if copy else u)
+        self.residue_norms.append(result.residue_norm)
+        self.increments_norms.append(result.increments_norm)
+        self.iterations.append(result.iterations)
+        self.converged.append(result.converged)
+        self.det_signs.append(result.det_sign)
+        self.factorizations.append(result.factorizations)
+        if self.keep is not None and len(self.loads) > self.keep:
+            for steps in (self.loads, self.states, self.residue_norms, self.increments_norms, self.iterations,
+                          self.converged, self.det_signs, self.factorizations):
+                del steps[0]
+
+    @property
+    def total_iterations(self):
+        """
+        :return: newton iterations of accepted and rejected steps
+        """
+        return sum(self.iterations) + sum(it for _, it in self.rejected)
+
+    def __len__(self):
+        return len(self.loads)
+
+    @property
+    def u(self):
+        """
+        :return: configurations of every load step, (nsteps, ndof, 1)
+        """
+        return np.array(self.states)
+
+
+class NewtonResult:
+    def __init__(self, u, converged, iterations, residue_norm, increments_norm, det_sign=1, factorizations=None):
+        self.u = u
+        self.converged = converged
+        self.iterations = iterations
+        self.residue_norm = residue_norm
+        self.increments_norm = increments_norm
+        # sign of det of (free-free) tangent at u, from the factorization of last iteration
+        self.det_sign = det_sign
+        # tangent assemblies + factorizations, every iteration for full newton
+        self.factorizations = iterations + 1 if factorizations is None else factorizations
+
+
+# immutable snapshot of a converged load step yielded by StaticSolver.iter_path, u is a read only view
+PathStep = namedtuple("PathStep", ("step", "load", "u", "residue_norm", "increments_norm", "iterations", "converged",
+                                   "det_sign", "factorizations"))
+
+STRATEGIES = ("newton", "modified", "broyden", "bfgs")
+LINE_SEARCHES = (None, "backtracking", "energy")
+PREDICTORS = (None, "secant", "quadratic", "tangent")
+
+
+class StaticSolver:
+    def __init__(self, problem, max_iter=100, tol_increment=1e-6, tol_residue=1e-3, max_increment=1,
+                 strategy="newton", refresh_rate=0.5, max_history=20, line_search=None, max_line_search=8,
+                 line_search_tol=0.5, predictor=None):
+        """
+        :param problem: problem definition
+        :param max_iter: Max newton raphson iteration
+        :param tol_increment: tolerance on norm of increment
+        :param tol_residue: tolerance on norm of out of balance force
+        :param max_increment: increments with larger norm are scaled down to this
+        :param strategy: "newton" (tangent every iteration), "modified" (keep last factorization),
+                         "broyden" / "bfgs" (secant updates on top of last factorization, bfgs needs symmetric tangent)
+        :param refresh_rate: tangent is reassembled and refactorized once energy norm |du . f| drops by less than this factor
+                             per iteration (or too slowly to converge within max_iter), in place of the slow step
+        :param max_history: secant pairs kept before the tangent is refreshed
+        :param line_search: None (increment is scaled down to max_increment), "backtracking" (halving from the
+                            clamped step) or "energy" (root of du . R(u + alpha du)), residue only evaluations,
+                            both fall back to the clamp and a cut step refreshes the tangent of quasi newton
+        :param max_line_search: max residue evaluations per line search
+        :param line_search_tol: line searches stop once |du . R| dropped below this fraction
+        :param predictor: starting point of a new load step, None (last converged state), "secant" / "quadratic"
+                          (extrapolated from the last two / three converged states) or "tangent" (du / dload at the
+                          last converged state, reuses its factorization), full newton only, an extrapolated start
+                          far from the kept factorization costs quasi newton more refreshes than it saves
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError("strategy must be one of %s" % (STRATEGIES,))
+        if line_search not in LINE_SEARCHES:
+            raise ValueError("line_search must be one of %s" % (LINE_SEARCHES,))
+        if predictor not in PREDICTORS:
+            raise ValueError("predictor must be one of %s" % (PREDICTORS,))
+        if predictor is not None and strategy != "newton":
+            raise ValueError("predictor needs strategy \"newton\"")
+        self.problem = problem
+        self.max_iter = max_iter
+        self.tol_increment = tol_increment
+        self.tol_residue = tol_residue
+        self.max_increment = max_increment
+        self.strategy = strategy
+        self.refresh_rate = refresh_rate
+        self.max_history = max_history
+        self.line_search = line_search
+        self.max_line_search = max_line_search
+        self.line_search_tol = line_search_tol
+        self.predictor = predictor
+        self._factorized = False
+        # configuration at which constraints hold the exact factorized tangent (after full newton)
+        self._tangent_at = None
+
+    def residue(self, u, load):
+        """
+        :param u: configuration
+        :param load: load factor
+        :return: residue, without assembling the tangent if problem provides residue(u, load)
+        """
+        if hasattr(self.problem, "residue"):
+            return self.problem.residue(u, load)
+        return self.problem.assemble(u, load)[1]
+
+    def load_vector(self, u, load, f=None):
+        """
+        :param u: configuration
+        :param load: load factor
+        :param f: residue at (u, load) if already known
+        :return: derivative of residue w.r.t. load factor
+        """
+        if hasattr(self.problem, "load_vector"):
+            return self.problem.load_vector(u, load)
+        h = 1e-7 * max(abs(load), 1)
+        if f is None:
+            f = self.residue(u, load)
+        return (self.residue(u, load + h) - f) / h
+
+    def predict(self, path, load, u):
+        """
+        :param path: EquilibriumPath so far, u is its last state
+        :param load: next load factor
+        :param u: current configuration
+        :return: starting configuration for newton at load
+        """
+        n = {"secant": 2, "quadratic": 3, "tangent": 1}.get(self.predictor, 0)
+        if n == 0 or len(path) < n or not all(path.converged[-n:]):
+            return u
+        loads = path.loads[-n:]
+        if len(set(loads)) < n:
+            return u
+        if self.predictor == "tangent":
+            problem = self.problem
+            constraints = problem.constraints
+            if self._tangent_at is not u:
+                k, f = problem.assemble(u, loads[-1])
+                constraints.solve(k, f)
+                self._factorized = True
+            v = constraints.resolve(self.load_vector(u, loads[-1]))
+            return problem.update(u, (load - loads[-1]) * v)
+        return extrapolate(loads, path.states[-n:], load)
+
+    def newton(self, u, load, max_iter=None):
+        """
+        :param u: starting configuration (not modified)
+        :param load: load factor
+        :param max_iter: overrides self.max_iter
+        :return: NewtonResult
+        """
+        max_iter = self.max_iter if max_iter is None else max_iter
+        self._tangent_at = None
+        if self.strategy != "newton":
+            return self._quasi_newton(u, load, max_iter)
+        problem = self.problem
+        constraints = problem.constraints
+        residue_norm = increments_norm = 0
+        for iter_ in range(max_iter):
+            k, f = problem.assemble(u, load)
+            du = constraints.solve(k, f, problem.prescribed(u, load))
+            residue_norm = constraints.residue_norm(f)
+            increments_norm = np.linalg.norm(du)
+            if increments_norm < self.tol_increment and residue_norm < self.tol_residue:
+                self._tangent_at = u
+                return NewtonResult(u, True, iter_, residue_norm, increments_norm, constraints.det_sign())
+            u = problem.update(u, self._step(u, load, du, f, increments_norm))
+        return NewtonResult(u, False, max_iter, residue_norm, increments_norm, constraints.det_sign())
+
+    def _step(self, u, load, du, f, increments_norm):
+        """
+        :param u: configuration
+        :param load: load factor
+        :param du: newton (or quasi newton) increment
+        :param f: residue at u
+        :param increments_norm: norm of du
+        :return: increment actually applied
+        """
+        # clamp, also the first trial and the fallback of the line searches
+        alpha = min(1.0, self.max_increment / increments_norm) if increments_norm > 0 else 1.0
+        if self.line_search is None:
+            return du * alpha
+        return du * self._line_search(u, load, du, f, alpha)
+
+    def _line_search(self, u, load, du, f, alpha0):
+        """
+        Only residues are evaluated, no tangent, decrease is measured on s(alpha) = du . R(u + alpha du)
+        (energy norm) as |R| is dominated by the stiff axial / shear dofs and barely drops along a rotation
+        :param u: configuration
+        :param load: load factor
+        :param du: search direction
+        :param f: residue at u
+        :param alpha0: clamped step, first trial and fallback if the search fails
+        :return: step length alpha along du
+        """
+        problem = self.problem
+        free = problem.constraints.free
+        s0 = np.sum(du[free] * f[free])
+        if s0 >= 0:
+            # not a descent direction of the potential
+            return alpha0
+
+        def slope(alpha):
+            return np.sum(du[free] * self.residue(problem.update(u, alpha * du), load)[free])
+
+        if self.line_search == "backtracking":
+            # halving from the clamp until |s| dropped by line_search_tol
+            alpha = alpha0
+            for _ in range(self.max_line_search):
+                if abs(slope(alpha)) <= self.line_search_tol * abs(s0):
+                    return alpha
+                alpha *= 0.5
+            return alpha0
+        # energy line search (Crisfield [1991]), regula falsi on s(alpha) starting from the clamp
+        lo, s_lo, hi, s_hi = 0.0, s0, None, None
+        alpha = best = alpha0
+        s_best = np.inf
+        for _ in range(self.max_line_search):
+            s1 = slope(alpha)
+            if abs(s1) < s_best:
+                best, s_best = alpha, abs(s1)
+            if abs(s1) <= self.line_search_tol * abs(s0):
+                break
+            if s1 < 0:
+                lo, s_lo = alpha, s1
+            else:
+                hi, s_hi = alpha, s1
+            if hi is None:
+                if alpha >= alpha0:
+                    # full step still descending, no extrapolation past newton
+                    break
+                alpha = min(2 * alpha, 1.0)
+            else:
+                alpha = lo - s_lo * (hi - lo) / (s_hi - s_lo)
+        return best if s_best < abs(s0) else alpha0
+
+    def _secant_direction(self, f, history):
+        """
+        :param f: residue
+        :param history: secant pairs
+        :return: H f, H being the updated inverse of the factorized tangent
+        """
+        constraints = self.problem.constraints
+        if self.strategy == "bfgs":
+            # two loop recursion (Matthies, Strang [1979]), pairs are (s, y, 1 / y.s)
+            q = f.copy()
+            alpha = []
+            for s, y, rho in reversed(history):
+                alpha.append(rho * np.sum(s * q))
+                q -= alpha[-1] * y
+            z = -constraints.resolve(q)
+            for (s, y, rho), a in zip(history, reversed(alpha)):
+                z += s * (a - rho * np.sum(y * z))
+            return z
+        # good broyden in product form, H_k+1 = (I + a s^T) H_k, pairs are (a, s)
+        z = -constraints.resolve(f)
+        for a, s in history:
+            z += a * np.sum(s * z)
+        return z
+
+    def _quasi_newton(self, u, load, max_iter):
+        """
+        modified newton / broyden / bfgs, exact tangent is only assembled and factorized when convergence degrades
+        :param u: starting configuration (not modified)
+        :param load: load factor
+        :param max_iter: max iterations
+        :return: NewtonResult
+        """
+        problem = self.problem
+        constraints = problem.constraints
+        history = []
+        factorizations = 0
+        refresh = not self._factorized
+        residue_norm = increments_norm = 0
+        # energy norm |du . f| of the last step taken, also the reference right after a refresh
+        previous_norm = None
+        s = hf = f_old = None
+        for iter_ in range(max_iter):
+            prescribed = problem.prescribed(u, load)
+            if prescribed and any(prescribed.values()):
+                refresh = True
+            if not refresh:
+                f = self.residue(u, load)
+                if self.strategy == "bfgs" and s is not None:
+                    y = f - f_old
+                    sy = np.sum(s * y)
+                    if sy > 0:
+                        history.append((s, y, 1 / sy))
+                if self.strategy == "modified":
+                    z = -constraints.resolve(f)
+                else:
+                    z = self._secant_direction(f, history)
+                if self.strategy == "broyden" and s is not None:
+                    # H_k y = H_k f_new - H_k f_old
+                    hy = z - hf
+                    a = (s - hy) / np.sum(s * hy)
+                    history.append((a, s))
+                    z += a * np.sum(s * z)
+                du = -z
+                residue_norm = constraints.residue_norm(f)
+                increments_norm = np.linalg.norm(du)
+                energy_norm = abs(np.sum(du * f))
+                if previous_norm is not None and not (increments_norm < self.tol_increment
+                                                      and residue_norm < self.tol_residue):
+                    # contraction of the energy norm (residue alone is dominated by stiff axial terms), a slow step
+                    # or one which at this rate would not reach tol_increment within max_iter (increment contracts
+                    # by about the square root) is replaced by the exact tangent at this state, same iteration
+                    rate = energy_norm / previous_norm if previous_norm > 0 else np.inf
+                    refresh = rate > self.refresh_rate or \
+                        increments_norm * rate ** (0.5 * (max_iter - iter_ - 1)) > self.tol_increment
+            if refresh:
+                k, f = problem.assemble(u, load)
+                du = constraints.solve(k, f, prescribed)
+                self._factorized = True
+                factorizations += 1
+                refresh = False
+                history = []
+                s = None
+                residue_norm = constraints.residue_norm(f)
+                increments_norm = np.linalg.norm(du)
+                energy_norm = abs(np.sum(du * f))
+            if increments_norm < self.tol_increment and residue_norm < self.tol_residue:
+                return NewtonResult(u, True, iter_, residue_norm, increments_norm, constraints.det_sign(),
+                                    factorizations)
+            if len(history) >= self.max_history:
+                refresh = True
+            # H_k f_old for the next broyden pair
+            hf = -du
+            du = self._step(u, load, du, f, increments_norm)
+            if np.linalg.norm(du) < 0.5 * min(increments_norm, self.max_increment):
+                # line search cut the step, direction of the old tangent is poor here
+                refresh = True
+            previous_norm = energy_norm
+            s, f_old = du, f
+            u = problem.update(u, du)
+        return NewtonResult(u, False, max_iter, residue_norm, increments_norm, constraints.det_sign(), factorizations)
+
+    def solve(self, loads, u=None, callback=None):
+        """
+        :param loads: load factors, one load step each
+        :param u: starting configuration, problem.initial_state() if None
+        :param callback: called as callback(step, load, u, result) after every load step, returning True stops
+        :return: EquilibriumPath
+        """
+        path = EquilibriumPath()
+        for step in self.iter_path(loads, u):
+            path.append(step.load, step.u, step)
+            if callback is not None and callback(step.step, step.load, step.u, step):
+                break
+        return path
+
+    def iter_path(self, loads, u=None):
+        """
+        Load stepping as a generator, every step is yielded as soon as it converges so that plotting, writers
+        (PathStore.append(step.load, step.u, step)) or stop criteria can be chained lazily, leaving the loop stops
+        the stepping
+        :param loads: load factors, one load step each
+        :param u: starting configuration, problem.initial_state() if None
+        :return: generator of PathStep, u is a read only view on the converged state (no copy)
+        """
+        u = self.problem.initial_state() if u is None else u
+        # last steps, all the predictor needs, problem.update returns new arrays so converged states are not copied
+        recent = None if self.predictor is None else EquilibriumPath(keep=3)
+        for step, load in enumerate(loads):
+            result = self.newton(u if recent is None else self.predict(recent, load, u), load)
+            u = result.u
+            if recent is not None:
+                recent.append(load, u, result, copy=False)
+            view = u.view()
+            view.flags.writeable = False
+            yield PathStep(step, load, view, result.residue_norm, result.increments_norm, result.iterations,
+                           result.converged, result.det_sign, result.factorizations)
+
+    def solve_adaptive(self, load_max, u=None, load=0, dload=None, dload_min=None, dload_max=None, desired_iter=8,
+                       max_iter=25, callback=None, checkpoint=None, checkpoint_every=1, path=None, step=None):
+        """
+        Adaptive load stepping, increment grows after quick convergence, a step which does not converge within
+        max_iter is retried from the last converged state with half the increment
+        :param load_max: final load factor (hit exactly)
+        :param u: starting configuration, problem.initial_state() if None
+        :param load: load factor of u
+        :param dload: initial increment, (load_max - load) / 10 if None
+        :param dload_min: smallest increment before giving up, 1e-6 * dload if None
+        :param dload_max: largest increment, load_max - load if None
+        :param desired_iter: newton iterations aimed at per step
+        :param max_iter: newton iterations before a step is cut back
+        :param callback: called as callback(step, load, u, result) after every accepted step, returning True stops
+        :param checkpoint: .npz written every checkpoint_every accepted steps, see resume
+        :param checkpoint_every: accepted steps between checkpoints
+        :param path: EquilibriumPath the steps are appended to (predictor history), new if None
+        :param step: number of the first new step (callbacks and checkpoints), len(path) if None
+        :return: EquilibriumPath, iteration counts of rejected attempts in path.rejected
+        """
+        u = self.problem.initial_state() if u is None else u
+        span = load_max - load
+        dload = abs(span) / 10 if dload is None else abs(dload)
+        dload_min = 1e-6 * dload if dload_min is None else dload_min
+        dload_max = abs(span) if dload_max is None else dload_max
+        direction = np.sign(span)
+        path = EquilibriumPath() if path is None else path
+        step = len(path) if step is None else step
+        while direction * (load_max - load) > 0:
+            dload = min(dload, direction * (load_max - load))
+            result = self.newton(self.predict(path, load + direction * dload, u), load + direction * dload, max_iter)
+            if not result.converged:
+                path.rejected.append((load + direction * dload, result.iterations))
+                dload *= 0.5
+                if dload < dload_min:
+                    break
+                continue
+            load += direction * dload
+            u = result.u
+            path.append(load, u, result)
+            stop = callback is not None and callback(step, load, u, result)
+            step += 1
+            dload = min(dload_max, adapt_step(dload, result.iterations, desired_iter))
+            if checkpoint is not None and (step % checkpoint_every == 0 or stop
+                                           or direction * (load_max - load) <= 0):
+                self.save_checkpoint(checkpoint, path, step, load_max, dload, dload_min, dload_max, desired_iter,
+                                     max_iter)
+            if stop:
+                break
+        return path
+
+    def save_checkpoint(self, file, path, step, load_max, dload, dload_min, dload_max, desired_iter, max_iter):
+        """
+        Last converged state with everything solve_adaptive needs to carry on, problems with path dependent
+        state provide history() -> {name: array} and set_history(history)
+        :param file: path of the .npz
+        :param path: EquilibriumPath so far, its last 3 steps are kept for the predictor
+        :param step: number of accepted steps since the start of the run
+        """
+        history = self.problem.history() if hasattr(self.problem, "history") else None
+        n = min(len(path), 3)
+        save_checkpoint(file, u=path.states[-1], load=path.loads[-1], step=step, load_max=load_max, dload=dload,
+                        dload_min=dload_min, dload_max=dload_max, desired_iter=desired_iter, max_iter=max_iter,
+                        loads=np.array(path.loads[-n:]), states=np.array(path.states[-n:]),
+                        iterations=np.array(path.iterations[-n:]), history=history)
+
+    def resume(self, file, load_max=None, callback=None, checkpoint_every=1):
+        """
+        Carries on solve_adaptive from a checkpoint, keeps checkpointing to the same file
+        :param file: .npz written by solve_adaptive(..., checkpoint=file)
+        :param load_max: final load factor, the checkpointed one if None (a higher one extends the run)
+        :param callback: see solve_adaptive
+        :param checkpoint_every: see solve_adaptive
+        :return: EquilibriumPath, starting with the (up to 3) last steps kept in the checkpoint
+        """
+        state = load_checkpoint(file)
+        if "history" in state:
+            self.problem.set_history(state["history"])
+        path = EquilibriumPath()
+        for load, u, iterations in zip(state["loads"], state["states"], state["iterations"]):
+            path.append(float(load), u, NewtonResult(u, True, int(iterations), 0, 0))
+        load_max = state["load_max"] if load_max is None else load_max
+        dload_max = state["dload_max"]
+        if abs(load_max - state["load"]) > dload_max:
+            dload_max = abs(load_max - state["load"])
+        return self.solve_adaptive(load_max, state["u"], state["load"], state["dload"], state["dload_min"], dload_max,
+                                   state["desired_iter"], state["max_iter"], callback, file, checkpoint_every, path,
+                                   state["step"])
+
+    def negative_eigenvalues(self, u, load):
+        """
+        Inertia of the tangent from an LDL^T, unlike the sign of det this also sees a pair of eigenvalues
+        crossing zero (double buckling eigenvalue of a circular cross section)
+        :param u: configuration
+        :param load: load factor
+        :return: number of negative eigenvalues, the tangent of the last newton iteration is reused if taken at u
+        """
+        constraints = self.problem.constraints
+        if self._tangent_at is not u:
+            k, _ = self.problem.assemble(u, load)
+            constraints.apply(k)
+            return constraints.negative_eigenvalues(k)
+        return constraints.negative_eigenvalues()
+
+    def bisect_critical_load(self, u, load_a, load_b, negative, tol=1e-6, max_bisections=60):
+        """
+        Bisection on load parameter, the tangent has negative negative eigenvalues at load_a and more at load_b
+        (or newton does not converge at load_b, limit point)
+        :param u: converged configuration at load_a
+        :param load_a: load before critical point
+        :param load_b: load after critical point
+        :param negative: number of negative eigenvalues at load_a
+        :param tol: relative tolerance on critical load
+        :param max_bisections: max number of bisections
+        :return: critical load, configuration at largest load with unchanged count
+        """
+        for _ in range(max_bisections):
+            if abs(load_b - load_a) <= tol * max(abs(load_a), abs(load_b), 1):
+                break
+            load = 0.5 * (load_a + load_b)
+            result = self.newton(u, load)
+            if result.converged and self.negative_eigenvalues(result.u, load) == negative:
+                load_a, u = load, result.u
+            else:
+                load_b = load
+        return 0.5 * (load_a + load_b), u
+
+    def find_critical_load(self, loads, u=None, tol=1e-6):
+        """
+        Coarse load stepping until the number of negative eigenvalues of the tangent changes (or a step does
+        not converge), critical load is then found by bisection
+        :param loads: coarse load factors
+        :param u: starting configuration, problem.initial_state() if None
+        :param tol: relative tolerance on critical load
+        :return: critical load (None if not crossed), configuration just before it, EquilibriumPath of coarse steps
+        """
+        u = self.problem.initial_state() if u is None else u
+        path = EquilibriumPath()
+        negative = None
+        for load in loads:
+            result = self.newton(u, load)
+            count = self.negative_eigenvalues(result.u, load) if result.converged else None
+            if negative is not None and count != negative:
+                load_c, u_c = self.bisect_critical_load(u, path.loads[-1], load, negative, tol)
+                return load_c, u_c, path
+            if not result.converged:
+                # no converged step to bracket from
+                return None, u, path
+            u, negative = result.u, count
+            path.append(load, u, result)
+        return None, u, path
@@ -0,0 +1,130 @@
+"""
+Parameter sweeps
+every grid point is an independent static solve, points are farmed out to a process pool
+and the results are gathered in one long table indexed by the swept parameters,
+run_continuation instead walks chains of neighbouring points, each solve seeded from the last converged state
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+MIN_CHAIN = 3
+
+
+def parameter_grid(**axes):
+    """
+    :param axes: parameter name -> values
+    :return: list of {name: value}, cartesian product with last axis varying fastest
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def _run(args):
+    """
+    :param args: (fn, point), module level so that it can be pickled
+    :return: fn(**point)
+    """
+    fn, point = args
+    return fn(**point)
+
+
+def run_sweep(fn, grid, processes=None):
+    """
+    :param fn: module level function fn(**point) -> {column: scalar or 1d array}, arrays of one point share length
+    :param grid: list of parameter dicts, see parameter_grid
+    :param processes: number of worker processes, every core if None, 1 solves in this process
+    :return: DataFrame indexed by the parameters and the row within a point
+    """
+    if processes == 1:
+        results = [fn(**point) for point in grid]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(_run, [(fn, point) for point in grid]))
+    return _table(grid, results)
+
+
+def _table(grid, results):
+    """
+    :param grid: list of parameter dicts
+    :param results: {column: scalar or 1d array} of every point of grid
+    :return: DataFrame indexed by the parameters and the row within a point
+    """
+    frames = []
+    for point, result in zip(grid, results):
+        columns = {k: np.ravel(v) for k, v in result.items()}
+        n = max(len(v) for v in columns.values())
+        df = pd.DataFrame({k: np.broadcast_to(v, n) for k, v in columns.items()})
+        for name, value in point.items():
+            df[name] = value
+        df["row"] = np.arange(n)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True).set_index(list(grid[0]) + ["row"])
+
+
+def order_by_proximity(points):
+    """
+    Greedy nearest neighbour chain, starts at first point, every axis is scaled by its range
+    :param points: list of parameter dicts with numeric values
+    :return: indices of points in chain order
+    """
+    x = np.array([list(point.values()) for point in points], dtype=float).reshape(len(points), -1)
+    span = np.ptp(x, axis=0)
+    x = x / np.where(span > 0, span, 1)
+    order = [0]
+    left = list(range(1, len(points)))
+    while left:
+        nearest = int(np.argmin(np.sum(np.abs(x[left] - x[order[-1]]), axis=1)))
+        order.append(left.pop(nearest))
+    return order
+
+
+def _run_chain(args):
+    """
+    :param args: (fn, chain), module level so that it can be pickled
+    :return: columns of every point of chain, in chain order
+    """
+    fn, chain = args
+    u = None
+    results = []
+    for point in chain:
+        columns, u = fn(u, **point)
+        results.append(columns)
+    return results
+
+
+def run_continuation(fn, grid, processes=None, restart_on=(), min_chain=MIN_CHAIN):
+    """
+    Points sharing the values of restart_on form a chain, chains are ordered by order_by_proximity
+    and solved one after the other in a worker, different chains run in parallel, chains are cut into
+    contiguous pieces (each started cold) so that every worker gets one, but never shorter than min_chain
+    as a piece of one or two points pays the cold start without being warm started
+    :param fn: module level function fn(u, **point) -> ({column: scalar or 1d array}, converged state),
+               u is the converged state of the previous point in the chain, None at the start of a chain
+    :param grid: list of parameter dicts, see parameter_grid
+    :param processes: number of worker processes, every core if None, 1 solves in this process
+    :param restart_on: axes across which states can not be reused (e.g. mesh size)
+    :param min_chain: least number of points of a piece
+    :return: DataFrame indexed by the parameters and the row within a point, in grid order
+    """
+    chains = {}
+    for i, point in enumerate(grid):
+        chains.setdefault(tuple(point[name] for name in restart_on), []).append(i)
+    chains = [[chain[j] for j in order_by_proximity([grid[i] for i in chain])] for chain in chains.values()]
+    workers = os.cpu_count() if processes is None else processes
+    if len(chains) < workers:
+        chains = [list(piece) for chain in chains for piece in np.array_split(
+            chain, max(1, min(len(chain) // min_chain, round(workers * len(chain) / len(grid)))))]
+    jobs = [(fn, [grid[i] for i in chain]) for chain in chains]
+    if processes == 1:
+        done = [_run_chain(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            done = list(pool.map(_run_chain, jobs))
+    results = [None] * len(grid)
+    for chain, columns in zip(chains, done):
+        for i, c in zip(chain, columns):
+            results[i] = c
+    return _table(grid, results)
@@ -0,0 +1,97 @@
+"""
+Length scale study of the clamped-clamped strain gradient rod, see unclassical_graph.py
+every (l0, alpha, number of elements, load) is solved in its own process,
+strain profiles of all of them land in assets/l0_sweep.csv which grav.py plots,
+with CONTINUATION every case of a mesh is instead seeded from its nearest already converged neighbour
+"""
+import os
+import numpy as np
+from include.problem import GradientRodProblem, gradient_elasticity
+from include.staticsolver import StaticSolver
+from include.sweep import parameter_grid, run_sweep, run_continuation
+
+MAX_ITER = 60  # Max newton raphson iteration
+L = 1
+ngpt = 3
+STRETCH = 1.05  # prescribed r'_3 at both ends
+LOAD_INCREMENTS = 11
+PROCESSES = None  # every core
+CONTINUATION = True  # reuse converged neighbours instead of walking the load path for every case
+
+"""
+SET MATERIAL PROPERTIES
+-----------------------------------------------------------------------------------------------------------------------
+"""
+E0 = 10 ** 8
+G0 = E0 / 2.0
+d = 1 / 1000 * 25.0
+A = np.pi * d ** 2 * 0.25
+i0 = np.pi * d ** 4 / 64
+J = i0 * 2
+
+
+def extension_problem(l0, alpha, number_of_elements):
+    """
+    r, r' held at s = 0, r, r' held at s = L except r_3 and r'_3 of both ends which are prescribed
+    :param l0: length scale parameter
+    :param alpha: bending stiffness about E1 relative to E2
+    :param number_of_elements: number of elements
+    :return: GradientRodProblem, load factor is the end moment about E1 at s = L
+    """
+    fixed = list(range(6)) + [-7, -8, -9, -10, -11, -12]
+    return GradientRodProblem(gradient_elasticity(E0, G0, A, i0, J, l0, alpha), number_of_elements, L, ngpt, fixed,
+                              nodal_load={-6: 1},
+                              prescribed=lambda u, f: {5: STRETCH - u[5, 0], -7: STRETCH - u[-7, 0], -10: L - u[-10, 0]})
+
+
+def _columns(problem, u, converged, iterations):
+    """
+    :return: nodal coordinates, extensional strain r'_3 - 1, theta_1, convergence, newton iterations
+    """
+    return {"s": problem.node_data, "strain": u[5::12, 0] - 1, "theta1": u[6::12, 0],
+            "converged": converged, "iterations": iterations}
+
+
+def extension_strain(l0, alpha, number_of_elements, load):
+    """
+    Full load path from the straight rod
+    :param l0: length scale parameter
+    :param alpha: bending stiffness about E1 relative to E2
+    :param number_of_elements: number of elements
+    :param load: end moment about E1 at s = L
+    :return: see _columns
+    """
+    problem = extension_problem(l0, alpha, number_of_elements)
+    path = StaticSolver(problem, MAX_ITER).solve(np.linspace(0, load, LOAD_INCREMENTS))
+    return _columns(problem, path.states[-1], path.converged[-1], path.total_iterations)
+
+
+def extension_strain_from(u, l0, alpha, number_of_elements, load):
+    """
+    Newton at the final load from u (continuation in the parameters at fixed load),
+    falls back to the full load path at the start of a chain or if u is too far off
+    :param u: converged state of a neighbouring case on the same mesh, None if there is none
+    :return: see _columns, converged state
+    """
+    problem = extension_problem(l0, alpha, number_of_elements)
+    solver = StaticSolver(problem, MAX_ITER)
+    iterations = 0
+    if u is not None:
+        result = solver.newton(u, load)
+        if result.converged:
+            return _columns(problem, result.u, True, result.iterations), result.u
+        iterations = result.iterations
+    path = solver.solve(np.linspace(0, load, LOAD_INCREMENTS))
+    u = path.states[-1]
+    return _columns(problem, u, path.converged[-1], iterations + path.total_iterations), u
+
+
+if __name__ == "__main__":
+    grid = parameter_grid(l0=[0, 0.05, 0.1, 0.2, 0.5, 0.8, 1], alpha=[1], number_of_elements=[100], load=[0])
+    if CONTINUATION:
+        results = run_continuation(extension_strain_from, grid, PROCESSES, restart_on=("number_of_elements",))
+    else:
+        results = run_sweep(extension_strain, grid, PROCESSES)
+    os.makedirs("assets", exist_ok=True)
+    results.to_csv("assets/l0_sweep.csv")
+    print(results.groupby(level=[0, 1, 2, 3])[["converged", "iterations"]].first())
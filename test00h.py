@@ -4,12 +4,11 @@ classical_rod.py works using quaternions for rotation interpolations,
 go to etc. for other methods to interpolate rotations
 """
 import numpy as np
-import time
-from gradientsolver import solver1d as sol
-from scipy import linalg as la
-from include import slerp as slerpsol, quaternion_smith as quat_sol
 import matplotlib.pyplot as plt
 from include.AnimationController import ControlledAnimation
+from include.problem import GradientRodProblem
+from include.staticsolver import StaticSolver
+from include.stability import StabilityMonitor
 
 try:
     import scienceplots
@@ -20,154 +19,6 @@ except ImportError as e:
 
 np.set_printoptions(linewidth=250)
 
-"""
-Main loop
-"""
-
-
-def fea(load_iter_, is_halt=False):
-    """
-    :param load_iter_: Load index
-    :param is_halt: signals animator if user requested a pause
-    :return: use input , True if user want to stop animation
-    """
-    global u
-    global du
-    global residue_norm
-    global increments_norm
-    global is_log_residue
-    global KG0
-    global FG0
-    global u_buckled
-    global is_buckled
-    global u_pre
-    KG, FG = sol.init_stiffness_force(numberOfNodes, DOF)
-    for iter_ in range(MAX_ITER):
-        KG *= 0
-        FG *= 0
-        # Follower load
-        s = sol.get_rotation_from_theta_tensor(u[-6: -3]) @ np.array([0, fapp__[load_iter_], 0])[:, None] * 0
-        # FG[-12: -9] = s
-        # Pure Bending
-        FG[-10, 0] = fapp__[load_iter_]
-        for elm in range(numberOfElements):
-            n = icon[elm][1:]
-            xloc = node_data[n][:, None]
-            rloc = np.zeros((3, 4))
-            tloc = np.zeros((3, 4))
-            rloc[:, [0, 2]] = np.array([u[DOF * n, 0], u[DOF * n + 1, 0], u[DOF * n + 2, 0]])
-            rloc[:, [1, 3]] = np.array([u[DOF * n + 3, 0], u[DOF * n + 4, 0], u[DOF * n + 5, 0]])
-            tloc[:, [0, 2]] = np.array([u[DOF * n + 6, 0], u[DOF * n + 7, 0], u[DOF * n + 8, 0]])
-            tloc[:, [1, 3]] = np.array([u[DOF * n + 9, 0], u[DOF * n + 10, 0], u[DOF * n + 11, 0]])
-            kloc, floc = sol.init_stiffness_force(nodesPerElement, DOF)
-            gloc = np.zeros((DOF, 1))
-            for xgp in range(len(wgp)):
-                # N_, Bmat = sol.get_lagrange_fn(gp[xgp], element_type)
-                le = xloc[-1][0] - xloc[0][0]
-                Jac = le / 2
-                N_, Nx_, Nxx_ = sol.get_hermite_fn(gp[xgp], Jac, element_type)
-                N_, Nx_, Nxx_ = N_[:, None], Nx_[:, None], Nxx_[:, None]
-                rds = rloc @ Nx_
-                rdsds = rloc @ Nxx_
-                tds = tloc @ Nx_
-                tdsds = tloc @ Nxx_
-                k = tds
-                kp = tdsds
-                Rot = sol.get_rotation_from_theta_tensor(tloc @ N_)
-                v = Rot.T @ rds
-                Rotds = Rot @ sol.skew(k)
-                vp = Rotds.T @ rds + Rot.T @ rdsds
-                # print(v[:, 0])
-                gloc[0: 3] = Rot @ ElasticityExtension @ (v - np.array([0, 0, 1])[:, None])
-                gloc[3: 6] = Rot @ ElasticityExtensionH @ vp
-                gloc[6: 9] = Rot @ ElasticityBending @ k
-                gloc[9: 12] = Rot @ ElasticityBendingH @ kp
-                tangent, res = sol.get_higher_order_tangent_residue(N_, Nx_, Nxx_, rds, rdsds, Rot, Rotds,
-                                                                    ElasticityExtension,
-                                                                    ElasticityBending, ElasticityExtensionH,
-                                                                    ElasticityBendingH, k, DOF, gloc, element_type)
-                floc += res * wgp[xgp] * Jac
-                kloc += tangent * wgp[xgp] * Jac
-            iv = np.array(sol.get_assembly_vector(DOF, n))
-
-            FG[iv[:, None], 0] += floc
-            KG[iv[:, None], iv] += kloc
-        # TODO: Make a generalized function for application of point as well as body loads
-        f = np.zeros((12, 12))
-        f[0: 3, 6: 9] = -sol.skew(s)
-        KG[-12:, -12:] += f
-        # dsf = tg - KG
-        for ibc in range(12):
-            sol.impose_boundary_condition(KG, FG, ibc, 0 + (-1 + u[5, 0]) * (ibc == 5))
-        for ibc in [-6, -5, -4, -12, -11]:
-            sol.impose_boundary_condition(KG, FG, ibc, 0 + (-1 + u[-7, 0]) * (ibc == -7))
-        # sol.impose_boundary_condition(KG, FG, -3, 0)
-
-        du = -sol.get_displacement_vector(KG, FG)
-        residue_norm = np.linalg.norm(FG)
-
-        increments_norm = np.linalg.norm(du)
-        if increments_norm > 1:
-            du = du / increments_norm
-        if increments_norm < 1e-3 and residue_norm < 1e-3:
-            break
-        """
-        Configuration update (not working as of now) for angles greater than 360 deg, Make this work for multi-axis rotations
-        """
-        # for i in range(numberOfNodes):
-        #     q = slerpsol.rotation_vector_to_quaterion(u[6 * i + 3: 6 * i + 6, 0])
-        #     dq = slerpsol.rotation_vector_to_quaterion(du[6 * i + 3: 6 * i + 6, 0])
-        #     q = slerpsol.quatmul(q, dq)
-        #     u[6 * i + 3: 6 * i + 6, 0] = slerpsol.quaterion_to_rotation_vec(q)
-        #     u[6 * i + 0: 6 * i + 3] += du[6 * i + 0: 6 * i + 3]
-        """
-        Approx. configuration update
-        """
-        # TODO: Change this, it works perfectly if two rotations are about one axis (R_(i+1) = exp(dtheta_i) * exp(theta_i))
-        u += du
-
-    if is_log_residue:
-        if False or not is_buckled:
-            mvi = np.array([i for i in range(numberOfNodes)])
-            eigenvalues, eigenvectors = la.eig(KG)
-            eigenvalues = eigenvalues.real
-            idx = eigenvalues.argsort()
-            eigenvalues = eigenvalues[idx]
-            eigenvectors = eigenvectors[:, idx]
-            if eigenvalues[0] < 0:
-                print(eigenvectors[DOF * mvi + 0, 0])
-                print(eigenvalues[:])
-                print("-----------------------------------")
-                u_buckled = eigenvectors[:, 1][:, None]
-
-                u_pre = u
-                u_buckled = u_buckled + u_pre
-
-                print(u_buckled[DOF * mvi + 5, 0])
-                print(u_pre[DOF * mvi + 5, 0])
-
-                print(u_buckled[DOF * mvi, 0])
-                print(u_pre[DOF * mvi, 0])
-
-                print(u_buckled[DOF * mvi + 1, 0])
-                print(u_pre[DOF * mvi + 1, 0])
-
-                print(u_buckled[DOF * mvi + 2, 0])
-                print(u_pre[DOF * mvi + 2, 0])
-
-                is_buckled = True
-        else:
-            pass
-        # u_buckled = u * 0
-        print(
-            "--------------------------------------------------------------------------------------------------------------------------------------------------",
-            fapp__[load_iter_], load_iter_)
-        print(residue_norm, increments_norm)
-        # vv = np.array([i for i in range(numberOfNodes) if i % 2 == 0])
-        # print(u[DOF * vv + 6, 0])
-    return is_halt
-
-
 """
 Set Finite Element Parameters
 """
@@ -175,23 +26,13 @@ DIMENSIONS = 1
 DOF = 12
 
 MAX_ITER = 60  # Max newton raphson iteration
+# newton starts from the last converged state extrapolated in load, None, "secant", "quadratic" or "tangent"
+PREDICTOR = None
 element_type = 2
 L = 1
 numberOfElements = 20
-
-icon, node_data = sol.get_connectivity_matrix(numberOfElements, L, element_type)
-numberOfNodes = len(node_data)
 ngpt = 3
-wgp, gp = sol.init_gauss_points(ngpt)
 
-# Setting up displacement vectors
-u = np.zeros((numberOfNodes * DOF, 1))
-du = np.zeros((numberOfNodes * DOF, 1))
-nodesPerElement = element_type ** DIMENSIONS
-KG0, FG0 = sol.init_stiffness_force(numberOfNodes, DOF)
-u_buckled = np.zeros_like(u)
-u_pre = np.zeros_like(u)
-is_buckled = False
 """
 SET MATERIAL PROPERTIES
 -----------------------------------------------------------------------------------------------------------------------
@@ -264,6 +105,18 @@ print("Buckling load for compression l = 0 :", 1 / 4 * np.pi ** 2 * ElasticityBe
 #                               [0, 0, 0.5 * EI]])
 
 
+"""
+Compressive dead load on r_3 at s = L, r and r' clamped at s = 0 with r'_3 held at 1, r'_1, r'_2 and r_1 held at s = L
+"""
+problem = GradientRodProblem((ElasticityExtension, ElasticityBending, ElasticityExtensionH, ElasticityBendingH),
+                             numberOfElements, L, ngpt, fixed=list(range(12)) + [-6, -5, -4, -12, -11],
+                             nodal_load={-10: 1}, prescribed=lambda u, load: {5: 1 - u[5, 0]})
+solver = StaticSolver(problem, MAX_ITER, tol_increment=1e-3, predictor=PREDICTOR)
+constraints = problem.constraints
+monitor = StabilityMonitor(constraints)
+node_data = problem.node_data
+numberOfNodes = problem.number_of_nodes
+
 """
 Markers
 """
@@ -273,29 +126,13 @@ vii = np.array([i for i in range(numberOfNodes) if i & 1 == 0])
 """
 Starting point
 """
-# u = np.zeros((numberOfNodes * DOF, 1))
-u[DOF * vi + 2, 0] = node_data
-u[DOF * vi + 5, 0] = 1
 residue_norm = 0
 increments_norm = 0
-# since rod is lying straight in E3 direction it's centerline will have these coordinates
-
-# Thetas are zero
-
-r1 = np.zeros(numberOfNodes)
-r2 = np.zeros(numberOfNodes)
-r3 = np.zeros(numberOfNodes)
-for i in range(numberOfNodes):
-    r1[i] = u[DOF * i][0]
-    r2[i] = u[DOF * i + 1][0]
-    r3[i] = u[DOF * i + 2][0]
-
-"""
-Initialize Graph
-"""
-fig, (ax, ay) = plt.subplots(1, 2, figsize=(16, 5), width_ratios=[1, 2])
-ax.set_xlim(0, L)
-ax.plot(r3, r2, label="un-deformed", marker="o")
+# since rod is lying straight in E3 direction it's centerline will have these coordinates, r' = E3, thetas are zero
+u = problem.initial_state()
+u_buckled = np.zeros_like(u)
+u_pre = np.zeros_like(u)
+is_buckled = False
 
 """
 Set load and load steps
@@ -307,6 +144,67 @@ fapp__ = np.linspace(0, max_load, LOAD_INCREMENTS)
 
 marker_ = fapp__
 # marker_ = np.insert(marker_, 0, [2000, 6000, 12000], axis=0)
+# load steps are solved lazily as the animation asks for them, path holds the snapshot of every converged step
+steps = solver.iter_path(fapp__, u)
+path = []
+
+"""
+Main loop
+"""
+
+
+def fea(load_iter_, is_halt=False):
+    """
+    :param load_iter_: Load index
+    :param is_halt: signals animator if user requested a pause
+    :return: use input , True if user want to stop animation
+    """
+    global u
+    global residue_norm
+    global increments_norm
+    global u_buckled
+    global is_buckled
+    global u_pre
+    while len(path) <= load_iter_:
+        path.append(next(steps))
+        # inertia of the converged tangent from its LDL^T (the sign of det misses pairs of eigenvalues crossing
+        # together), eigenpairs only once it turns unstable, for the mode
+        if is_log_residue and not is_buckled and constraints.negative_eigenvalues() > 0:
+            mvi = np.array([i for i in range(numberOfNodes)])
+            eigenvalues, eigenvectors = monitor.update(constraints.k)
+            if not monitor.is_stable():
+                print(eigenvectors[DOF * mvi + 0, 0])
+                print(eigenvalues[:])
+                print("-----------------------------------")
+                u_buckled = eigenvectors[:, 1][:, None]
+
+                u_pre = path[-1].u
+                u_buckled = u_buckled + u_pre
+
+                print(u_buckled[DOF * mvi + 5, 0])
+                print(u_pre[DOF * mvi + 5, 0])
+
+                print(u_buckled[DOF * mvi, 0])
+                print(u_pre[DOF * mvi, 0])
+
+                print(u_buckled[DOF * mvi + 1, 0])
+                print(u_pre[DOF * mvi + 1, 0])
+
+                print(u_buckled[DOF * mvi + 2, 0])
+                print(u_pre[DOF * mvi + 2, 0])
+
+                is_buckled = True
+    step = path[load_iter_]
+    u = step.u
+    residue_norm, increments_norm = step.residue_norm, step.increments_norm
+    if is_log_residue:
+        print(
+            "--------------------------------------------------------------------------------------------------------------------------------------------------",
+            fapp__[load_iter_], load_iter_)
+        print(residue_norm, increments_norm)
+    return is_halt
+
+
 """
 ------------------------------------------------------------------------------------------------------------------------------------
 Post Processing
@@ -357,47 +255,54 @@ def act(i):
         controlled_animation.disconnect()
 
 
-ay.scatter(0, 0, marker=".", label="horizontal tip displacement")
-ay.scatter(0, 0, marker="+", label="vertical tip displacement")
-ay.legend()
-ay.axhline(y=0)
-ay.set_xlabel(r"LOAD", fontsize=16)
-ay.set_ylabel(r"Tip Displacement", fontsize=16)
-ax.set_xlabel(r"$r_3$", fontsize=25)
-ax.set_ylabel(r"$r_2$", fontsize=25)
-ax.set_ylim(-85, 41)
-y = u[DOF * vi + 1, 0]
-x = u[DOF * vi + 2, 0]
-line1, = ax.plot(x, y)
-ax.set_title("Centerline displacement")
-ay.set_title("Tip Displacement vs Load")
-controlled_animation = ControlledAnimation(fig, act, frames=len(fapp__), video_request=video_request, repeat=False)
-controlled_animation.start()
-l0 = l0 / L
-from mpl_toolkits import mplot3d
-
-fig4 = plt.figure(figsize=(10, 10))
-a0 = plt.axes(projection='3d')
-a0.grid()
-z = u_buckled[DOF * vi + 1, 0]
-y = u_buckled[DOF * vi + 2, 0]
-x = u_buckled[DOF * vi + 3, 0]
-a0.plot3D(x, y, z, label="b")
-z1 = u_pre[DOF * vi + 1, 0]
-y1 = u_pre[DOF * vi + 2, 0]
-x1 = u_pre[DOF * vi + 3, 0]
-a0.plot3D(x1, y1, z1, label="nb")
-a0.legend()
-a0.axis("equal")
-# df1 = pd.DataFrame([node_data])
-# df1.loc[len(df1)] = u[DOF * vi + 5, 0] - 1
-# df2 = pd.DataFrame([node_data])
-# df2.loc[len(df2)] = u[DOF * vi + 2, 0] - node_data
-# df1.to_csv('GFG1.csv', index=False, header=False)
-# df2.to_csv('GFG2.csv', index=False, header=False)
-plt.show()
-print("Buckling load for l = 0 : ", 4.013 / L / L * np.sqrt(ElasticityBending[1, 1] * ElasticityBending[2, 2]))
-print(u[-12:, 0])
-print(L - u[-12:, 0])
-print(-L * fapp__[-1] / ElasticityExtension[2, 2] + L)
-print(max_load / ElasticityExtension[2, 2] * (node_data + l0 * np.sinh((1 - 2 * node_data) / 2 / l0) / (np.cosh(1 / 2 / l0)) - l0 * np.tanh(1 / 2 / l0)))
\ No newline at end of file
+if __name__ == "__main__":
+    """
+    Initialize Graph
+    """
+    fig, (ax, ay) = plt.subplots(1, 2, figsize=(16, 5), width_ratios=[1, 2])
+    ax.set_xlim(0, L)
+    ax.plot(node_data, np.zeros(numberOfNodes), label="un-deformed", marker="o")
+    ay.scatter(0, 0, marker=".", label="horizontal tip displacement")
+    ay.scatter(0, 0, marker="+", label="vertical tip displacement")
+    ay.legend()
+    ay.axhline(y=0)
+    ay.set_xlabel(r"LOAD", fontsize=16)
+    ay.set_ylabel(r"Tip Displacement", fontsize=16)
+    ax.set_xlabel(r"$r_3$", fontsize=25)
+    ax.set_ylabel(r"$r_2$", fontsize=25)
+    ax.set_ylim(-85, 41)
+    y = u[DOF * vi + 1, 0]
+    x = u[DOF * vi + 2, 0]
+    line1, = ax.plot(x, y)
+    ax.set_title("Centerline displacement")
+    ay.set_title("Tip Displacement vs Load")
+    controlled_animation = ControlledAnimation(fig, act, frames=len(fapp__), video_request=video_request, repeat=False)
+    controlled_animation.start()
+    l0 = l0 / L
+    from mpl_toolkits import mplot3d
+
+    fig4 = plt.figure(figsize=(10, 10))
+    a0 = plt.axes(projection='3d')
+    a0.grid()
+    z = u_buckled[DOF * vi + 1, 0]
+    y = u_buckled[DOF * vi + 2, 0]
+    x = u_buckled[DOF * vi + 3, 0]
+    a0.plot3D(x, y, z, label="b")
+    z1 = u_pre[DOF * vi + 1, 0]
+    y1 = u_pre[DOF * vi + 2, 0]
+    x1 = u_pre[DOF * vi + 3, 0]
+    a0.plot3D(x1, y1, z1, label="nb")
+    a0.legend()
+    a0.axis("equal")
+    # df1 = pd.DataFrame([node_data])
+    # df1.loc[len(df1)] = u[DOF * vi + 5, 0] - 1
+    # df2 = pd.DataFrame([node_data])
+    # df2.loc[len(df2)] = u[DOF * vi + 2, 0] - node_data
+    # df1.to_csv('GFG1.csv', index=False, header=False)
+    # df2.to_csv('GFG2.csv', index=False, header=False)
+    plt.show()
+    print("Buckling load for l = 0 : ", 4.013 / L / L * np.sqrt(ElasticityBending[1, 1] * ElasticityBending[2, 2]))
+    print(u[-12:, 0])
+    print(L - u[-12:, 0])
+    print(-L * fapp__[-1] / ElasticityExtension[2, 2] + L)
+    print(max_load / ElasticityExtension[2, 2] * (node_data + l0 * np.sinh((1 - 2 * node_data) / 2 / l0) / (np.cosh(1 / 2 / l0)) - l0 * np.tanh(1 / 2 / l0)))
@@ -0,0 +1,8 @@
+"""
+Drivers and include/ are imported from the repository root, figures never open a window
+"""
+import os
+import sys
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,72 @@
+import numpy as np
+from include import solver1d as sol
+from include.assembly import SparseAssembler, factorize, negative_eigenvalues, SparseLU, DenseLU, permutation_sign
+
+
+def _dense_assembly(icon, nnod, dof, kloc, floc):
+    k, f = sol.init_stiffness_force(nnod, dof)
+    for elm, n in enumerate(icon):
+        iv = np.array(sol.get_assembly_vector(dof, n[1:]))
+        k[iv[:, None], iv] += kloc[elm]
+        f[iv] += floc[elm]
+    return k, f
+
+
+def test_sparse_matches_dense_assembly():
+    rng = np.random.default_rng(0)
+    for element_type in (2, 3):
+        icon, node_data = sol.get_connectivity_matrix(7, 1, element_type)
+        nnod, dof = len(node_data), 6
+        kloc = rng.standard_normal((len(icon), element_type * dof, element_type * dof))
+        floc = rng.standard_normal((len(icon), element_type * dof, 1))
+        assembler = SparseAssembler(icon, nnod, dof)
+        assembler.add_all(kloc, floc)
+        knod = rng.standard_normal((dof, dof))
+        assembler.add_nodal(nnod - 1, knod)
+        k, f = _dense_assembly(icon, nnod, dof, kloc, floc)
+        k[-dof:, -dof:] += knod
+        np.testing.assert_allclose(assembler.tobsr().toarray(), k, atol=1e-12)
+        np.testing.assert_allclose(assembler.force, f, atol=1e-12)
+        np.testing.assert_allclose(assembler.scatter_force(floc), f, atol=1e-12)
+        assembler.reset()
+        assert not assembler.tobsr().toarray().any() and not assembler.force.any()
+
+
+def test_det_sign_of_every_factorization():
+    rng = np.random.default_rng(1)
+    for _ in range(10):
+        k = rng.standard_normal((12, 12)) + 3 * np.diag(rng.choice([-1, 1], 12))
+        sign = np.sign(np.linalg.det(k))
+        assert DenseLU(k).det_sign() == sign
+        assert SparseLU(k).det_sign() == sign
+
+
+def test_factorize_solves():
+    rng = np.random.default_rng(2)
+    icon, node_data = sol.get_connectivity_matrix(9, 1, 3)
+    nnod, dof = len(node_data), 3
+    assembler = SparseAssembler(icon, nnod, dof)
+    assembler.add_all(rng.standard_normal((len(icon), 3 * dof, 3 * dof)), np.zeros((len(icon), 3 * dof, 1)))
+    assembler.add_nodal(0, 10 * np.eye(dof))
+    k = assembler.tobsr()
+    f = rng.standard_normal((nnod * dof, 1))
+    np.testing.assert_allclose(factorize(k).solve(f), np.linalg.solve(k.toarray(), f), atol=1e-9)
+
+
+def test_permutation_sign():
+    assert permutation_sign([0, 1, 2, 3]) == 1
+    assert permutation_sign([1, 0, 2, 3]) == -1
+    assert permutation_sign([1, 2, 0, 3]) == 1
+
+
+def test_negative_eigenvalues_of_every_storage():
+    rng = np.random.default_rng(4)
+    icon, node_data = sol.get_connectivity_matrix(4, 1, 3)
+    assembler = SparseAssembler(icon, len(node_data), 2)
+    for _ in range(10):
+        assembler.reset()
+        assembler.add_all(rng.standard_normal((4, 6, 6)), np.zeros((4, 6, 1)))
+        k = assembler.tobsr()
+        dense = k.toarray()
+        negative = np.count_nonzero(np.linalg.eigvalsh(0.5 * (dense + dense.T)) < 0)
+        assert negative_eigenvalues(k) == negative_eigenvalues(k.tocsr()) == negative_eigenvalues(dense) == negative
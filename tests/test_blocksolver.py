@@ -0,0 +1,46 @@
+import numpy as np
+from include import solver1d as sol
+from include.assembly import SparseAssembler, factorize
+from include.blocksolver import BandedLU, block_ldl_inertia, is_block_tridiagonal, is_block_tridiagonal_matrix
+
+
+def _block_tridiagonal(rng, nelem=8, dof=6):
+    icon, node_data = sol.get_connectivity_matrix(nelem, 1, 2)
+    assembler = SparseAssembler(icon, len(node_data), dof)
+    assembler.add_all(rng.standard_normal((nelem, 2 * dof, 2 * dof)), np.zeros((nelem, 2 * dof, 1)))
+    return icon, assembler.tobsr()
+
+
+def test_banded_lu_solve():
+    rng = np.random.default_rng(0)
+    icon, k = _block_tridiagonal(rng)
+    assert is_block_tridiagonal(icon) and is_block_tridiagonal_matrix(k)
+    assert isinstance(factorize(k), BandedLU)
+    f = rng.standard_normal((k.shape[0], 1))
+    np.testing.assert_allclose(BandedLU(k).solve(f), np.linalg.solve(k.toarray(), f), atol=1e-9)
+
+
+def test_banded_lu_det_sign():
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        _, k = _block_tridiagonal(rng, 5, 3)
+        assert BandedLU(k).det_sign() == np.sign(np.linalg.det(k.toarray()))
+
+
+def test_block_ldl_inertia():
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        _, k = _block_tridiagonal(rng, 6, 4)
+        dense = k.toarray()
+        assert block_ldl_inertia(k) == np.count_nonzero(np.linalg.eigvalsh(0.5 * (dense + dense.T)) < 0)
+
+
+def test_quadratic_elements_are_not_banded():
+    rng = np.random.default_rng(2)
+    icon, node_data = sol.get_connectivity_matrix(4, 1, 3)
+    assert not is_block_tridiagonal(icon)
+    assembler = SparseAssembler(icon, len(node_data), 2)
+    assembler.add_all(rng.standard_normal((4, 6, 6)), np.zeros((4, 6, 1)))
+    k = assembler.tobsr()
+    assert not is_block_tridiagonal_matrix(k)
+    assert not isinstance(factorize(k), BandedLU)
@@ -0,0 +1,71 @@
+import os
+import runpy
+import numpy as np
+from include.checkpoint import save_checkpoint, load_checkpoint, remaining_steps
+from include.problem import RodProblem
+from include.staticsolver import StaticSolver
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_checkpoint_round_trip(tmp_path):
+    file = str(tmp_path / "run" / "state.npz")
+    u = np.arange(12.0)[:, None]
+    save_checkpoint(file, u=u, load=-2.5, step=3, history={"kappa": np.ones(4)}, unused=None)
+    state = load_checkpoint(file)
+    np.testing.assert_array_equal(state["u"], u)
+    assert state["load"] == -2.5 and state["step"] == 3 and "unused" not in state
+    np.testing.assert_array_equal(state["history"]["kappa"], np.ones(4))
+    assert os.listdir(tmp_path / "run") == ["state.npz"]
+    assert remaining_steps(-np.linspace(0, 4, 5), -2) == [3, 4]
+
+
+def _solver():
+    e, d = 1e8, 0.025
+    area, inertia = np.pi * d ** 2 / 4, np.pi * d ** 4 / 64
+    problem = RodProblem(np.diag([e / 2 * area, e / 2 * area, e * area]), np.diag([e * inertia, e * inertia, e * inertia]),
+                         10, 1, 1, 2, fixed=range(6), tip_load=(0, 1, 0), follower=True)
+    return StaticSolver(problem, 100, predictor="secant"), 10 * e * inertia
+
+
+def test_resume_follows_uninterrupted_run(tmp_path):
+    file = str(tmp_path / "adaptive.npz")
+    solver, load_max = _solver()
+    full = solver.solve_adaptive(load_max, dload=load_max / 20)
+    solver, _ = _solver()
+    head = solver.solve_adaptive(load_max, dload=load_max / 20, checkpoint=file, checkpoint_every=2,
+                                 callback=lambda step, load, u, result: step == 4)
+    assert len(head) == 5 < len(full)
+    solver, _ = _solver()
+    tail = solver.resume(file)
+    kept = len(tail) - (len(full) - len(head))
+    assert kept == 3
+    np.testing.assert_allclose(tail.loads[kept:], full.loads[len(head):], rtol=1e-12)
+    np.testing.assert_allclose(np.array(tail.states[kept:]), np.array(full.states[len(head):]), atol=1e-9)
+    assert tail.loads[-1] == load_max
+
+
+def _path_dependent_kappa(checkpoint=None):
+    """
+    :return: globals of a fresh headless etc/path_dependent_kappa.py, checkpointing every 4 steps to checkpoint
+    """
+    driver = runpy.run_path(os.path.join(ROOT, "etc", "path_dependent_kappa.py"), run_name="driver")["fea"].__globals__
+    driver["CHECKPOINT"], driver["CHECKPOINT_EVERY"] = checkpoint, 4
+    return driver
+
+
+def test_path_dependent_kappa_resumes_with_gauss_point_history(tmp_path):
+    file = str(tmp_path / "kappa.npz")
+    full = _path_dependent_kappa()
+    for i in range(8):
+        full["fea"](i)
+    interrupted = _path_dependent_kappa(file)
+    for i in range(6):
+        interrupted["fea"](i)
+    resumed = _path_dependent_kappa()
+    frames = resumed["resume"](file)
+    assert frames[0] == 4
+    for i in frames[:4]:
+        resumed["fea"](i)
+    np.testing.assert_allclose(resumed["u"], full["u"], atol=1e-10)
+    np.testing.assert_allclose(resumed["major_kappa"], full["major_kappa"], atol=1e-10)
@@ -0,0 +1,16 @@
+"""
+Converged load path of classical_rod.py against the one of the original dense driver (tests/data)
+"""
+import os
+import numpy as np
+
+BASELINE = os.path.join(os.path.dirname(__file__), "data", "classical_rod_path.npy")
+
+
+def test_classical_rod_path_matches_baseline():
+    import classical_rod as driver
+    driver.is_log_residue = False
+    baseline = np.load(BASELINE)
+    for i in range(len(baseline)):
+        driver.fea(i)
+        np.testing.assert_allclose(driver.u[:, 0], baseline[i], atol=1e-5, err_msg="load step %d" % i)
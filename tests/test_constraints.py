@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from include import solver1d as sol
+from include.assembly import SparseAssembler
+from include.constraints import Constraints
+
+
+def _system(rng, nelem=6, dof=6):
+    icon, node_data = sol.get_connectivity_matrix(nelem, 1, 2)
+    nnod = len(node_data)
+    assembler = SparseAssembler(icon, nnod, dof)
+    a = rng.standard_normal((nelem, 2 * dof, 2 * dof))
+    assembler.add_all(a + a.transpose(0, 2, 1), rng.standard_normal((nelem, 2 * dof, 1)))
+    assembler.add_nodal(nnod - 1, 20 * np.eye(dof))
+    for node in range(nnod):
+        assembler.add_nodal(node, 20 * np.eye(dof))
+    return assembler
+
+
+def _eliminated_one_by_one(k, f, prescribed):
+    k = k.copy()
+    rhs = -f.copy()
+    for ibc, bc in prescribed.items():
+        sol.impose_boundary_condition(k, rhs, ibc, bc)
+    return np.linalg.solve(k, rhs)
+
+
+def test_solve_matches_elimination_per_dof():
+    rng = np.random.default_rng(0)
+    assembler = _system(rng)
+    ndof = len(assembler.force)
+    fixed = list(range(6)) + [-1, -3]
+    constraints = Constraints(ndof, fixed)
+    prescribed = {2: 0.1, -3: -0.2}
+    every = {i % ndof: prescribed.get(i, 0) for i in fixed}
+    every.update({i % ndof: v for i, v in prescribed.items()})
+    ref = _eliminated_one_by_one(assembler.tobsr().toarray(), assembler.force, every)
+    np.testing.assert_allclose(constraints.solve(assembler.tobsr(), assembler.force, prescribed), ref, atol=1e-10)
+    # dense storage and a cached pattern give the same increment
+    np.testing.assert_allclose(constraints.solve(assembler.tobsr().toarray(), assembler.force, prescribed), ref,
+                               atol=1e-10)
+    np.testing.assert_allclose(constraints.solve(assembler.tobsr(), assembler.force, prescribed), ref, atol=1e-10)
+    np.testing.assert_allclose(constraints.solve(assembler.tocsr(), assembler.force, prescribed), ref, atol=1e-10)
+
+
+def test_resolve_holds_fixed_dofs():
+    rng = np.random.default_rng(1)
+    assembler = _system(rng)
+    ndof = len(assembler.force)
+    constraints = Constraints(ndof, range(6))
+    k = assembler.tobsr().toarray()
+    constraints.solve(assembler.tobsr(), assembler.force)
+    f = rng.standard_normal((ndof, 1))
+    du = constraints.resolve(f)
+    assert not du[constraints.fixed].any()
+    free = constraints.free
+    np.testing.assert_allclose(du[free], np.linalg.solve(k[np.ix_(free, free)], -f[free]), atol=1e-10)
+    assert constraints.det_sign() == np.sign(np.linalg.det(k[np.ix_(free, free)]))
+
+
+def test_only_constrained_dofs_can_be_prescribed():
+    constraints = Constraints(12, range(6))
+    with pytest.raises(ValueError):
+        constraints.increment({7: 1})
+
+
+def test_masks_follow_the_pattern():
+    rng = np.random.default_rng(2)
+    assembler = _system(rng)
+    ndof = len(assembler.force)
+    ref = Constraints(ndof, range(6)).solve(assembler.tobsr(), assembler.force)
+    constraints = Constraints(ndof, range(6), assembler)
+    for _ in range(2):
+        np.testing.assert_allclose(constraints.solve(assembler.tobsr(), assembler.force), ref, atol=1e-10)
+    mask = constraints._mask
+    constraints.solve(assembler.tobsr(), assembler.force)
+    assert constraints._mask is mask
+    # another pattern of the same size (csr of the assembler, then a full dense one) rebuilds the masks
+    np.testing.assert_allclose(constraints.solve(assembler.tocsr(), assembler.force), ref, atol=1e-10)
+    full = sparse.csr_matrix(assembler.tobsr().toarray() + 1e-3)
+    dense = full.toarray()
+    dense[:6, :] = dense[:, :6] = 0
+    dense[range(6), range(6)] = 1
+    np.testing.assert_allclose(constraints.solve(full, assembler.force)[6:],
+                               np.linalg.solve(dense[6:, 6:], -assembler.force[6:]), atol=1e-10)
+    with pytest.raises(ValueError):
+        constraints.solve(sparse.bsr_matrix(full, blocksize=(6, 6)), assembler.force)
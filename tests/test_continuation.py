@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from include.constraints import Constraints
+from include.continuation import ArcLengthSolver
+
+
+class ShallowTruss:
+    """
+    von Mises truss, one free dof with internal force x - 1.5 x^2 + 0.5 x^3 against the load factor, the second
+    dof is fixed, limit points at x = 1 -+ 1 / sqrt(3), the path snaps from load 1 / sqrt(27) back to -1 / sqrt(27)
+    """
+    def __init__(self):
+        self.constraints = Constraints(2, [1])
+
+    @staticmethod
+    def internal(x):
+        return x - 1.5 * x ** 2 + 0.5 * x ** 3
+
+    def initial_state(self):
+        return np.zeros((2, 1))
+
+    def assemble(self, u, load):
+        x = u[0, 0]
+        return np.diag([1 - 3 * x + 1.5 * x ** 2, 1.0]), np.array([[self.internal(x) - load], [0]])
+
+    def load_vector(self, u, load):
+        return np.array([[-1.0], [0]])
+
+    def prescribed(self, u, load):
+        return None
+
+    def update(self, u, du):
+        return u + du
+
+
+def test_arclength_passes_limit_points():
+    problem = ShallowTruss()
+    path = ArcLengthSolver(problem, ds=0.1, ds_max=0.2, tol_residue=1e-9).trace(0.5)
+    x, loads = np.array(path.states)[:, 0, 0], np.array(path.loads)
+    assert all(path.converged) and loads[-1] >= 0.5
+    np.testing.assert_allclose(problem.internal(x), loads, atol=1e-6)
+    # x keeps growing while the load factor goes up, down through both limit points and up again
+    assert np.all(np.diff(x) > 0)
+    limit = 1 / np.sqrt(27)
+    top, bottom = np.argmax(loads[x < 1]), np.argmin(loads)
+    assert loads[top] == pytest.approx(limit, rel=2e-2) and loads[bottom] == pytest.approx(-limit, rel=2e-2)
+    signs = np.array(path.det_signs)
+    assert np.all(signs[x < 1 - 1 / np.sqrt(3)] == 1) and np.all(signs[(x > 0.5) & (x < 1.5)] == -1)
+    assert np.all(signs[x > 1 + 1 / np.sqrt(3)] == 1)
@@ -0,0 +1,38 @@
+"""
+Drivers run headless on import, converged load paths of the strain gradient drivers against the ones of the
+original hand written newton loops (tests/data)
+"""
+import importlib
+import os
+import runpy
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(os.path.dirname(__file__), "data", "gradient_drivers.npz")
+DRIVERS = ["classical_rod.py", "classical_buckling.py", "dna.py", "test00h.py", "stability_unclassical.py",
+           "unclassical_graph.py", "unclasssical_rod.py", "l0_sweep.py", "etc/alternate_kappa_update.py",
+           "etc/path_dependent_kappa.py", "etc/path_independent_kappa.py", "bending/bending_gradient.py",
+           "bending/single_bending.py", "extention/extension_gradient.py"]
+
+
+@pytest.mark.parametrize("driver", DRIVERS)
+def test_import_opens_no_figure(driver):
+    plt.close("all")
+    runpy.run_path(os.path.join(ROOT, driver), run_name="driver")
+    assert plt.get_fignums() == []
+
+
+@pytest.mark.parametrize("driver", ["dna", "test00h", "stability_unclassical", "unclassical_graph",
+                                    "unclasssical_rod"])
+def test_gradient_driver_path_matches_baseline(driver):
+    module = importlib.import_module(driver)
+    module.is_log_residue = False
+    baseline = np.load(BASELINE)
+    states, steps = baseline[driver], baseline[driver + "_steps"]
+    for i in range(steps[-1] + 1):
+        module.fea(i)
+        if i in steps:
+            np.testing.assert_allclose(module.u[:, 0], states[list(steps).index(i)], atol=1e-8,
+                                       err_msg="load step %d" % i)
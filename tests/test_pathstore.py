@@ -0,0 +1,57 @@
+import os
+import numpy as np
+import pytest
+from include.pathstore import PathStore, STATES, STEPS
+
+
+def _states(steps, ndof=5):
+    return np.arange(steps * ndof, dtype=float).reshape(steps, ndof, 1)
+
+
+def test_append_after_reopen_grows_store(tmp_path):
+    directory = str(tmp_path / "path")
+    states = _states(7)
+    store = PathStore(directory, 5, capacity=2, meta={"max_load": 6})
+    for step in range(3):
+        store.append(step, states[step])
+    store.close()
+    store = PathStore(directory, mode="a")
+    assert len(store) == 3 and len(store.states) == 3
+    for step in range(3, 7):
+        store.append(step, states[step], eigenvalues=[step, -1])
+    store.close()
+    store = PathStore(directory, mode="r")
+    assert len(store) == 7 and store.meta == {"max_load": 6}
+    np.testing.assert_array_equal(store.loads, np.arange(7))
+    np.testing.assert_array_equal(store.states, states[..., 0])
+    np.testing.assert_array_equal(store[6], states[6])
+    assert store.field("eigenvalues")[:3] == [None] * 3 and store.field("eigenvalues")[3] == [3, -1]
+    with pytest.raises(ValueError):
+        store.append(7, states[0])
+
+
+def test_line_cut_short_is_dropped(tmp_path):
+    directory = str(tmp_path / "path")
+    store = PathStore(directory, 5)
+    for step in range(2):
+        store.append(step, _states(2)[step])
+    store.close()
+    with open(os.path.join(directory, STEPS), "a") as file:
+        file.write('{"loads": 2.0, "resid')
+    store = PathStore(directory, mode="a")
+    assert len(store) == 2
+    store.append(2, _states(3)[2])
+    store.close()
+    np.testing.assert_array_equal(PathStore(directory, mode="r").loads, [0, 1, 2])
+
+
+def test_states_shorter_than_steps_are_refused(tmp_path):
+    directory = str(tmp_path / "path")
+    store = PathStore(directory, 5, capacity=4)
+    for step in range(3):
+        store.append(step, _states(3)[step])
+    store.close()
+    np.save(os.path.join(directory, STATES), np.zeros((2, 5)))
+    for mode in ("a", "r"):
+        with pytest.raises(ValueError):
+            PathStore(directory, mode=mode)
@@ -0,0 +1,56 @@
+import numpy as np
+from include import so3
+
+
+def _rotation_vectors(rng, n=200):
+    x = rng.standard_normal((n, 3))
+    x /= np.linalg.norm(x, axis=-1, keepdims=True)
+    angles = np.concatenate((rng.uniform(0, np.pi - 1e-6, n - 4), [0, 1e-12, 1e-7, np.pi - 1e-6]))
+    return x * angles[:, None]
+
+
+def test_exp_log_round_trip():
+    x = _rotation_vectors(np.random.default_rng(0))
+    rot = so3.exp(x)
+    np.testing.assert_allclose(rot @ rot.transpose(0, 2, 1), np.broadcast_to(np.eye(3), rot.shape), atol=1e-12)
+    np.testing.assert_allclose(np.linalg.det(rot), 1, atol=1e-12)
+    # Spurrier keeps the sign of the quaternion it finds, angles above pi are an equivalent rotation vector
+    np.testing.assert_allclose(so3.exp(so3.log(rot)), rot, atol=1e-12)
+    small = np.linalg.norm(x, axis=-1) < 1
+    np.testing.assert_allclose(so3.log(rot[small]), x[small], atol=1e-10)
+
+
+def test_quaternion_round_trips():
+    x = _rotation_vectors(np.random.default_rng(1))
+    q = so3.quat_from_rotation_vector(x)
+    np.testing.assert_allclose(np.linalg.norm(q, axis=-1), 1, atol=1e-14)
+    np.testing.assert_allclose(so3.quat_to_rotation_vector(q), x, atol=1e-10)
+    rot = so3.quat_to_rotation(q)
+    q2 = so3.rotation_to_quat(rot)
+    # q and -q are the same rotation
+    np.testing.assert_allclose(np.abs(np.sum(q * q2, axis=-1)), 1, atol=1e-12)
+    v = np.random.default_rng(2).standard_normal(x.shape)
+    np.testing.assert_allclose(so3.rotate(q, v), np.einsum('nij,nj->ni', rot, v), atol=1e-12)
+
+
+def test_skew_axial():
+    x = np.random.default_rng(3).standard_normal((5, 3))
+    np.testing.assert_allclose(so3.axial(so3.skew(x)), x)
+    np.testing.assert_allclose(np.einsum('nij,nj->ni', so3.skew(x), x), 0, atol=1e-14)
+
+
+def test_multiplicative_update_past_pi():
+    rng = np.random.default_rng(4)
+    theta = _rotation_vectors(rng, 20)
+    dtheta = 0.3 * rng.standard_normal((20, 3))
+    u = np.hstack((rng.standard_normal((20, 3)), theta)).reshape(-1, 1)
+    du = np.hstack((rng.standard_normal((20, 3)), dtheta)).reshape(-1, 1)
+    un = so3.update_configuration(u, du, 6).reshape(20, 6)
+    np.testing.assert_allclose(un[:, 0: 3], (u + du).reshape(20, 6)[:, 0: 3])
+    np.testing.assert_allclose(so3.exp(un[:, 3: 6]), so3.exp(dtheta) @ so3.exp(theta), atol=1e-10)
+    # rotation about a fixed axis keeps adding up past pi and 2 pi instead of jumping back
+    axis = np.array([0.0, 0.6, 0.8])
+    theta = np.zeros((1, 3))
+    for _ in range(30):
+        theta = so3.compose_rotation_vector(theta, 0.3 * axis[None])
+    np.testing.assert_allclose(theta[0], 9 * axis, atol=1e-10)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from include.problem import RodProblem
+from include.staticsolver import StaticSolver
+
+
+def _classical_rod():
+    """
+    :return: problem and load steps of classical_rod.py (follower load on a cantilever rolled up into a circle)
+    """
+    import classical_rod as driver
+    problem = RodProblem(driver.ElasticityExtension, driver.ElasticityBending, driver.numberOfElements, driver.L,
+                         driver.ngpt, driver.element_type, fixed=range(6), tip_load=(0, 1, 0), follower=True)
+    return problem, driver.fapp__
+
+
+@pytest.fixture(scope="module")
+def newton_path():
+    problem, loads = _classical_rod()
+    return StaticSolver(problem, 100).solve(loads)
+
+
+@pytest.mark.parametrize("strategy, refresh_rate", [("modified", 0.5), ("modified", 0.9), ("broyden", 0.5),
+                                                    ("bfgs", 0.5)])
+def test_quasi_newton_follows_newton_with_fewer_factorizations(newton_path, strategy, refresh_rate):
+    problem, loads = _classical_rod()
+    path = StaticSolver(problem, 100, strategy=strategy, refresh_rate=refresh_rate).solve(loads)
+    assert all(path.converged)
+    np.testing.assert_allclose(path.u, newton_path.u, atol=1e-5)
+    assert sum(path.factorizations) < 0.6 * sum(newton_path.factorizations)
+
+
+@pytest.mark.parametrize("predictor", ["secant", "quadratic", "tangent"])
+def test_predictors_follow_newton_with_fewer_iterations(newton_path, predictor):
+    problem, loads = _classical_rod()
+    path = StaticSolver(problem, 100, predictor=predictor).solve(loads)
+    assert all(path.converged)
+    np.testing.assert_allclose(path.u, newton_path.u, atol=1e-5)
+    assert sum(path.iterations) < sum(newton_path.iterations)
+
+
+def test_predictors_need_full_newton():
+    problem, _ = _classical_rod()
+    for strategy in ("modified", "broyden", "bfgs"):
+        with pytest.raises(ValueError):
+            StaticSolver(problem, predictor="secant", strategy=strategy)
+
+
+@pytest.mark.parametrize("ratio, crossing", [(1, 2), (2, 1)])
+def test_critical_load_of_euler_column(ratio, crossing):
+    """
+    cantilever under a dead compressive tip load, a circular cross section buckles in two planes at once,
+    det does not change sign there
+    """
+    e, d = 1e8, 0.025
+    area, inertia = np.pi * d ** 2 / 4, np.pi * d ** 4 / 64
+    problem = RodProblem(np.diag([e / 2 * area, e / 2 * area, e * area]),
+                         np.diag([e * inertia, ratio * e * inertia, e * inertia]), 20, 1, 1, 2, fixed=range(6),
+                         tip_load=(0, 0, 1), follower=False)
+    euler = np.pi ** 2 * e * inertia / 4
+    solver = StaticSolver(problem, 100)
+    load_c, u_c, path = solver.find_critical_load(np.linspace(0, 2 * euler, 7))
+    assert load_c == pytest.approx(euler, rel=2e-3)
+    assert all(sign == 1 for sign in path.det_signs)
+    result = solver.newton(u_c, 1.01 * load_c)
+    assert solver.negative_eigenvalues(result.u, 1.01 * load_c) == crossing
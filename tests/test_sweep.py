@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+from include.sweep import parameter_grid, run_continuation
+
+
+def _previous(u, x, mesh):
+    """
+    :return: state of the previous point of the chain as column, the point itself as state
+    """
+    return {"previous": np.nan if u is None else u}, x
+
+
+@pytest.mark.parametrize("processes, size", [(1, 10), (4, 10), (4, 5), (8, 24)])
+def test_continuation_chains_are_warm_started(processes, size):
+    grid = parameter_grid(x=list(range(size)), mesh=[1])
+    table = run_continuation(_previous, grid, processes, restart_on=("mesh",))
+    previous = table["previous"].to_numpy()
+    starts = np.flatnonzero(np.isnan(previous))
+    # grid order is chain order here, every point after the first of a piece continues from its neighbour
+    np.testing.assert_array_equal(np.delete(previous, starts), np.delete(np.arange(size) - 1, starts))
+    lengths = np.diff(np.append(starts, size))
+    assert starts[0] == 0 and np.all(lengths >= 3)
+    assert len(starts) == (1 if processes == 1 else max(1, min(size // 3, processes)))